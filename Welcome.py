@@ -1,7 +1,12 @@
 import streamlit as st
 
+from euro import warmup
+
 config = {'scrollZoom': True, 'displayModeBar': True, 'displaylogo': False}
 st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
+
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
 st.write("""
 #### UEFA Euro Championship Data Analysis
 
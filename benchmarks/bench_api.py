@@ -0,0 +1,130 @@
+# Benchmark: requests per second of the query API (euro/api.py) on a single core.
+# The server runs in its own process pinned to one CPU, and a small asyncio client on the other CPUs keeps a
+# number of keep-alive connections busy with a mix of queries for a few seconds. It reports throughput and
+# latency for JSON, Arrow and ETag revalidation (304) requests separately.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_api.py
+#   python benchmarks/bench_api.py --connections 64 --seconds 10
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The queries the pages' selectboxes would make, plus a few filters
+QUERIES = [
+    "/datasets/team_records?top=Top+5+teams&sort=Total+points",
+    "/datasets/team_records?top=Top+10+teams&sort=Matches+Played&columns=Team,Won,Drawn,Lost",
+    "/datasets/team_medals?top=All+Teams&sort=Total",
+    "/datasets/host_countries?top=Top+5+nations&sort=Number+of+times+hosted",
+    "/datasets/red_cards?filter=Round:Final",
+    "/datasets/red_cards?filter=Card+Color:Red&sort=Time+of+card&top=10",
+    "/cards?round=Group+stage&color=Red",
+]
+MODES = {
+    "json": lambda path: path,
+    "arrow": lambda path: path + "&format=arrow",
+    # The same JSON queries, revalidated with the ETag of the first response
+    "304": lambda path: path,
+}
+
+
+async def _request(reader, writer, path, headers=""):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n{headers}\r\n".encode())
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    etag = None
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name.lower() == b"content-length":
+            length = int(value)
+        elif name.lower() == b"etag":
+            etag = value.strip().decode()
+    if length:
+        await reader.readexactly(length)
+    return status, etag
+
+
+async def _connection(port, mode, etags, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    while time.perf_counter() < deadline:
+        path = MODES[mode](QUERIES[i % len(QUERIES)])
+        headers = f"If-None-Match: {etags[path]}\r\n" if mode == "304" else ""
+        start = time.perf_counter()
+        status, _ = await _request(reader, writer, path, headers)
+        latencies.append(time.perf_counter() - start)
+        if status != (304 if mode == "304" else 200):
+            errors.append(status)
+        i += 1
+    writer.close()
+
+
+async def _run(port, mode, connections, seconds):
+    # One request per query first, to fill the response cache and learn the ETags
+    etags = {}
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for query in QUERIES:
+        path = MODES[mode](query)
+        _, etags[path] = await _request(reader, writer, path)
+    writer.close()
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    await asyncio.gather(*(_connection(port, mode, etags, deadline, latencies, errors) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, np.array(latencies) * 1000, errors
+
+
+def _wait_until_up(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/datasets", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("The API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the query API on a single core.")
+    parser.add_argument("--port", type=int, default=8619)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    cpus = sorted(os.sched_getaffinity(0))
+    server_cpu, client_cpus = cpus[0], set(cpus[1:]) or {cpus[0]}
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "euro.api", "--port", str(args.port)], cwd=ROOT, env=env,
+        # The server gets one core to itself, the client runs on the others
+        preexec_fn=lambda: os.sched_setaffinity(0, {server_cpu}),
+    )
+    try:
+        os.sched_setaffinity(0, client_cpus)
+        _wait_until_up(args.port)
+        print(f"server on CPU {server_cpu}, {args.connections} connections, {args.seconds:g} s per mode")
+        print(f"{'mode':<8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+        for mode in MODES:
+            rate, latencies, errors = asyncio.run(_run(args.port, mode, args.connections, args.seconds))
+            print(f"{mode:<8}{rate:>10.0f}{np.percentile(latencies, 50):>10.2f}{np.percentile(latencies, 99):>10.2f}{len(errors):>8}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
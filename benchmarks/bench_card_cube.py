@@ -0,0 +1,91 @@
+# Benchmark: the Card Analytics page on millions of card events.
+# Makes random card events shaped like 220-red_cards.csv, up to 3,000 teams and 300 tournaments (many competitions
+# in one dataset), builds the rollup cube of euro/card_cube.py and times one page rerun (the three breakdowns for
+# a filter combination) from the cube, next to answering the same filters by scanning and grouping the events with
+# pandas. It also reports the bytes of the cube, the peak memory of building it (tracemalloc, numpy reports its
+# arrays to it), and what a dense cube with a team axis would take.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_card_cube.py
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from euro import card_cube  # noqa: E402
+
+# (events, teams, tournaments)
+SIZES = [(10_000, 200, 100), (1_000_000, 3_000, 300), (5_000_000, 3_000, 300)]
+ROUNDS = ["Group stage", "Round of 16", "Quarter-finals", "Semi-finals", "Final"]
+
+
+def make_cards(n, rng, teams=200, tournaments=100):
+    round_values = rng.integers(1, 6, size=n)
+    return pd.DataFrame({
+        'Card Color': np.where(rng.random(n) < 0.55, "Red", "Two-Yellow"),
+        'Time of card': rng.integers(1, 121, size=n),
+        'Representing': np.char.add("Team ", rng.integers(0, teams, size=n).astype(str)),
+        'Tournament': 1924 + 4 * rng.integers(0, tournaments, size=n),
+        'Round': np.asarray(ROUNDS)[round_values - 1],
+        'Round-Value': round_values,
+        'Team goals': rng.integers(0, 5, size=n),
+        'Opponent goals': rng.integers(0, 5, size=n),
+    })
+
+
+def rescan(cards, filters):
+    # What the page would do without the cube: filter the events and group them for every graph
+    mask = cards['Tournament'].isin(filters["tournament"]) & cards['Round'].isin(filters["round"])
+    mask &= cards['Card Color'].isin(filters["color"])
+    if filters["team"] is not None:
+        mask &= cards['Representing'].isin(filters["team"])
+    selected = cards[mask]
+    minutes = pd.cut(selected['Time of card'], [0, *card_cube.MINUTE_EDGES, 200])
+    margin = (selected['Team goals'] - selected['Opponent goals']).clip(-2, 2)
+    return (selected.groupby([minutes, 'Card Color'], observed=False).size(),
+            selected.groupby(['Tournament', 'Card Color']).size(),
+            selected.groupby([margin, 'Card Color']).size())
+
+
+def main(repeat=10):
+    rng = np.random.default_rng(2024)
+    print(f"{'events':>10}{'teams':>7}{'tourn.':>7}{'build ms':>10}{'cube ms':>9}{'rescan ms':>11}"
+          f"{'cube MB':>9}{'build peak MB':>15}{'dense MB':>10}")
+    for n, teams, tournaments in SIZES:
+        cards = make_cards(n, rng, teams, tournaments)
+        start = time.perf_counter()
+        cube = card_cube.encode(cards)
+        build = (time.perf_counter() - start) * 1000
+        # A second build under tracemalloc for the memory, tracing slows it down
+        tracemalloc.start()
+        card_cube.encode(cards)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        # What the cube would take with a team axis, as int32 counts
+        dense = cube.counts.size * len(cube.labels["team"]) * 4
+
+        years = cube.labels["tournament"].tolist()
+        cube_times, scan_times = [], []
+        for _ in range(repeat):
+            lo, hi = sorted(rng.choice(len(years), size=2, replace=False))
+            filters = {"tournament": years[lo:hi + 1], "round": ROUNDS[:int(rng.integers(1, 6))],
+                       "color": ["Red"], "team": None if rng.random() < 0.5 else [f"Team {rng.integers(0, teams)}"]}
+            start = time.perf_counter()
+            for axis in ("minute", "tournament", "result"):
+                cube.frame(axis, by="color", **filters)
+            cube_times.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            rescan(cards, filters)
+            scan_times.append((time.perf_counter() - start) * 1000)
+        print(f"{n:>10}{teams:>7}{tournaments:>7}{build:>10.0f}{np.median(cube_times):>9.2f}{np.median(scan_times):>11.1f}"
+              f"{cube.nbytes() / 1e6:>9.1f}{peak / 1e6:>15.1f}{dense / 1e6:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
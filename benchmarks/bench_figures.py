@@ -0,0 +1,94 @@
+# Benchmark: building the figures of a page one after the other, or on the figure pool of euro/figures.py.
+# Builds the pie charts of the Penalty Cards page and the subplots of the Match Performance page from an empty
+# cache, and reports when the first figure was ready and when the last one was. Every mode runs in its own
+# process with the shared store off (EURO_SHARED=0), so every figure is really built.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_figures.py
+#   python benchmarks/bench_figures.py --scale 100 --jobs 1 2 4 --processes 2 4
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import as_completed
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import make_data_dir  # noqa: E402
+
+OPTIONS = ('Top 5 teams', 'Top 10 teams', 'All Teams')
+
+
+def child(mode):
+    # In the app both are imported long before the first figure
+    import plotly.express  # noqa: F401
+    import streamlit  # noqa: F401
+
+    from euro import data, figures
+
+    for name in data.DATASETS:
+        data.load(name)
+    requests = [("penalty_cards", "pie", option) for option in figures._penalty_pie_options()]
+    requests += [("match_performance", tab, option) for tab in ("goals_points", "won_lost") for option in OPTIONS]
+    # Plotly sets itself up on the first figure of each kind, that is the job of the warm-up in the app.
+    # render() does not put anything in the caches.
+    import plotly.io as pio
+    for request in (requests[0], requests[-1]):
+        pio.from_json(figures.render(*request))
+    if figures.PROCESSES:
+        # The same for the worker processes
+        pool = figures._process_pool()
+        [future.result() for future in [pool.submit(figures.render, *requests[0]) for _ in range(figures.PROCESSES)]]
+
+    start = time.perf_counter()
+    if mode == "sequential":
+        first = None
+        for page, tab, option in requests:
+            figures.get_figure(page, tab, option)
+            first = first or time.perf_counter() - start
+    else:
+        futures = [figures.submit_figure(page, tab, option) for page, tab, option in requests]
+        first = None
+        for future in as_completed(futures):
+            future.result()
+            first = first or time.perf_counter() - start
+    return {"figures": len(requests), "first_ms": first * 1000, "total_ms": (time.perf_counter() - start) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Figure builds one after the other or on the figure pool.")
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2], help="threads of the figure pool")
+    parser.add_argument("--processes", type=int, nargs="+", default=[2], help="worker processes of the figure pool")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = make_data_dir(Path(tmp) / "data", args.scale)
+        runs = [("sequential", 1, 0)] + [("pool", jobs, 0) for jobs in args.jobs]
+        runs += [("pool", processes, processes) for processes in args.processes]
+        print(f"scale x{args.scale}, {os.cpu_count()} CPUs")
+        print(f"{'mode':>12}{'threads':>9}{'processes':>11}{'figures':>9}{'first ms':>10}{'total ms':>10}")
+        for mode, jobs, processes in runs:
+            env = dict(os.environ, PYTHONPATH=str(ROOT), EURO_DATA_DIR=str(data_dir), EURO_STORE_DIR=str(Path(tmp) / "store"),
+                       EURO_SHARED="0", EURO_WATCH="0", EURO_WARMUP="0", EURO_FIGURE_JOBS=str(jobs),
+                       EURO_FIGURE_PROCESSES=str(processes))
+            out = subprocess.run([sys.executable, __file__, "--child", mode], cwd=ROOT, env=env,
+                                 capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{mode:>12}{jobs:>9}{processes:>11}{result['figures']:>9}{result['first_ms']:>10.0f}{result['total_ms']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
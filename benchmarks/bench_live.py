@@ -0,0 +1,105 @@
+# Benchmark: live match results on big team tables, end to end.
+# A new result should cost the deltas of the two teams that played, not a rebuild of the table. This appends
+# random matches to the event log (euro/live.py) and times each one from the append to the DataFrame that
+# data.load() returns, on team tables with thousands of teams, next to the top 10 table the Match Performance
+# page builds from it (euro/ranking.py) and to recomputing the whole ranking with sort_values.
+# Every size runs in its own process, as the data folder is read from the environment when euro.data is imported.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_live.py
+#   python benchmarks/bench_live.py --sizes 1000 100000 --matches 200
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import make_data_dir  # noqa: E402
+
+SIZES = [36, 1_000, 10_000, 100_000]
+RECORDS = "100-overall_team_records.csv"
+
+
+def spread_records(data_dir, teams, rng):
+    """Rewrite the team records of a data folder with teams rows of different, consistent results.
+
+    Copies of the 36 real rows would tie thousands of teams on everything, which is not what a big table looks like.
+    """
+    df = pd.read_csv(data_dir / RECORDS)
+    df = df.iloc[np.arange(teams) % len(df)].reset_index(drop=True)
+    df['Team'] = [f"Team {i}" for i in range(teams)]
+    df['Won'], df['Drawn'], df['Lost'] = (rng.integers(0, 300, size=teams) for _ in range(3))
+    df['Matches Played'] = df['Won'] + df['Drawn'] + df['Lost']
+    df['Goals scored'], df['Goals conceded'] = (rng.integers(0, 1_000, size=teams) for _ in range(2))
+    df['Goal difference'] = df['Goals scored'] - df['Goals conceded']
+    df['Total points'] = 3 * df['Won'] + df['Drawn']
+    df = df.sort_values(['Total points', 'Goal difference', 'Goals scored'], ascending=False, ignore_index=True)
+    df['Rank'] = np.arange(1, teams + 1)
+    df.to_csv(data_dir / RECORDS, index=False)
+
+
+def child(teams, matches):
+    from euro import data, live, ranking
+
+    rng = np.random.default_rng(2024)
+    # Build the overlay and the ranking of the snapshot first, like the first session does
+    ranking.index("team_records").top('Total points', 10)
+    names = data.load("team_records", ['Team'])['Team'].to_numpy()
+    load_ms, page_ms = [], []
+    for _ in range(matches):
+        home, away = rng.choice(len(names), size=2, replace=False)
+        event = {"tournament": 2024, "stage": "GS", "home": str(names[home]), "away": str(names[away]),
+                 "home_goals": int(rng.integers(0, 4)), "away_goals": int(rng.integers(0, 4))}
+        start = time.perf_counter()
+        live.append(event, data.EVENTS_FILE)
+        df = data.load("team_records")
+        load_ms.append((time.perf_counter() - start) * 1000)
+        ranking.index("team_records").top('Total points', 10)
+        page_ms.append((time.perf_counter() - start) * 1000)
+    assert data.live_matches("team_records") == matches
+    start = time.perf_counter()
+    df.sort_values(list(live.RANK_COLUMNS["team_records"]), ascending=False, kind='stable')
+    full_ms = (time.perf_counter() - start) * 1000
+    return {"load_ms": float(np.median(load_ms)), "load_p99_ms": float(np.percentile(load_ms, 99)),
+            "page_ms": float(np.median(page_ms)), "full_sort_ms": full_ms}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live match results from the event log to the page, on big team tables.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="number of teams")
+    parser.add_argument("--matches", type=int, default=500)
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child, args.matches)))
+        return
+
+    rng = np.random.default_rng(1)
+    print(f"{'teams':>8}{'load ms':>10}{'p99 ms':>10}{'+ top 10 ms':>13}{'full sort ms':>14}")
+    for teams in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = make_data_dir(Path(tmp) / "data", 1)
+            spread_records(data_dir, teams, rng)
+            env = dict(os.environ, PYTHONPATH=str(ROOT), EURO_DATA_DIR=str(data_dir), EURO_STORE_DIR=str(Path(tmp) / "store"),
+                       EURO_EVENTS_FILE=str(Path(tmp) / "events.jsonl"), EURO_WATCH="0", EURO_WARMUP="0")
+            out = subprocess.run([sys.executable, __file__, "--child", str(teams), "--matches", str(args.matches)],
+                                 cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{teams:>8}{result['load_ms']:>10.2f}{result['load_p99_ms']:>10.2f}{result['page_ms']:>13.2f}"
+                  f"{result['full_sort_ms']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
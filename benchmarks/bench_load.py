@@ -0,0 +1,107 @@
+# Benchmark: loading the datasets with pd.read_csv versus the memory-mapped Arrow store.
+# Every CSV in the data folder is replicated 1x, 100x and 10,000x into a temporary folder, imported into the
+# store once, and then loaded both ways. Each load runs in a fresh Python process so the timings and the
+# memory numbers are not skewed by what an earlier load left behind.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_load.py
+#   python benchmarks/bench_load.py --scales 1 100 --repeat 5
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# The columns a page typically needs from each dataset, for the "only the columns I need" case
+PAGE_COLUMNS = {
+    "team_records": ["Team", "Total points"],
+    "team_medals": ["Team", "Total"],
+    "host_countries": ["Nation", "Number of times hosted"],
+    "red_cards": ["Round", "Card Color", "Representing"],
+    "team_results": ["Team", "2020"],
+}
+
+
+def _rss_mb():
+    # Current resident set size, read from /proc so it reflects what the process holds right now
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    import resource
+    return pages * resource.getpagesize() / 2**20
+
+
+def child(mode, name, csv_path, arrow_path):
+    # Runs in its own process: import everything first, then measure only the load itself
+    import pandas as pd
+    from euro import store
+
+    columns = PAGE_COLUMNS[name] if mode == "arrow-columns" else None
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    if mode == "csv":
+        df = pd.read_csv(csv_path)
+    else:
+        df = store.to_pandas(store.read(arrow_path, columns))
+    # Touch every column so lazy memory-mapped pages are really read
+    for column in df.columns:
+        df[column].iloc[-1]
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"seconds": elapsed, "rss_mb": _rss_mb() - rss_before, "rows": len(df)}))
+
+
+def replicate(src, dst, times):
+    # Keep the header once and repeat the data rows
+    lines = src.read_text(encoding="utf-8").splitlines(keepends=True)
+    header, rows = lines[0], lines[1:]
+    if rows and not rows[-1].endswith("\n"):
+        rows[-1] += "\n"
+    with open(dst, "w", encoding="utf-8") as out:
+        out.write(header)
+        for _ in range(times):
+            out.writelines(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement, the best run is kept")
+    args = parser.parse_args()
+
+    from euro import data, store
+
+    print(f"{'dataset':<16}{'scale':>8}{'rows':>11}  {'mode':<15}{'load ms':>10}{'RSS MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for scale in args.scales:
+            for name in data.DATASETS:
+                csv_path = tmp / f"{name}-{scale}.csv"
+                arrow_path = tmp / f"{name}-{scale}.arrow"
+                replicate(data.path(name), csv_path, scale)
+                start = time.perf_counter()
+                store.write(data.read_csv(name, csv_path), arrow_path, "bench")
+                ingest_ms = (time.perf_counter() - start) * 1000
+
+                for mode in ("csv", "arrow", "arrow-columns"):
+                    runs = []
+                    for _ in range(args.repeat):
+                        out = subprocess.run(
+                            [sys.executable, __file__, "--child", mode, name, str(csv_path), str(arrow_path)],
+                            check=True, capture_output=True, text=True, cwd=ROOT,
+                        )
+                        runs.append(json.loads(out.stdout))
+                    best = min(runs, key=lambda run: run["seconds"])
+                    print(f"{name:<16}{scale:>8}{best['rows']:>11}  {mode:<15}{best['seconds'] * 1000:>10.2f}{best['rss_mb']:>9.1f}")
+                print(f"{name:<16}{scale:>8}{'':>11}  {'(ingest once)':<15}{ingest_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(*sys.argv[2:6])
+    else:
+        main()
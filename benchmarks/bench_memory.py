@@ -0,0 +1,104 @@
+# Benchmark: memory of many open sessions with the budgeted cache of euro/memory.py.
+# Opens --sessions AppTest sessions on synthetic data (see benchmarks/synthetic.py) and keeps them all alive.
+# Every session picks random selections on the Match Performance, Team Progression and Card Analytics pages.
+# For each cache budget the run reports the rerun latency, what the cache holds, how much of it every session
+# shows, how many entries were evicted, and the RSS of the process. Every budget runs in its own process.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_memory.py
+#   python benchmarks/bench_memory.py --scale 100 --sessions 50 --budgets 1 16 256
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import make_data_dir  # noqa: E402
+
+OPTIONS = ('Top 5 teams', 'Top 10 teams', 'All Teams')
+
+
+def pick(at, page, rng):
+    # One random selection on a page, like a viewer playing with the widgets
+    if page.endswith("100-Match_Performance.py"):
+        at.selectbox(key='selectbox1').set_value(rng.choice(OPTIONS))
+    elif page.endswith("250-Team_Progression.py"):
+        years = at.select_slider(key='progression_years').options
+        lo, hi = sorted(rng.sample(range(len(years)), 2))
+        at.select_slider(key='progression_years').set_value((int(years[lo]), int(years[hi])))
+        at.slider(key='progression_teams').set_value(rng.choice([5, 10, 20]))
+    else:
+        rounds = at.multiselect(key='cards_rounds').options
+        at.multiselect(key='cards_rounds').set_value(rng.sample(rounds, rng.randint(1, len(rounds))))
+
+
+def child(sessions, steps):
+    from streamlit.testing.v1 import AppTest
+
+    from euro import memory
+
+    rng = random.Random(2024)
+    pages = ["pages/100-Match_Performance.py", "pages/250-Team_Progression.py", "pages/320-Card_Analytics.py"]
+    apps = []
+    times = []
+    for i in range(sessions):
+        page = pages[i % len(pages)]
+        at = AppTest.from_file(str(ROOT / page), default_timeout=120)
+        at.run()
+        apps.append((page, at))
+    for _ in range(steps):
+        for page, at in apps:
+            pick(at, page, rng)
+            start = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - start)
+    # What each session shows from the cache, like memory.current_session_bytes() inside the session
+    per_session = [sum(memory.cache.size(key) for key in set(at.session_state[memory.SESSION_KEY].values())) for _, at in apps]
+    stats = memory.cache.stats()
+    return {"p50_ms": float(np.percentile(times, 50)) * 1000, "p95_ms": float(np.percentile(times, 95)) * 1000,
+            "cache_mb": stats["bytes"] / 2**20, "evictions": stats["evictions"],
+            "session_kb_mean": float(np.mean(per_session)) / 1024, "session_kb_max": float(np.max(per_session)) / 1024,
+            "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of many sessions with the budgeted cache.")
+    parser.add_argument("--scale", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=30)
+    parser.add_argument("--steps", type=int, default=5, help="random selections per session")
+    parser.add_argument("--budgets", type=float, nargs="+", default=[1, 16, 256], help="cache budgets in MB")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.sessions, args.steps)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = make_data_dir(Path(tmp) / "data", args.scale)
+        print(f"scale x{args.scale}, {args.sessions} sessions, {args.steps} selections each")
+        print(f"{'budget MB':>10}{'p50 ms':>9}{'p95 ms':>9}{'cache MB':>10}{'evicted':>9}{'session KB':>12}{'max KB':>9}{'RSS MB':>9}")
+        for budget in args.budgets:
+            env = dict(os.environ, PYTHONPATH=str(ROOT), EURO_DATA_DIR=str(data_dir), EURO_STORE_DIR=str(Path(tmp) / "store"),
+                       EURO_CACHE_MB=str(budget), EURO_WATCH="0", EURO_WARMUP="0")
+            out = subprocess.run([sys.executable, __file__, "--child", "--sessions", str(args.sessions), "--steps", str(args.steps)],
+                                 cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+            result = json.loads(out.stdout.strip().splitlines()[-1])
+            print(f"{budget:>10g}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['cache_mb']:>10.1f}{result['evictions']:>9}"
+                  f"{result['session_kb_mean']:>12.1f}{result['session_kb_max']:>9.1f}{result['rss_mb']:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# Benchmark: rerun latency, peak memory and payload size of every page, driven headlessly.
+# Each page runs under Streamlit's AppTest against synthetic copies of the data folder scaled 1x, 100x and
+# 10,000x (see benchmarks/synthetic.py). The harness opens every tab and picks every selectbox option, a few
+# rounds over, timing each rerun. Every (page, scale) runs in its own process so the peak memory belongs to it.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_pages.py                                   # all pages, all scales
+#   python benchmarks/bench_pages.py --scales 1 100 --save bench.json  # keep the results as a baseline
+#   python benchmarks/bench_pages.py --baseline bench.json             # exit 1 if p95 got slower than the baseline
+#
+# The regression gate compares the p95 rerun latency of every (page, scale) with the baseline and fails when it
+# is more than --threshold slower (25% by default). Latencies under --floor-ms are never flagged, they are noise.
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Every page, with the key of its tabs when it has lazy tabs (see euro/layout.py)
+PAGES = {
+    "Welcome.py": None,
+    "pages/100-Match_Performance.py": "match_performance_tabs",
+    "pages/200-Tournaments_Statistics.py": "tournaments_tabs",
+    "pages/250-Team_Progression.py": None,
+    "pages/300-Penalty_Cards.py": "penalty_cards_tabs",
+    "pages/320-Card_Analytics.py": "card_analytics_tabs",
+    "pages/330-Euro_Simulator.py": "simulator_tabs",
+    "pages/350-How_To_Use.py": None,
+    "pages/400-Acknowledgments.py": None,
+}
+
+
+def payload_bytes(at):
+    # Bytes of the figures and tables the rerun sends to the browser
+    figures = sum(len(chart.proto.spec) for chart in at.get("plotly_chart"))
+    tables = sum(len(table.proto.arrow_data.data) for table in at.dataframe)
+    return figures + tables
+
+
+# Selectboxes with more options than this (a team out of thousands) only get this many, spread over the list
+MAX_OPTIONS = 5
+
+
+def spread(options):
+    if len(options) <= MAX_OPTIONS:
+        return list(options)
+    return [options[i] for i in np.linspace(0, len(options) - 1, MAX_OPTIONS).astype(int)]
+
+
+def exercise(at, tabs_key, record):
+    """Open every tab and pick every selectbox option (see spread()) and a few slider ranges, calling record() after each change."""
+    tab_labels = [tab.label for tab in at.tabs] if tabs_key else [None]
+    for label in tab_labels:
+
+        def rerun():
+            # AppTest does not send the selected tab back with the other widgets, so it is set again before every rerun
+            if label is not None:
+                at.session_state[tabs_key] = label
+            record(at)
+
+        rerun()
+        # Widgets are read after the tab switch, hidden tabs do not draw theirs
+        for selectbox in list(at.selectbox):
+            for option in spread(selectbox.options):
+                at.selectbox(key=selectbox.key).select(option)
+                rerun()
+        for select_slider in list(at.select_slider):
+            options = select_slider.options
+            if not isinstance(select_slider.value, (list, tuple)):
+                # A slider with a single value, like the number of simulated tournaments. AppTest lists the options
+                # as they are shown ("10,000"), but sets the value itself.
+                kind = type(select_slider.value)
+                for option in spread(options):
+                    value = kind(option.replace(",", "")) if kind in (int, float) else option
+                    at.select_slider(key=select_slider.key).set_value(value)
+                    rerun()
+                continue
+            for lower, upper in ((options[0], options[-1]), (options[len(options) // 2], options[-1])):
+                at.select_slider(key=select_slider.key).set_range(lower, upper)
+                rerun()
+
+
+def child(page, tabs_key, rounds):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    if at.exception:
+        raise SystemExit(f"{page} raised: {at.exception[0].message}")
+
+    latencies, payloads = [], [payload_bytes(at)]
+
+    def record(at):
+        start = time.perf_counter()
+        at.run()
+        latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise SystemExit(f"{page} raised: {at.exception[0].message}")
+        payloads.append(payload_bytes(at))
+
+    for _ in range(rounds):
+        exercise(at, tabs_key, record)
+    # On Linux ru_maxrss is in kilobytes
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"first": first, "latencies": latencies, "payloads": payloads, "peak_rss_mb": peak_rss}))
+
+
+def summarise(run):
+    latencies = np.array(run["latencies"] or [run["first"]]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "reruns": len(run["latencies"]), "first_ms": run["first"] * 1000,
+        "p50_ms": p50, "p95_ms": p95, "p99_ms": p99, "max_ms": latencies.max(),
+        "peak_rss_mb": run["peak_rss_mb"], "max_payload_kb": max(run["payloads"]) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", nargs="*", default=list(PAGES))
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--rounds", type=int, default=3, help="passes over every tab and option per page")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --save to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p95 slowdown against the baseline")
+    parser.add_argument("--floor-ms", type=float, default=20.0, help="p95 latencies below this never count as regressions")
+    args = parser.parse_args()
+
+    from synthetic import make_data_dir
+
+    results = {}
+    # Pages that crashed or did not rerun at all: they fail the run, whatever the baseline says
+    failures = []
+    print(f"{'page':<38}{'scale':>7}{'reruns':>8}{'first':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'peak MB':>9}{'payload KB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            data_dir = make_data_dir(Path(tmp) / f"x{scale}", scale)
+            env = dict(os.environ, EURO_DATA_DIR=str(data_dir), EURO_WARMUP="0")
+            for page in args.pages:
+                out = subprocess.run(
+                    [sys.executable, __file__, "--child", page, PAGES.get(page) or "", str(args.rounds)],
+                    capture_output=True, text=True, cwd=ROOT, env=env,
+                )
+                if out.returncode:
+                    print(f"{page:<38}{scale:>7}  failed: {out.stderr.strip().splitlines()[-1:]}")
+                    failures.append(f"{page}@{scale}: failed")
+                    continue
+                run = json.loads(out.stdout.strip().splitlines()[-1])
+                if not run["latencies"]:
+                    failures.append(f"{page}@{scale}: no reruns timed")
+                summary = summarise(run)
+                results[f"{page}@{scale}"] = summary
+                print(f"{page:<38}{scale:>7}{summary['reruns']:>8}{summary['first_ms']:>9.0f}{summary['p50_ms']:>8.1f}"
+                      f"{summary['p95_ms']:>8.1f}{summary['p99_ms']:>8.1f}{summary['peak_rss_mb']:>9.0f}{summary['max_payload_kb']:>12.1f}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+
+    if failures:
+        print("\nPages that failed:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = []
+        for key, summary in results.items():
+            before = baseline.get(key)
+            if before is None or summary["p95_ms"] < args.floor_ms:
+                continue
+            if summary["p95_ms"] > before["p95_ms"] * (1 + args.threshold):
+                regressions.append(f"{key}: p95 {before['p95_ms']:.1f} ms -> {summary['p95_ms']:.1f} ms")
+        if regressions:
+            print("\nRegressions against the baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"\nNo p95 regression above {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3] or None, int(sys.argv[4]))
+    else:
+        main()
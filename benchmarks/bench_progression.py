@@ -0,0 +1,40 @@
+# Benchmark: recomputing the Team Progression page statistics on big matrices.
+# The page recomputes best finish, appearances and streaks every time a slider moves, so this times
+# ProgressionMatrix.select() plus team_stats() on random matrices with thousands of teams and many tournaments.
+# The target is to stay under 50 ms per recompute.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_progression.py
+
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from euro import progression  # noqa: E402
+
+SIZES = [(36, 16), (1_000, 100), (5_000, 200), (20_000, 300)]
+
+
+def main(repeat=20):
+    rng = np.random.default_rng(2024)
+    print(f"{'teams':>8}{'tournaments':>13}{'p50 ms':>10}{'max ms':>10}")
+    for teams, tournaments in SIZES:
+        codes = rng.integers(0, len(progression.RESULT_CODES), size=(teams, tournaments), dtype=np.int8)
+        matrix = progression.ProgressionMatrix([f"Team {i}" for i in range(teams)], np.arange(1960, 1960 + tournaments), codes)
+        timings = []
+        for _ in range(repeat):
+            # A different year range every time, like a user dragging the slider
+            lo, hi = sorted(rng.integers(1960, 1960 + tournaments, size=2))
+            start = time.perf_counter()
+            stats = progression.team_stats(matrix.select(lo, hi))
+            stats[stats['Appearances'] >= 1]
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"{teams:>8}{tournaments:>13}{np.median(timings):>10.2f}{max(timings):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+# Benchmark: how many concurrent viewers one server holds, over real Streamlit websocket sessions.
+# Starts the app (streamlit run, or several workers with euro/serve.py) on synthetic data (see benchmarks/synthetic.py)
+# and opens --sessions simulated viewers against it. Every viewer talks to the server like a browser does: it
+# connects to /_stcore/stream, asks for a page, and then keeps clicking around for --duration seconds, waiting a
+# random think time between clicks:
+#   - switching the round tabs of the Penalty Cards page,
+#   - switching tabs and flipping the Top 5/Top 10/All selectboxes of the Match Performance and Tournaments pages,
+#   - now and then moving on to another of these pages.
+# The widgets are found in the messages of the server, so the viewers click what the page really shows.
+# For every number of sessions it reports the reruns per second, the p50/p95/p99 latency from the click to the end
+# of the rerun, failed reruns, and the CPU and peak RSS of the server processes (read from /proc, Linux only).
+# Every --modes entry starts its own server, so caching and serving setups can be compared run by run:
+#   default                         the app as it is configured
+#   EURO_COMPACT=0                  any EURO_* settings, separated by commas
+#   workers=2                       two server processes behind the sessions, see euro/serve.py
+# The viewers run in this process with asyncio. On a small machine they take some CPU from the server as well.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_sessions.py
+#   python benchmarks/bench_sessions.py --sessions 1 10 50 100 --duration 30 --modes default EURO_CACHE_MB=1 workers=2
+#   python benchmarks/bench_sessions.py --url ws://localhost:8501 --sessions 20     # a server that is already running
+# https://websockets.readthedocs.io/en/stable/reference/asyncio/client.html
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import make_data_dir  # noqa: E402
+
+# The pages the viewers visit (their URL path), and how often they open each one
+PAGES = {"Penalty_Cards": 2, "Match_Performance": 1, "Tournaments_Statistics": 1}
+# Chance that a click goes to another page instead of a widget of the current one
+PAGE_SWITCH = 0.15
+
+
+class Viewer:
+    """One simulated browser session on a websocket."""
+
+    def __init__(self, url, rng):
+        self.url = url
+        self.rng = rng
+        self.ws = None
+        self.page = None
+        # Widgets drawn by the last rerun: id -> ("tabs", labels) or ("selectbox", options)
+        self.widgets = {}
+        # What the browser sends back with every rerun: id -> (proto field, value)
+        self.states = {}
+        # Hashes of the messages the browser keeps, the server then only sends a reference to them
+        self.cached = set()
+
+    async def connect(self):
+        import websockets
+
+        self.ws = await websockets.connect(f"{self.url}/_stcore/stream", subprotocols=["streamlit"], max_size=None)
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+
+    async def rerun(self):
+        """Send a rerun with the current widget states and wait for the script to finish. Returns (seconds, ok, bytes)."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        back = BackMsg()
+        client = back.rerun_script
+        client.page_name = self.page
+        client.cached_message_hashes.extend(self.cached)
+        for widget_id, (field, value) in self.states.items():
+            state = client.widget_states.widgets.add()
+            state.id = widget_id
+            setattr(state, field, value)
+        start = time.perf_counter()
+        await self.ws.send(back.SerializeToString())
+
+        widgets = {}
+        # delta path of a tab container -> (its id, its labels)
+        containers = {}
+        ok = True
+        received = 0
+        while True:
+            raw = await self.ws.recv()
+            received += len(raw)
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            if msg.metadata.cacheable:
+                self.cached.add(msg.hash)
+            kind = msg.WhichOneof("type")
+            if kind == "script_finished":
+                break
+            if kind != "delta":
+                continue
+            path = tuple(msg.metadata.delta_path)
+            delta = msg.delta
+            if delta.WhichOneof("type") == "add_block":
+                block = delta.add_block
+                if block.WhichOneof("type") == "tab_container" and block.tab_container.id:
+                    containers[path] = (block.tab_container.id, [])
+                elif block.WhichOneof("type") == "tab" and path[:-1] in containers:
+                    containers[path[:-1]][1].append(block.tab.label)
+            elif delta.WhichOneof("type") == "new_element":
+                element = delta.new_element
+                if element.WhichOneof("type") == "selectbox":
+                    widgets[element.selectbox.id] = ("selectbox", list(element.selectbox.options))
+                elif element.WhichOneof("type") == "exception":
+                    ok = False
+        seconds = time.perf_counter() - start
+        for widget_id, labels in containers.values():
+            widgets[widget_id] = ("tabs", labels)
+        self.widgets = widgets
+        # Like the browser, only the widgets on the page send their state
+        self.states = {widget_id: state for widget_id, state in self.states.items() if widget_id in widgets}
+        return seconds, ok, received
+
+    def open_page(self):
+        choices = [page for page in PAGES if page != self.page]
+        self.page = self.rng.choices(choices, weights=[PAGES[page] for page in choices])[0]
+        self.widgets = {}
+        self.states = {}
+
+    def click(self):
+        """Change one thing on the page like a viewer would. Returns False when it opened another page."""
+        if not self.widgets or self.rng.random() < PAGE_SWITCH:
+            self.open_page()
+            return False
+        widget_id = self.rng.choice(sorted(self.widgets))
+        _, values = self.widgets[widget_id]
+        current = self.states.get(widget_id, (None, values[0]))[1]
+        choices = [value for value in values if value != current] or values
+        self.states[widget_id] = ("string_value", self.rng.choice(choices))
+        return True
+
+
+async def viewer(url, seed, deadline, think, results):
+    rng = random.Random(seed)
+    session = Viewer(url, rng)
+    try:
+        await session.connect()
+        session.open_page()
+        # The viewers arrive over the first think time instead of all at once
+        await asyncio.sleep(rng.uniform(0, think))
+        while time.perf_counter() < deadline:
+            seconds, ok, received = await session.rerun()
+            results["latencies"].append(seconds)
+            results["bytes"] += received
+            if not ok:
+                results["errors"] += 1
+            await asyncio.sleep(rng.expovariate(1 / think) if think else 0)
+            session.click()
+    except Exception as error:
+        results["errors"] += 1
+        results["failures"].append(repr(error))
+    finally:
+        await session.close()
+
+
+async def run_sessions(urls, sessions, duration, think):
+    results = {"latencies": [], "errors": 0, "bytes": 0, "failures": []}
+    deadline = time.perf_counter() + duration
+    # Sessions stick to one server process, like behind a load balancer with sticky sessions
+    await asyncio.gather(*[viewer(urls[i % len(urls)], i, deadline, think, results) for i in range(sessions)])
+    return results
+
+
+def _tree(pid):
+    # The process and all of its children (streamlit run, the workers of euro/serve.py, figure worker processes)
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children = (task / "children").read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            pids += _tree(int(child))
+    return pids
+
+
+def cpu_seconds(pid):
+    total = 0
+    for each in _tree(pid):
+        try:
+            fields = Path(f"/proc/{each}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+        total += int(fields[11]) + int(fields[12])
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def rss_mb(pid):
+    total = 0
+    for each in _tree(pid):
+        try:
+            total += int(Path(f"/proc/{each}/statm").read_text().split()[1])
+        except OSError:
+            continue
+    return total * resource.getpagesize() / 2**20
+
+
+async def measure(urls, pid, sessions, duration, think):
+    """Run the sessions while sampling the server's CPU time and RSS."""
+    peak = [0.0]
+
+    async def sample():
+        while True:
+            peak[0] = max(peak[0], rss_mb(pid))
+            await asyncio.sleep(0.25)
+
+    cpu = cpu_seconds(pid) if pid else 0.0
+    start = time.perf_counter()
+    sampler = asyncio.create_task(sample()) if pid else None
+    results = await run_sessions(urls, sessions, duration, think)
+    wall = time.perf_counter() - start
+    if sampler is not None:
+        sampler.cancel()
+    latencies = np.array(results["latencies"] or [np.nan]) * 1000
+    return {
+        "sessions": sessions, "reruns": len(results["latencies"]), "per_second": len(results["latencies"]) / wall,
+        "p50_ms": float(np.percentile(latencies, 50)), "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)), "errors": results["errors"],
+        "cpu_percent": (cpu_seconds(pid) - cpu) / wall * 100 if pid else None, "rss_mb": peak[0] if pid else None,
+        "mb_received": results["bytes"] / 2**20, "failures": results["failures"][:3],
+    }
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(("localhost", 0))
+        return probe.getsockname()[1]
+
+
+def parse_mode(mode):
+    """Turn a --modes entry into (number of server processes, environment variables)."""
+    workers, env = 1, {}
+    if mode != "default":
+        for setting in mode.split(","):
+            key, value = setting.split("=", 1)
+            if key == "workers":
+                workers = int(value)
+            else:
+                env[key] = value
+    return workers, env
+
+
+def start_server(mode, data_dir, store_dir):
+    """Start the app for a mode and wait until it is up. Returns (process, websocket URLs)."""
+    workers, settings = parse_mode(mode)
+    env = dict(os.environ, PYTHONPATH=str(ROOT), EURO_DATA_DIR=str(data_dir), EURO_STORE_DIR=str(store_dir), **settings)
+    port = _free_port()
+    if workers == 1:
+        command = [sys.executable, "-m", "streamlit", "run", "Welcome.py", "--server.port", str(port), "--server.headless", "true"]
+        ports = [port]
+    else:
+        command = [sys.executable, "-m", "euro.serve", "--workers", str(workers), "--port", str(port)]
+        ports = list(range(port, port + workers))
+    command += ["--browser.gatherUsageStats", "false"]
+    # In a process group of its own, so stop_server() stops the workers of euro/serve.py with it
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    for port in ports:
+        for _ in range(600):
+            try:
+                urllib.request.urlopen(f"http://localhost:{port}/_stcore/health", timeout=1)
+                break
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError(f"The server of mode {mode!r} exited with code {server.returncode}")
+                time.sleep(0.1)
+    return server, [f"ws://localhost:{port}" for port in ports]
+
+
+def stop_server(server):
+    os.killpg(server.pid, signal.SIGTERM)
+    server.wait()
+    # The workers of euro/serve.py take a moment longer, the next mode must not share the CPU with them
+    for _ in range(100):
+        try:
+            os.killpg(server.pid, 0)
+        except ProcessLookupError:
+            return
+        time.sleep(0.1)
+
+
+async def warm(urls):
+    # One viewer opens every page on every server once, so the first measured sessions do not pay for the cold start
+    for url in urls:
+        session = Viewer(url, random.Random(0))
+        await session.connect()
+        for page in PAGES:
+            session.page = page
+            await session.rerun()
+        await session.close()
+
+
+def report(mode, result):
+    cpu = "-" if result["cpu_percent"] is None else f"{result['cpu_percent']:.0f}"
+    rss = "-" if result["rss_mb"] is None else f"{result['rss_mb']:.0f}"
+    print(f"{mode:>20}{result['sessions']:>10}{result['reruns']:>8}{result['per_second']:>10.1f}{result['p50_ms']:>9.0f}"
+          f"{result['p95_ms']:>9.0f}{result['p99_ms']:>9.0f}{result['errors']:>8}{cpu:>7}{rss:>8}{result['mb_received']:>9.1f}")
+    for failure in result["failures"]:
+        print(f"{'':>20}  {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent viewers over Streamlit websocket sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--duration", type=float, default=15, help="seconds of clicking for every number of sessions")
+    parser.add_argument("--think", type=float, default=1.0, help="mean seconds between two clicks of a viewer (0: none)")
+    parser.add_argument("--modes", nargs="+", default=["default"])
+    parser.add_argument("--scale", type=int, default=1, help="size of the synthetic data")
+    parser.add_argument("--url", help="websocket URL of a running app, e.g. ws://localhost:8501, instead of starting one")
+    parser.add_argument("--pid", type=int, help="with --url: the server's process id, for its CPU and RSS")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    print(f"{'mode':>20}{'sessions':>10}{'reruns':>8}{'per s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}"
+          f"{'CPU %':>7}{'RSS MB':>8}{'MB recv':>9}")
+    results = []
+    if args.url:
+        asyncio.run(warm([args.url]))
+        for sessions in args.sessions:
+            result = dict(asyncio.run(measure([args.url], args.pid, sessions, args.duration, args.think)), mode=args.url)
+            report(args.url, result)
+            results.append(result)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = make_data_dir(Path(tmp) / "data", args.scale)
+            for i, mode in enumerate(args.modes):
+                # Every mode imports the data into a store of its own
+                server, urls = start_server(mode, data_dir, Path(tmp) / f"store-{i}")
+                try:
+                    asyncio.run(warm(urls))
+                    for sessions in args.sessions:
+                        result = dict(asyncio.run(measure(urls, server.pid, sessions, args.duration, args.think)), mode=mode)
+                        report(mode, result)
+                        results.append(result)
+                finally:
+                    stop_server(server)
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
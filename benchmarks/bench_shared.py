@@ -0,0 +1,80 @@
+# Benchmark: memory and warm-up time of several server processes on one host.
+# Starts 1, 2 and 4 worker processes on scaled synthetic data, all pointed at the same store folder, and lets each
+# one warm up like a fresh Streamlit worker does (datasets, rankings, card partitions, progression matrix and every
+# figure). It reports the warm-up time of the slowest worker and the summed proportional set size (PSS) of the
+# workers, which splits shared pages between the processes that map them. With the shared store the sum should
+# stay about flat as workers are added; with EURO_SHARED=0 every worker builds and holds its own copy.
+#
+# Run it from the repository root (Linux only, PSS comes from /proc):
+#   python benchmarks/bench_shared.py
+#   python benchmarks/bench_shared.py --scale 2000 --workers 1 2 4 8
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synthetic import make_data_dir  # noqa: E402
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from euro import warmup
+warmup._warm()
+seconds = time.perf_counter() - start
+sys.stdout.write(json.dumps({"seconds": seconds}) + "\\n")
+sys.stdout.flush()
+sys.stdin.readline()
+"""
+
+
+def pss_kb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run(data_dir, store_dir, workers, shared):
+    env = dict(os.environ, PYTHONPATH=str(ROOT), EURO_DATA_DIR=str(data_dir), EURO_STORE_DIR=str(store_dir),
+               EURO_SHARED="1" if shared else "0", EURO_WATCH="0")
+    procs = [subprocess.Popen([sys.executable, "-c", CHILD], cwd=ROOT, env=env, text=True,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE) for _ in range(workers)]
+    # Each worker reports when it is warm and then waits, so all of them are alive when the memory is measured
+    seconds = [json.loads(proc.stdout.readline())["seconds"] for proc in procs]
+    pss = sum(pss_kb(proc.pid) for proc in procs)
+    for proc in procs:
+        proc.stdin.write("\n")
+        proc.stdin.close()
+        proc.wait()
+    return max(seconds), pss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of several workers with and without the shared store.")
+    parser.add_argument("--scale", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = make_data_dir(Path(tmp) / "data", args.scale)
+        print(f"scale x{args.scale}")
+        print(f"{'mode':<10}{'workers':>8}{'warm s':>9}{'PSS MB':>9}{'MB/worker':>11}")
+        for shared in (False, True):
+            for workers in args.workers:
+                # A fresh store every time, so the first worker really has to build everything
+                store_dir = Path(tmp) / f"store-{int(shared)}-{workers}"
+                seconds, pss = run(data_dir, store_dir, workers, shared)
+                mode = "shared" if shared else "private"
+                print(f"{mode:<10}{workers:>8}{seconds:>9.2f}{pss:>9.0f}{pss / workers:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# Benchmark: tournaments per second of the Euro simulation in euro/simulation.py.
+# Simulates the default field of 24 teams with a few batch sizes in one process, and then with the tournaments
+# split over several processes. The cached run() is timed too: the first call simulates, the next ones are lookups.
+#
+# Run it from the repository root:
+#   python benchmarks/bench_simulation.py
+#   python benchmarks/bench_simulation.py --sims 2000000 --jobs 1 2 4
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from euro import simulation  # noqa: E402
+
+
+def rate(goals, groups, sims, jobs=1):
+    start = time.perf_counter()
+    simulation.simulate(goals, groups, sims, jobs=jobs)
+    return sims / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournaments per second of the Euro simulation.")
+    parser.add_argument("--sims", type=int, default=1_000_000)
+    parser.add_argument("--batches", type=int, nargs="+", default=[2_000, 20_000, 100_000])
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    teams = simulation.default_teams()
+    goals = simulation.expected_goals(teams)
+    groups = simulation.draw_groups(teams)
+
+    print(f"{args.sims:,} tournaments of {len(teams)} teams")
+    print(f"{'batch':>10}{'jobs':>6}{'per second':>14}")
+    batch = simulation.BATCH
+    for simulation.BATCH in args.batches:
+        print(f"{simulation.BATCH:>10}{1:>6}{rate(goals, groups, args.sims):>14,.0f}")
+    simulation.BATCH = batch
+    for jobs in args.jobs[1:] if args.jobs[0] == 1 else args.jobs:
+        print(f"{simulation.BATCH:>10}{jobs:>6}{rate(goals, groups, args.sims, jobs):>14,.0f}")
+
+    start = time.perf_counter()
+    simulation.run(sims=args.sims)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    simulation.run(sims=args.sims)
+    print(f"run(): first call {first * 1000:.0f} ms, cached call {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Benchmark: time-to-first-render of every page in a fresh server process.
+# Each measurement starts a new Python process, imports Streamlit and renders one page headlessly with
+# Streamlit's AppTest, so it includes everything a cold container pays for: imports, importing the CSVs
+# and building the first figures.
+#
+# Two modes are measured for every page:
+#   cold    - no warm-up (EURO_WARMUP=0), the visitor's first render does all the work
+#   warmed  - the background warm-up from euro/warmup.py has finished before the visitor arrives,
+#             the time the warm-up itself took is reported as "boot ms"
+#
+# Run it from the repository root:
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --repeat 5 Welcome.py pages/100-Match_Performance.py
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPTS = ["Welcome.py"] + sorted(str(path.relative_to(ROOT)) for path in (ROOT / "pages").glob("*.py"))
+
+
+def child(script, mode):
+    # Runs in its own process, the clock starts before Streamlit is imported
+    start = time.perf_counter()
+    sys.path.insert(0, str(ROOT))
+    from streamlit.testing.v1 import AppTest
+    imported = time.perf_counter()
+
+    boot = 0.0
+    if mode == "warmed":
+        from euro import warmup
+        warmup.start()
+        warmup.wait()
+        boot = time.perf_counter() - imported
+
+    at = AppTest.from_file(str(ROOT / script), default_timeout=120)
+    render_start = time.perf_counter()
+    at.run()
+    first_render = time.perf_counter() - render_start
+    if at.exception:
+        raise SystemExit(f"{script} raised: {at.exception[0].message}")
+
+    rerun_start = time.perf_counter()
+    at.run()
+    rerun = time.perf_counter() - rerun_start
+    print(json.dumps({"import": imported - start, "boot": boot, "first_render": first_render, "rerun": rerun}))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh processes per measurement, the median is reported")
+    args = parser.parse_args()
+
+    print(f"{'page':<38}{'mode':<8}{'import ms':>11}{'boot ms':>9}{'first render ms':>17}{'rerun ms':>10}")
+    for script in args.scripts:
+        for mode in ("cold", "warmed"):
+            env = dict(os.environ, EURO_WARMUP="0" if mode == "cold" else "1")
+            runs = []
+            for _ in range(args.repeat):
+                out = subprocess.run([sys.executable, __file__, "--child", script, mode],
+                                     check=True, capture_output=True, text=True, cwd=ROOT, env=env)
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            median = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            print(f"{script:<38}{mode:<8}{median['import']:>11.0f}{median['boot']:>9.0f}{median['first_render']:>17.0f}{median['rerun']:>10.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,51 @@
+# Synthetic datasets for the benchmarks.
+# make_data_dir() writes a copy of every CSV in the data folder, scaled up by a factor, into another folder.
+# Point the app at it with EURO_DATA_DIR to see how the pages behave with bigger data.
+#
+# Teams and nations are copied with a numbered suffix ("Germany 2"), so top-N selections, groupings and the
+# progression matrix really get that many more rows. Red cards keep their countries and only get more events,
+# like a longer history of the same competition.
+
+import csv
+import shutil
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# The column holding the entity name in each file, copies of a row get a suffix in that column
+NAME_COLUMNS = {
+    "100-overall_team_records.csv": "Team",
+    "110-team_medals.csv": "Team",
+    "210-host_countries.csv": "Nation",
+    "220-red_cards.csv": "Player",
+    "400-team_results.csv": "Team",
+}
+
+
+def scale_csv(src, dst, factor, name_column):
+    with open(src, newline="", encoding="utf-8") as source:
+        reader = csv.reader(source)
+        header = next(reader)
+        rows = list(reader)
+    column = header.index(name_column)
+    with open(dst, "w", newline="", encoding="utf-8") as target:
+        writer = csv.writer(target)
+        writer.writerow(header)
+        writer.writerows(rows)
+        for copy in range(2, factor + 1):
+            for row in rows:
+                row = list(row)
+                row[column] = f"{row[column]} {copy}"
+                writer.writerow(row)
+
+
+def make_data_dir(target, factor):
+    """Write every CSV of the data folder, scaled by factor, into target and return its path."""
+    target = Path(target)
+    target.mkdir(parents=True, exist_ok=True)
+    for file_name, name_column in NAME_COLUMNS.items():
+        if factor == 1:
+            shutil.copyfile(DATA_DIR / file_name, target / file_name)
+        else:
+            scale_csv(DATA_DIR / file_name, target / file_name, factor, name_column)
+    return target
@@ -0,0 +1,2 @@
+# Shared code for the UEFA Euro pages.
+# The pages under pages/ import from here so that data loading, caching and chart building live in one place.
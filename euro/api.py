@@ -0,0 +1,258 @@
+# Read-only HTTP API for the datasets.
+# Dashboards and bots that want the numbers should not have to go through the Streamlit pages, which rerun a
+# whole script for every request. This is a small async app on the same data layer, so it serves the same
+# snapshots, rankings and card partitions the pages use, as JSON or as an Arrow IPC stream.
+# Every response carries an ETag made from the dataset version and the query, so clients can revalidate with
+# If-None-Match and get a 304 without a body, and the encoded responses are cached until the dataset changes.
+# Starlette and uvicorn are already installed with Streamlit.
+# https://www.starlette.io/
+# https://www.uvicorn.org/
+# https://arrow.apache.org/docs/format/Columnar.html#ipc-streaming-format
+#
+# Run it with: python -m euro.api --port 8600
+#
+#   GET /datasets                                      names, versions and columns of the datasets
+#   GET /datasets/team_records?top=Top 5 teams&sort=Total points&columns=Team,Total points
+#   GET /datasets/red_cards?filter=Round:Final&filter=Card Color:Red&format=arrow
+#   GET /cards?round=Final&color=Red                   cards per country, like the Penalty Cards pie charts
+
+import contextlib
+import datetime
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from euro import cards, data, figures, ranking, watcher
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+JSON_MEDIA_TYPE = "application/json"
+
+
+class QueryError(ValueError):
+    """A query parameter that does not fit the dataset, answered with 400 Bad Request."""
+
+
+class ResponseCache:
+    """LRU cache of encoded responses, keyed by the request and the versions of the datasets it reads."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+        entry = build()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "maxsize": self.maxsize}
+
+
+cache = ResponseCache()
+
+
+def _etag(versions, key):
+    # Weak enough to be cheap, strong enough to change whenever the dataset or the query does
+    digest = hashlib.sha1(repr((versions, key)).encode()).hexdigest()[:16]
+    return f'"{digest}"'
+
+
+def _format(request):
+    fmt = request.query_params.get("format")
+    if fmt is None:
+        fmt = "arrow" if ARROW_MEDIA_TYPE in request.headers.get("accept", "") else "json"
+    if fmt not in ("json", "arrow"):
+        raise QueryError(f"Unknown format {fmt!r}, use json or arrow")
+    return fmt
+
+
+def _encode(df, fmt):
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), ARROW_MEDIA_TYPE
+    return df.to_json(orient="records", date_format="iso", force_ascii=False).encode(), JSON_MEDIA_TYPE
+
+
+def _cached_response(request, names, key, build):
+    """Answer a request from the cache, with a 304 if the client already has this version."""
+    fmt = _format(request)
+    versions = tuple(data.version(name) for name in names)
+    etag = _etag(versions, (key, fmt))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    body, media_type = cache.get((versions, key, fmt), lambda: _encode(build(), fmt))
+    return Response(body, media_type=media_type, headers=headers)
+
+
+def _column(df, column):
+    if column not in df.columns:
+        raise QueryError(f"Unknown column {column!r}, expected one of {', '.join(df.columns)}")
+    return column
+
+
+def _sortable(df, column):
+    # Lists (like the years in host_countries) have no order that pandas can sort by
+    if df[_column(df, column)].map(pd.api.types.is_list_like).any():
+        raise QueryError(f"{column} holds lists and can't be sorted")
+    return column
+
+
+def _filter_value(values, column, value):
+    # The query string is text, turn it into what the column holds so == can match
+    if values.map(pd.api.types.is_list_like).any():
+        raise QueryError(f"{column} holds lists and can't be filtered")
+    # Numbers in a query string are text, compare them as numbers for the numeric columns
+    if values.dtype.kind in "iuf":
+        try:
+            return float(value)
+        except ValueError:
+            raise QueryError(f"{column} is numeric, got {value!r}") from None
+    # Dates come out of the Arrow store as datetime.date objects
+    if values.map(lambda v: isinstance(v, datetime.date)).any():
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            raise QueryError(f"{column} holds dates, use YYYY-MM-DD, got {value!r}") from None
+    return value
+
+
+def query(name, columns=None, filters=(), sort=None, ascending=False, top=None):
+    """Return the rows of a dataset that a request asks for.
+
+    filters are (column, value) pairs that must all match. Rows are sorted by a column (highest first
+    unless ascending) and cut to the first top rows, where top is a number or a selectbox option like
+    'Top 5 teams'. Sorting a numeric column highest first without filters is a slice of the ranking
+    the pages use.
+    """
+    df = data.load(name)
+    n = figures.top_n(top)
+    if n is not None:
+        try:
+            n = int(n)
+        except ValueError:
+            raise QueryError(f"top must be a number or one of {', '.join(figures.TOP_OPTIONS)}") from None
+        if n < 1:
+            raise QueryError(f"top must be at least 1, got {n}")
+    if sort is not None:
+        _sortable(df, sort)
+    if filters:
+        mask = True
+        for column, value in filters:
+            values = df[_column(df, column)]
+            mask = mask & (values == _filter_value(values, column, value))
+        df = df[mask]
+    rank = ranking.index(name)
+    if sort in rank.order and not ascending and not filters:
+        df = rank.top(sort, n)
+    else:
+        if sort is not None:
+            df = df.sort_values(sort, ascending=ascending, kind="stable")
+        df = df.head(n) if n is not None else df
+    if columns:
+        df = df[[_column(df, column) for column in columns]]
+    return df
+
+
+# The data layer blocks: it maps Arrow files, validates new imports, takes the shared file locks and filters and
+# sorts with pandas. The handlers hand that to Starlette's thread pool, so one slow query does not hold up the
+# event loop and every other request with it.
+# https://www.starlette.io/threadpool/
+
+
+def _datasets():
+    return {name: {"version": data.version(name), "columns": list(data.load(name).columns)} for name in data.DATASETS}
+
+
+async def list_datasets(request):
+    return JSONResponse(await run_in_threadpool(_datasets))
+
+
+async def get_dataset(request):
+    name = request.path_params["name"]
+    if name not in data.DATASETS:
+        return JSONResponse({"error": f"Unknown dataset {name!r}"}, status_code=404)
+    params = request.query_params
+    columns = tuple(column for column in params.get("columns", "").split(",") if column)
+    filters = tuple(tuple(item.split(":", 1)) for item in params.getlist("filter"))
+    if any(len(item) != 2 for item in filters):
+        raise QueryError("filter must look like Column:value")
+    sort = params.get("sort")
+    ascending = params.get("order", "desc") == "asc"
+    top = params.get("top")
+    key = ("dataset", name, columns, filters, sort, ascending, top)
+    return await run_in_threadpool(_cached_response, request, (name,), key,
+                                   lambda: query(name, columns, filters, sort, ascending, top))
+
+
+async def get_cards(request):
+    round_name = request.query_params.get("round", cards.ROUNDS[0])
+    card_color = request.query_params.get("color", cards.CARD_COLORS[0])
+    if round_name not in cards.ROUNDS or card_color not in cards.CARD_COLORS:
+        raise QueryError(f"round must be one of {', '.join(cards.ROUNDS)} and color one of {', '.join(cards.CARD_COLORS)}")
+
+    def build():
+        counts = cards.country_counts(round_name, card_color)
+        # No cards of this colour in this round, answer with an empty list like the page shows no chart
+        return counts if counts is not None else pd.DataFrame(columns=['Country', 'Count'])
+
+    return await run_in_threadpool(_cached_response, request, ("red_cards",), ("cards", round_name, card_color), build)
+
+
+async def bad_query(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Keep the snapshots up to date in the background, so requests never read a file themselves
+    watcher.start()
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/datasets", list_datasets),
+        Route("/datasets/{name}", get_dataset),
+        Route("/cards", get_cards),
+    ],
+    exception_handlers={QueryError: bad_query},
+    lifespan=lifespan,
+)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the datasets over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    args = parser.parse_args()
+    # One process on one event loop, the data layer runs on its thread pool (see list_datasets)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,182 @@
+# Rollup cube of the red cards for the Card Analytics page.
+# The page filters the cards by tournament, round, colour and team, and shows them by minute, by tournament and
+# by the result of the match. Filtering and grouping the card events again for every combination gets slow once
+# the dataset has millions of events from many competitions. Instead every column the page uses is encoded as
+# small integers once per dataset version, and one np.bincount over the combined codes counts the cards in every
+# cell of a (tournament, round, colour, minute, result) cube. Any filter combination is then a slice and a
+# sum of that cube, which costs the same no matter how many card events there are.
+# The teams are not an axis of the dense cube: with thousands of teams and hundreds of tournaments most of those
+# cells would be empty, and the cube would take gigabytes. Every team only keeps the cells it has cards in, and
+# the cube of a team is rolled up from those when the page asks for it.
+# https://numpy.org/doc/stable/reference/generated/numpy.bincount.html
+# https://numpy.org/doc/stable/reference/generated/numpy.ravel_multi_index.html
+
+import numpy as np
+import pandas as pd
+
+from euro import data, memory, payload, profiling, shared
+
+# The axes of the cube, in order. Teams are kept separately, see CardCube.
+AXES = ("tournament", "round", "color", "minute", "result")
+
+# Minute buckets of 15 minutes: the upper edge of every bucket but the last, which takes extra time after 105'.
+# Cards in stoppage time are recorded as 45' or 90' in the data, so they fall in the bucket that ends there.
+MINUTE_EDGES = np.array([15, 30, 45, 60, 75, 90, 105])
+MINUTE_LABELS = ["1-15", "16-30", "31-45", "46-60", "61-75", "76-90", "91-105", "106-120"]
+
+# The data only has the final score of the match, seen from the side of the team whose player got the card.
+# The score at the moment of the card is not recorded, so the page breaks the cards down by the final result.
+RESULT_LABELS = ["Lost by 2+", "Lost by 1", "Drew", "Won by 1", "Won by 2+"]
+
+
+class CardCube:
+    """Number of cards for every combination of tournament, round, colour, minute bucket and result, for all teams and per team.
+
+    labels[axis] holds the value of every position along an axis (and labels["team"] the teams), counts is the
+    dense cube of card counts of all teams. The counts of the teams are sparse: team_cells holds
+    team * cells + cell for every cell a team has cards in, sorted, and team_counts the cards in it.
+    """
+
+    def __init__(self, labels, counts, team_cells, team_counts):
+        self.labels = labels
+        self.counts = counts
+        self.team_cells = team_cells
+        self.team_counts = team_counts
+        self._positions = {axis: {label: i for i, label in enumerate(values.tolist())} for axis, values in labels.items()}
+
+    def _select(self, axis, values):
+        # Labels that are not in the cube have no cards, so they are simply left out
+        positions = self._positions[axis]
+        return [positions[value] for value in values if value in positions]
+
+    def team_counts_of(self, team):
+        """Return the dense cube of one team (by position in labels["team"]), rolled up from its sparse cells."""
+        cells = self.counts.size
+        # The cells of a team are one run of the sorted team_cells
+        lo, hi = np.searchsorted(self.team_cells, [team * cells, (team + 1) * cells])
+        counts = np.bincount(self.team_cells[lo:hi] - team * cells, weights=self.team_counts[lo:hi], minlength=cells)
+        return counts.astype(self.counts.dtype).reshape(self.counts.shape)
+
+    def query(self, keep=(), **filters):
+        """Return the card counts summed over every axis not in keep, after filtering axes by their labels.
+
+        For example query(("minute",), round=["Final"], color=["Red"]) gives the red cards of the finals per minute bucket.
+        A team filter sums the cubes of those teams; keeping "team" stacks them (all teams if there is no team filter).
+        """
+        teams = filters.get("team")
+        if "team" in keep:
+            positions = range(len(self.labels["team"])) if teams is None else sorted(self._select("team", teams))
+            counts = np.array([self.team_counts_of(team) for team in positions]).reshape(-1, *self.counts.shape)
+            axes = ("team",) + AXES
+        elif teams is not None:
+            counts = sum((self.team_counts_of(team) for team in self._select("team", teams)), np.zeros_like(self.counts))
+            axes = AXES
+        else:
+            counts, axes = self.counts, AXES
+        for axis, values in filters.items():
+            if values is None or axis not in axes or axis == "team":
+                continue
+            counts = np.take(counts, sorted(self._select(axis, values)), axis=axes.index(axis))
+        drop = tuple(i for i, axis in enumerate(axes) if axis not in keep)
+        counts = counts.sum(axis=drop)
+        # The kept axes come back in the order they were asked for
+        order = sorted(keep, key=axes.index)
+        return np.moveaxis(counts, [order.index(axis) for axis in keep], range(len(keep)))
+
+    def nbytes(self):
+        """Return the bytes of all the counts, dense and sparse."""
+        return self.counts.nbytes + self.team_cells.nbytes + self.team_counts.nbytes
+
+    @profiling.timed("filter")
+    def frame(self, axis, by=None, **filters):
+        """Return the counts along one axis as a DataFrame, with one column per label of 'by' if given."""
+        keep = (axis,) if by is None else (axis, by)
+        counts = self.query(keep, **filters)
+        index = pd.Index(self._labels(axis, filters.get(axis)), name=axis.capitalize())
+        if by is None:
+            return pd.DataFrame({'Cards': counts}, index=index).reset_index()
+        return pd.DataFrame(counts, index=index, columns=self._labels(by, filters.get(by))).reset_index()
+
+    def _labels(self, axis, values):
+        # The labels left on an axis after filtering it, in cube order
+        labels = self.labels[axis].tolist()
+        return labels if values is None else [labels[i] for i in sorted(self._select(axis, values))]
+
+
+def _codes(values):
+    # The distinct values in sorted order and every value's position among them.
+    # factorize hashes the values instead of sorting all of them, which matters for millions of team names.
+    codes, labels = pd.factorize(values, sort=True)
+    # Text labels become fixed-width numpy strings, so the cube can be memory-mapped, see euro/shared.py
+    labels = np.asarray(labels) if labels.dtype.kind in "iuf" else np.asarray(labels, dtype=str)
+    return labels, codes
+
+
+def encode(cards):
+    """Build the CardCube of a red cards table."""
+    tournaments, tournament_codes = _codes(cards['Tournament'])
+    # Rounds go in the order of the competition, which 'Round-Value' gives
+    rounds = cards.sort_values('Round-Value', kind='stable')['Round'].drop_duplicates().to_numpy(dtype=str)
+    round_codes = pd.Categorical(cards['Round'], categories=rounds).codes
+    colors, color_codes = _codes(cards['Card Color'])
+    teams, team_codes = _codes(cards['Representing'])
+    minute_codes = np.searchsorted(MINUTE_EDGES, cards['Time of card'].to_numpy(), side='left')
+    margin = (cards['Team goals'] - cards['Opponent goals']).to_numpy()
+    result_codes = np.clip(margin, -2, 2) + 2
+
+    labels = {"tournament": tournaments, "round": rounds, "color": colors, "team": teams,
+              "minute": np.array(MINUTE_LABELS), "result": np.array(RESULT_LABELS)}
+    shape = tuple(len(labels[axis]) for axis in AXES)
+    # One linear cell number per card, and one pass of bincount counts them all
+    cells = np.ravel_multi_index((tournament_codes, round_codes, color_codes, minute_codes, result_codes), shape)
+    size = int(np.prod(shape))
+    counts = np.bincount(cells, minlength=size).astype(np.int32).reshape(shape)
+    # The same per team, but only for the cells a team has cards in: np.unique groups the (team, cell) pairs that occur
+    team_cells, team_counts = np.unique(team_codes.astype(np.int64) * size + cells, return_counts=True)
+    return CardCube(labels, counts, team_cells, team_counts.astype(np.int32))
+
+
+def _shared_cube():
+    # Built by one process per host and memory-mapped by the others, see euro/shared.py
+    def build():
+        built = encode(data.load("red_cards"))
+        return dict(built.labels, counts=built.counts, team_cells=built.team_cells, team_counts=built.team_counts)
+
+    arrays = shared.arrays("card_cube", ("red_cards",), build)
+    return CardCube({axis: arrays[axis] for axis in AXES + ("team",)}, arrays["counts"], arrays["team_cells"],
+                    arrays["team_counts"])
+
+
+def cube():
+    """Return the CardCube of 220-red_cards.csv, built once per dataset version."""
+    return data.derived("card_cube", ("red_cards",), _shared_cube)
+
+
+# Colours of the card types in the charts, like the cards themselves
+CARD_COLORS = {"Red": "#d62828", "Two-Yellow": "#fcbf49"}
+
+
+@profiling.timed("figure")
+def build_bars(df, x, title, stacked=True):
+    """Return a bar chart of a frame from CardCube.frame, stacked by its other columns."""
+    import plotly.express as px
+
+    columns = [column for column in df.columns if column != x]
+    fig = px.bar(df, x=x, y=columns, title=title, barmode='stack' if stacked else 'group',
+                 color_discrete_map=CARD_COLORS, labels={"value": "Cards", "variable": ""})
+    # Keep the buckets and tournaments in their own order instead of sorting them as numbers
+    fig.update_xaxes(type='category')
+    return payload.compact_figure(fig)
+
+
+def view(axis, title, **filters):
+    """Return the counts along an axis by card colour and their bar chart, for the filters of the Card Analytics page.
+
+    Both are kept once per filter combination for every session, in the memory cache of euro/memory.py.
+    """
+    def build():
+        df = cube().frame(axis, by="color", **filters)
+        return df, build_bars(df, axis.capitalize(), title)
+
+    selection = tuple((name, None if values is None else tuple(values)) for name, values in sorted(filters.items()))
+    return memory.cached(("card_cube.view", axis, selection), ("red_cards",), build)
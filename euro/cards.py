@@ -0,0 +1,70 @@
+# Precomputed partitions of the red cards data for the Penalty Cards page.
+# The page shows 2 pie charts and a table for each of the 5 rounds. Filtering the full table for every
+# round and card colour on every rerun adds up to 15+ scans and copies, so I group the data once per
+# dataset version and the page only looks things up.
+# https://pandas.pydata.org/docs/user_guide/groupby.html
+
+import numpy as np
+import pandas as pd
+
+from euro import data, profiling, shared
+
+# Define the rounds to analyze
+ROUNDS = ["Group stage", "Round of 16", "Quarter-finals", "Semi-finals", "Final"]
+
+# Define the card colors to analyze
+CARD_COLORS = ["Red", "Two-Yellow"]
+
+
+def _round_table(cards):
+    # Prepare the table once: remove comma from 'Tournament' and have 'Round' as the first column.
+    # The score numbers that euro/data.py splits out of 'Score' are left out, the table shows the score as text.
+    table = cards.assign(Tournament=cards['Tournament'].astype(str).str.replace(',', ''))
+    table = table[['Round'] + [col for col in table.columns if col not in ('Round', 'Team goals', 'Opponent goals')]]
+    # Group the rows of each round together, rounds in the order they first appear and rows in file order
+    first_seen = {round_name: i for i, round_name in enumerate(dict.fromkeys(table['Round']))}
+    return table.iloc[np.argsort(table['Round'].map(first_seen).to_numpy(), kind='stable')]
+
+
+def _build_index():
+    cards = data.load("red_cards")
+
+    # One groupby pass gives the country counts for every (round, card colour) pair, sorted like value_counts()
+    counts = cards.groupby(['Round', 'Card Color'], sort=False)['Representing'].value_counts()
+    country_counts = {}
+    for (round_name, card_color), group in counts.groupby(level=[0, 1], sort=False):
+        frame = group.droplevel([0, 1]).reset_index()
+        frame.columns = ['Country', 'Count']
+        country_counts[(round_name, card_color)] = frame
+
+    # The table is sorted by round once, so each tab gets its own slice of it without filtering the whole table.
+    # It is built by one process per host and memory-mapped by the others, see euro/shared.py.
+    table = shared.frame("cards.table", ("red_cards",), lambda: _round_table(cards))
+    rounds = table['Round'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, rounds[1:] != rounds[:-1]]) if len(rounds) else np.array([], dtype=int)
+    stops = np.r_[starts[1:], len(rounds)]
+    round_tables = {rounds[start]: table.iloc[start:stop] for start, stop in zip(starts, stops)}
+
+    return {"country_counts": country_counts, "round_tables": round_tables, "columns": table.columns}
+
+
+def index():
+    """Return the per-round partitions of the red cards data, built once per dataset version."""
+    return data.derived("cards.index", ("red_cards",), _build_index)
+
+
+@profiling.timed("filter")
+def country_counts(round_name, card_color):
+    """Return the number of cards per country for a round and card colour, or None if there were none."""
+    return index()["country_counts"].get((round_name, card_color))
+
+
+@profiling.timed("filter")
+def round_table(round_name):
+    """Return the rows of the red cards table for a round."""
+    idx = index()
+    table = idx["round_tables"].get(round_name)
+    if table is None:
+        # No cards in this round, show an empty table with the usual columns
+        return pd.DataFrame(columns=idx["columns"])
+    return table
@@ -0,0 +1,299 @@
+# Shared data-access layer for all pages.
+# Streamlit re-runs the whole page script on every interaction, so reading the CSVs inside the pages means
+# every click parses the files again. This module loads each dataset once per process and hands the same
+# DataFrame to every session until the file on disk changes.
+# The CSVs are only the import format: each one is converted once into a typed Arrow file (see euro/store.py)
+# and the pages read that file memory-mapped.
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from euro import live, profiling, store
+
+logger = logging.getLogger(__name__)
+
+# I have put all my source data files in the data folder.
+# EURO_DATA_DIR points the app at another folder with the same files, e.g. the synthetic datasets of the benchmarks.
+DATA_DIR = Path(os.environ.get("EURO_DATA_DIR") or Path(__file__).resolve().parent.parent / "data")
+# The Arrow files generated from the CSVs live in their own folder, see euro/store.py
+STORE_DIR = Path(os.environ.get("EURO_STORE_DIR") or DATA_DIR / "store")
+# New match results during a tournament are appended to this log and applied on top of the snapshots, see euro/live.py
+EVENTS_FILE = Path(os.environ.get("EURO_EVENTS_FILE") or DATA_DIR / "500-match_events.jsonl")
+
+
+def _signed_int(value):
+    # Wikipedia uses the unicode minus sign (U+2212) in the goal difference column, e.g. "−6" and "+27"
+    return int(str(value).replace("−", "-"))
+
+
+def _split_years(df):
+    # "1968, 1980, 2020" -> [1968, 1980, 2020]
+    df['Year(s)'] = [[int(year) for year in years.split(',')] for years in df['Year(s)']]
+    return df
+
+
+def _split_score_and_date(df):
+    # The score is written from the carded player's side with an en dash, e.g. "0–1", and the date like "5 June 1968".
+    # The 'Score' text stays for the tables, and the two numbers go in their own columns.
+    goals = df['Score'].str.split('–', expand=True).astype('int64')
+    df['Team goals'] = goals[0]
+    df['Opponent goals'] = goals[1]
+    df['Date'] = pd.to_datetime(df['Date'], format='%d %B %Y').dt.date
+    return df
+
+
+# Every dataset in the data folder, with the dtypes I want for its columns.
+# Columns that need more than a dtype (like 'Goal difference') get a converter, and 'normalise' turns
+# text fields that hold several values (years, scores, dates) into proper columns when the CSV is imported.
+# 'live' marks the snapshots that the match-event log keeps up to date.
+DATASETS = {
+    "team_records": {
+        "file": "100-overall_team_records.csv",
+        "dtype": {"Rank": "int64", "Team": "string", "Tournaments Participated": "int64", "Matches Played": "int64",
+                  "Won": "int64", "Drawn": "int64", "Lost": "int64", "Goals scored": "int64", "Goals conceded": "int64",
+                  "Total points": "int64"},
+        "converters": {"Goal difference": _signed_int},
+        "live": True,
+    },
+    "team_medals": {
+        "file": "110-team_medals.csv",
+        "dtype": {"Rank": "int64", "Team": "string", "Gold": "int64", "Silver": "int64", "Bronze": "int64", "Total": "int64"},
+        "live": True,
+    },
+    "host_countries": {
+        "file": "210-host_countries.csv",
+        "dtype": {"Number of times hosted": "int64", "Nation": "string", "Year(s)": "string"},
+        "normalise": _split_years,
+    },
+    "red_cards": {
+        "file": "220-red_cards.csv",
+        "dtype": {"Player": "string", "Card Color": "string", "Time of card": "int64", "Representing": "string",
+                  "Score": "string", "Opponent": "string", "Tournament": "int64", "Round": "string",
+                  "Round-Value": "int64", "Date": "string"},
+        "normalise": _split_score_and_date,
+    },
+    "team_results": {
+        "file": "400-team_results.csv",
+        # Every column is a result code like DNQ, GS or R16, so read them all as strings
+        "dtype": "string",
+    },
+}
+
+_lock = threading.Lock()
+# name -> {"key": stat key, "version": ..., "table": mapped Arrow table, "frames": {columns: DataFrame}}
+# (a live dataset has no table, its whole DataFrame is frames[None])
+_cache = {}
+_stats = {"hits": 0, "misses": 0, "reloads": 0, "rejected": 0}
+# True while euro/watcher.py is running, see watch()
+_watched = False
+# key -> (dataset versions, value) for things computed from the datasets, see derived()
+_derived = {}
+
+
+def path(name):
+    """Return the path of a dataset's CSV file."""
+    return DATA_DIR / DATASETS[name]["file"]
+
+
+def read_csv(name, file_path=None):
+    """Parse a dataset's CSV into a typed and normalised DataFrame."""
+    spec = DATASETS[name]
+    df = pd.read_csv(file_path or path(name), dtype=spec["dtype"], converters=spec.get("converters"))
+    if "normalise" in spec:
+        df = spec["normalise"](df)
+    return df
+
+
+def ingest(name):
+    """Import a dataset's CSV into the Arrow store if the stored copy is missing or out of date.
+
+    Returns the version of the CSV, which is a hash of its contents. Touching a file without
+    changing it therefore keeps the same version and does not import it again.
+    Raises euro.schema.SchemaError if the CSV breaks its contract, the stored copy is then left alone.
+    """
+    # The file is read once, and the version and the import both come from those bytes,
+    # so a CSV that is rewritten halfway through cannot end up with the version of another content
+    raw = path(name).read_bytes()
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    arrow_path = store.path(name, STORE_DIR)
+    if store.stored_version(arrow_path) != version:
+        from euro import schema, shared
+
+        # Server processes on one host share the store, the first one to get here imports the file for all of them
+        with shared.lock(f"ingest.{name}"):
+            if store.stored_version(arrow_path) != version:
+                # Only a version that matches its contract replaces the stored one, see euro/schema.py
+                df = read_csv(name, io.BytesIO(raw))
+                schema.check(name, version, df, load=_stored)
+                store.write(df, arrow_path, version)
+    return version
+
+
+def _stored(name):
+    # The last good import of another dataset, for the relations between the files in euro/schema.py
+    arrow_path = store.path(name, STORE_DIR)
+    if store.stored_version(arrow_path) is None:
+        return None
+    return store.to_pandas(store.read(arrow_path))
+
+
+def _stat_key(file_path):
+    # mtime alone can miss two edits within the same tick on some filesystems, so the size goes in as well
+    stat = file_path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _events_key():
+    try:
+        return _stat_key(EVENTS_FILE)
+    except FileNotFoundError:
+        return None
+
+
+def _key(name):
+    from euro import schema
+
+    key = _stat_key(path(name))
+    if DATASETS[name].get("live", False):
+        key += (_events_key(),)
+    # A version rejected for a relation to another dataset (see euro/schema.py) may be fine once that one is
+    # imported again, so the stored versions of the others are part of the key
+    key += tuple(store.stored_version(store.path(other, STORE_DIR)) for other in schema.related(name))
+    return key
+
+
+def _load(name, key):
+    with profiling.phase("read_csv"):
+        try:
+            version = ingest(name)
+        except (ValueError, TypeError, KeyError) as error:
+            # A CSV that breaks its contract (schema.SchemaError) or does not even parse: keep serving the last good import, if there is one.
+            # The entry still gets the new key, so the file is only looked at again once it or a related import changes.
+            version = store.stored_version(store.path(name, STORE_DIR))
+            if version is None:
+                raise
+            logger.error("%s is not imported, serving its last good version %s instead: %s", name, version, error)
+            with _lock:
+                _stats["rejected"] += 1
+        table = store.read(store.path(name, STORE_DIR))
+        if DATASETS[name].get("live", False):
+            from euro import progression
+
+            # Apply the results logged since the last load; the snapshot itself is only reread when the CSV changed.
+            # The overlay's DataFrame is served as it is: converting it back to Arrow would cost a copy of the
+            # whole table per match, and load() takes the columns a page asks for straight from it.
+            version, df = live.overlay(name, version, lambda: store.to_pandas(table), EVENTS_FILE, progression.matrix)
+            return {"key": key, "version": version, "table": None, "frames": {None: df}}
+    return {"key": key, "version": version, "table": table, "frames": {}}
+
+
+def _get(name):
+    with _lock:
+        entry = _cache.get(name)
+        # While the watcher keeps the snapshots up to date, readers don't even stat the files
+        if entry is not None and _watched:
+            _stats["hits"] += 1
+            return entry
+    key = _key(name)
+    if entry is not None and entry["key"] == key:
+        with _lock:
+            _stats["hits"] += 1
+        return entry
+    # Import and map outside the lock so one slow file does not block readers of the other datasets
+    entry = _load(name, key)
+    with _lock:
+        _stats["misses"] += 1
+        _cache[name] = entry
+    return entry
+
+
+def refresh(name):
+    """Import a dataset again and swap the new snapshot in for every session.
+
+    This is what euro/watcher.py calls when a file changed. The new snapshot is built completely
+    before it replaces the old one, so readers keep getting the old snapshot until then. If the
+    file breaks its contract (see euro/schema.py), the last good import is kept.
+    Returns True if the new snapshot replaced a different version.
+    """
+    key = _key(name)
+    entry = _load(name, key)
+    with _lock:
+        previous = _cache.get(name)
+        _cache[name] = entry
+        _stats["reloads"] += 1
+    return previous is not None and previous["version"] != entry["version"]
+
+
+def watch(enabled=True):
+    """Tell the data layer that a watcher is keeping the snapshots up to date, see euro/watcher.py."""
+    global _watched
+    _watched = enabled
+
+
+def load(name, columns=None):
+    """Return the DataFrame for a dataset, importing the CSV again only when it changed on disk.
+
+    Pass columns to get only the columns a page needs. The same DataFrame object is shared by
+    every session, so treat it as read-only.
+    """
+    entry = _get(name)
+    columns = None if columns is None else tuple(columns)
+    df = entry["frames"].get(columns)
+    if df is None:
+        with profiling.phase("read_csv"):
+            if entry["table"] is None:
+                # A live dataset, see _load()
+                df = entry["frames"][None][list(columns)]
+            else:
+                table = entry["table"] if columns is None else entry["table"].select(list(columns))
+                df = store.to_pandas(table)
+        entry["frames"][columns] = df
+    return df
+
+
+def version(name):
+    """Return a short content hash identifying the currently loaded version of a dataset."""
+    return _get(name)["version"]
+
+
+def live_matches(name):
+    """Return how many match results from the event log are included in a dataset."""
+    _get(name)
+    return live.applied_events(name)
+
+
+def derived(key, names, build):
+    """Return build(), computed once per version of the named datasets.
+
+    This is for indexes and aggregates that the pages compute from a dataset. They are rebuilt
+    automatically the first time they are asked for after one of the datasets changed.
+    """
+    versions = tuple(version(name) for name in names)
+    with _lock:
+        entry = _derived.get(key)
+        if entry is not None and entry[0] == versions:
+            return entry[1]
+    value = build()
+    with _lock:
+        _derived[key] = (versions, value)
+    return value
+
+
+def cache_stats():
+    """Return the hit/miss counters of the dataset cache."""
+    with _lock:
+        return dict(_stats, datasets=len(_cache))
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+        _derived.clear()
+        for counter in _stats:
+            _stats[counter] = 0
@@ -0,0 +1,289 @@
+# Static export of the pages.
+# Most of what the pages show only depends on the CSVs and a few selectbox options, so every page x tab x option
+# can be rendered ahead of time into plain files: a JSON file with the page's text, Plotly figures and tables,
+# and an HTML page that draws them with plotly.js. A static web server or CDN can serve those with no Python per
+# request, and the Streamlit app stays for the interactive parts.
+# Every view is what the page itself renders: the page runs under Streamlit's AppTest with the tab and option
+# selected, and its text, figures, tables, notices and videos are taken from the result in page order. So the
+# export can't drift from the pages (a table with other columns, a notice that is missing).
+# File names carry a hash of their content, so they can be cached forever. manifest.json maps every view to its
+# current files and records the dataset versions it was rendered from; the next build only renders the views
+# whose datasets or code changed. The views are rendered in parallel in a process pool.
+# https://docs.streamlit.io/develop/api-reference/app-testing/st.testing.v1.apptest
+# https://plotly.com/javascript/getting-started/
+# https://marked.js.org/
+# https://docs.python.org/3/library/concurrent.futures.html#processpoolexecutor
+#
+#   python -m euro.export --out site            render what changed into ./site
+#   python -m euro.export --out site --force    render everything again
+
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from euro import data, payload, shared
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Bump this when the rendering below changes, so the next build renders every view again. Any change to the
+# euro package also changes shared.FINGERPRINT, which renders every view again from freshly built figures.
+EXPORT_VERSION = "2"
+
+# Every page: page id -> (script, title, datasets it reads, key of its lazy tabs, keys of the selectboxes whose
+# options get a view each). Pages without such selectboxes are exported with their widgets at the defaults.
+PAGES = {
+    "welcome": ("Welcome.py", "Welcome", (), None, ()),
+    "match_performance": ("pages/100-Match_Performance.py", "Match performance", ("team_records",),
+                          "match_performance_tabs", ("selectbox1", "selectbox2")),
+    "tournaments": ("pages/200-Tournaments_Statistics.py", "Tournaments statistics", ("host_countries", "team_medals"),
+                    "tournaments_tabs", ("selectbox4", "selectbox3")),
+    "team_progression": ("pages/250-Team_Progression.py", "Team progression", ("team_results",), None, ()),
+    "penalty_cards": ("pages/300-Penalty_Cards.py", "Penalty cards", ("red_cards",), "penalty_cards_tabs", ()),
+    "card_analytics": ("pages/320-Card_Analytics.py", "Card analytics", ("red_cards",), "card_analytics_tabs", ()),
+    "simulator": ("pages/330-Euro_Simulator.py", "Euro simulator", ("team_records", "team_results"), "simulator_tabs", ()),
+    "how_to_use": ("pages/350-How_To_Use.py", "How to use", (), None, ()),
+    "acknowledgments": ("pages/400-Acknowledgments.py", "Acknowledgments", (), None, ()),
+}
+
+# The option of a view that has its widgets at their defaults
+DEFAULT = "Default view"
+
+# Elements shown as a highlighted notice
+NOTICES = ("caption", "info", "success", "warning", "error")
+
+
+def _run(page, tab=None, selections=None):
+    # One rerun of the page with a tab and selectbox values set, like a session that picked them.
+    # Warm-up threads would only compete with the export for the CPU.
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["EURO_WARMUP"] = "0"
+    script, _, _, tabs_key, _ = PAGES[page]
+    at = AppTest.from_file(str(ROOT / script), default_timeout=600)
+    if tab is not None:
+        at.session_state[tabs_key] = tab
+    for key, value in (selections or {}).items():
+        at.session_state[key] = value
+    at.run()
+    if at.exception:
+        raise RuntimeError(f"{script} failed on tab {tab!r} with {selections}: {at.exception[0].message}")
+    return at
+
+
+def views():
+    """Return every view to export as (page, tab, option, datasets it reads).
+
+    The tabs and options are read from the pages, so a new round or option gets its view without a change here.
+    """
+    result = []
+    for page, (_, _, datasets, tabs_key, option_keys) in PAGES.items():
+        at = _run(page)
+        for tab in [tab.label for tab in at.tabs] if tabs_key else [None]:
+            options = []
+            if option_keys:
+                # Only the open tab draws its selectbox
+                tab_run = _run(page, tab)
+                options = [option for selectbox in tab_run.selectbox if selectbox.key in option_keys
+                           for option in selectbox.options]
+            for option in options or [DEFAULT]:
+                result.append((page, tab, option, datasets))
+    return result
+
+
+def slug(option):
+    """Turn an option like 'Top 5 teams' or 'Default view' into a file name."""
+    return re.sub(r"[^a-z0-9]+", "-", str(option).lower()).strip("-")
+
+
+def view_id(page, tab, option):
+    return f"{page}/{slug(tab or 'page')}/{slug(option)}"
+
+
+def _blocks(node, tab):
+    # The elements of the page in order. Of the tabs only the selected one has content, the sidebar is left out.
+    for child in getattr(node, "children", {}).values():
+        kind = getattr(child, "type", None)
+        if kind == "tab" and child.label != tab:
+            continue
+        if kind in ("markdown", "title", "header", "subheader"):
+            text = child.value if kind == "markdown" else f"{'#' * ('title', 'header', 'subheader').index(kind)}# {child.value}"
+            yield {"markdown": text}
+        elif kind in NOTICES:
+            yield {"notice": child.value}
+        elif kind == "plotly_chart":
+            yield {"figure": json.loads(child.proto.spec)}
+        elif kind == "dataframe":
+            yield {"table": json.loads(child.value.to_json(orient="split", index=False, date_format="iso"))}
+        elif kind == "video":
+            yield {"video": child.proto.url}
+        else:
+            yield from _blocks(child, tab)
+
+
+def render(page, tab, option):
+    """Return the blocks of a view: markdown, notices, figures, tables and videos in the order the page shows them."""
+    _, _, _, _, option_keys = PAGES[page]
+    selections = {}
+    if option != DEFAULT:
+        # The selectbox of the tab is the one that offers this option
+        at = _run(page, tab)
+        selections = {selectbox.key: option for selectbox in at.selectbox
+                      if selectbox.key in option_keys and option in selectbox.options}
+    return list(_blocks(_run(page, tab, selections).main, tab))
+
+
+_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="https://cdn.plot.ly/plotly-{plotly_js}.min.js" charset="utf-8"></script>
+<script src="https://cdn.jsdelivr.net/npm/marked/marked.min.js"></script>
+<style>body {{ font-family: sans-serif; margin: 2em; }} table {{ border-collapse: collapse; }}
+td, th {{ padding: 0.2em 0.8em; border-bottom: 1px solid #ddd; text-align: left; }}
+.notice {{ background: #fff3cd; padding: 0.5em 1em; }}</style>
+</head>
+<body>
+<p><a href="../../../index.html">All views</a></p>
+<h1>{title}</h1>
+{body}
+<script>
+var blocks = {blocks};
+blocks.forEach(function (block, i) {{
+  var element = document.getElementById("block" + i);
+  if (block.markdown !== undefined) element.innerHTML = marked.parse(block.markdown);
+  if (block.notice !== undefined) element.innerHTML = marked.parse(block.notice);
+  if (block.figure !== undefined) Plotly.newPlot(element, block.figure.data, block.figure.layout, {{displaylogo: false}});
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def _write(folder, name, suffix, content):
+    # Content-addressed: the same content always gets the same name, so a CDN can cache it forever
+    digest = hashlib.sha1(content).hexdigest()[:12]
+    file_path = folder / f"{name}.{digest}{suffix}"
+    if not file_path.exists():
+        tmp = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(content)
+        os.replace(tmp, file_path)
+    return file_path, digest
+
+
+def _html_block(i, block):
+    if "table" in block:
+        table = block["table"]
+        rows = "".join("<tr>" + "".join(f"<td>{html.escape(str(value))}</td>" for value in row) + "</tr>" for row in table["data"])
+        head = "".join(f"<th>{html.escape(str(column))}</th>" for column in table["columns"])
+        return f"<table><thead><tr>{head}</tr></thead><tbody>{rows}</tbody></table>"
+    if "video" in block:
+        return f'<iframe src="{html.escape(block["video"])}" width="560" height="315" allowfullscreen></iframe>'
+    # Markdown, notices and figures are drawn by the script at the end of the page
+    css = "notice" if "notice" in block else "block"
+    return f'<div id="block{i}" class="{css}"></div>'
+
+
+def render_view(out, page, tab, option):
+    """Render one view into the output folder and return its manifest entry (paths relative to out)."""
+    import plotly.offline
+
+    blocks = render(page, tab, option)
+    folder = Path(out) / page / slug(tab or "page")
+    folder.mkdir(parents=True, exist_ok=True)
+    title = " - ".join(part for part in (PAGES[page][1], tab, None if option == DEFAULT else option) if part)
+    body = json.dumps({"title": title, "blocks": blocks})
+    json_path, digest = _write(folder, slug(option), ".json", body.encode())
+    page_html = _HTML.format(
+        title=html.escape(title), plotly_js=plotly.offline.get_plotlyjs_version(),
+        body="\n".join(_html_block(i, block) for i, block in enumerate(blocks)),
+        # </script> inside the JSON would end the script tag early
+        blocks=json.dumps(blocks).replace("</", "<\\/"),
+    )
+    html_path, _ = _write(folder, slug(option), ".html", page_html.encode())
+    return {"title": title, "hash": digest, "json": str(json_path.relative_to(out)), "html": str(html_path.relative_to(out))}
+
+
+def _inputs(page, datasets):
+    # The page script is not part of the euro package, so its own source goes in as well
+    source = hashlib.sha1((ROOT / PAGES[page][0]).read_bytes()).hexdigest()[:12]
+    return {"datasets": shared.version_of(datasets), "export": EXPORT_VERSION, "code": shared.FINGERPRINT,
+            "page": source, "compact": payload.COMPACT}
+
+
+def _write_index(out, manifest):
+    items = "\n".join(
+        f'<li><a href="{html.escape(entry["html"])}">{html.escape(entry["title"])}</a></li>'
+        for _, entry in sorted(manifest["views"].items())
+    )
+    (Path(out) / "index.html").write_text(
+        f"<!DOCTYPE html>\n<html lang=\"en\">\n<head><meta charset=\"utf-8\"><title>UEFA Euro Graphs</title></head>\n"
+        f"<body>\n<h1>UEFA Euro Graphs</h1>\n<ul>\n{items}\n</ul>\n</body>\n</html>\n", encoding="utf-8")
+
+
+def build(out, jobs=None, force=False):
+    """Render every view whose datasets changed since the last build into out. Returns (rendered, skipped) counts."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    manifest_path = out / "manifest.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() and not force else {"views": {}}
+
+    todo = []
+    current = {}
+    for page, tab, option, datasets in views():
+        key = view_id(page, tab, option)
+        inputs = _inputs(page, datasets)
+        current[key] = inputs
+        entry = manifest["views"].get(key)
+        if entry is None or entry["inputs"] != inputs or not (out / entry["html"]).exists():
+            todo.append((key, page, tab, option))
+
+    if todo:
+        # Each worker process loads the datasets from the store and renders its share of the views.
+        # The workers are started fresh, this process already runs the threads of the pages it ran in views().
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {key: pool.submit(render_view, out, page, tab, option) for key, page, tab, option in todo}
+            for key, future in futures.items():
+                manifest["views"][key] = dict(future.result(), inputs=current[key])
+
+    # Views that no longer exist (e.g. a round without cards any more) leave the manifest
+    manifest["views"] = {key: entry for key, entry in manifest["views"].items() if key in current}
+    tmp = manifest_path.with_name(".manifest.json.tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True))
+    os.replace(tmp, manifest_path)
+    _write_index(out, manifest)
+    _remove_unused(out, manifest)
+    return len(todo), len(current) - len(todo)
+
+
+def _remove_unused(out, manifest):
+    # Files of earlier renders that no view points to any more
+    used = {entry[kind] for entry in manifest["views"].values() for kind in ("json", "html")}
+    for page in PAGES:
+        for file_path in (out / page).rglob("*") if (out / page).exists() else []:
+            if file_path.is_file() and str(file_path.relative_to(out)) not in used:
+                file_path.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-render every page, tab and option into static files.")
+    parser.add_argument("--out", default="site", help="output folder (default: ./site)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="render every view, not only the changed ones")
+    args = parser.parse_args()
+    # Make sure every CSV is imported before the workers start, so they only map the store
+    for name in data.DATASETS:
+        data.ingest(name)
+    # The build runs in the imported module: AppTest runs every page as __main__, and the worker processes
+    # look render_view up by the name of its module
+    from euro import export
+
+    rendered, skipped = export.build(args.out, args.jobs, args.force)
+    print(f"Rendered {rendered} views, {skipped} unchanged, in {Path(args.out).resolve()}")
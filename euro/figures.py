@@ -0,0 +1,366 @@
+# Figure cache for the pages.
+# The selectboxes on the pages only ever produce a handful of different figures per tab ("Top 5", "Top 10", "All"),
+# so instead of rebuilding the Plotly figure on every rerun I build each (page, tab, option) combination once,
+# keep its serialized JSON and serve the same figure to every session until the underlying CSV changes.
+# https://plotly.com/python/subplots/
+# https://plotly.com/python/pie-charts/
+# https://plotly.com/python/bar-charts/#bar-charts-with-wide-format-data
+#
+# A figure that is not cached yet takes ~40 ms to build and serialize, and the Penalty Cards page needs two of them
+# per round. submit() builds them on a small pool instead of the script thread, so the page can go on with its text
+# and tables while they are built, and every chart is put in its place as soon as it is ready, see euro/layout.py.
+# Plotly builds figures in pure Python, so threads would only take turns on the GIL. Set EURO_FIGURE_PROCESSES to
+# build them in that many worker processes instead, which really runs them side by side on a machine with several cores.
+# benchmarks/bench_figures.py compares the two.
+# https://docs.python.org/3/library/concurrent.futures.html
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from euro import cards, data, memory, payload, profiling, ranking, shared
+
+# Plotly takes a good part of a second to import, so the builders below import it when they are first called.
+# Pages that only serve figures from the cache never pay for it in the script thread.
+
+# The options offered by the selectboxes, mapped to the number of rows they keep (None keeps all rows).
+# Any other number works as well, the rankings in euro/ranking.py make every N a slice.
+TOP_OPTIONS = {
+    'Top 5 teams': 5, 'Top 10 teams': 10, 'All Teams': None,
+    'Top 5 nations': 5, 'Top 10 nations': 10, 'All Nations': None,
+}
+
+
+# Worker processes that build the figures (0: none, the pool threads build them), and threads of the figure pool.
+# More threads than processes do not help: with the GIL they only delay the first figure by taking turns with it.
+PROCESSES = int(os.environ.get("EURO_FIGURE_PROCESSES", "0"))
+JOBS = max(1, int(os.environ.get("EURO_FIGURE_JOBS") or PROCESSES))
+
+
+def top_n(option):
+    """Return how many rows a selectbox option keeps (None keeps all rows). Plain numbers are passed through."""
+    return TOP_OPTIONS.get(option, option)
+
+
+# Tables shown under the charts. They are cheap, but the figures are built from the same selection.
+
+# Each table is kept once per option for every session, in the memory cache of euro/memory.py.
+
+@profiling.timed("filter")
+def goals_and_points_table(option):
+    return memory.cached(("goals_and_points_table", option), ("team_records",),
+                         lambda: ranking.index("team_records").top('Total points', top_n(option)))
+
+
+@profiling.timed("filter")
+def won_and_lost_table(option):
+    return memory.cached(("won_and_lost_table", option), ("team_records",),
+                         lambda: ranking.index("team_records").top('Matches Played', top_n(option)))
+
+
+def _host_nations_ranking():
+    host_nations_df = data.load("host_countries", columns=['Nation', 'Number of times hosted', 'Year(s)'])
+    # 'Year(s)' is a list column, so the years of a nation are merged into one sorted list
+    pie_data = host_nations_df.groupby('Nation', as_index=False).agg(
+        {'Number of times hosted': 'sum', 'Year(s)': lambda years: sorted(int(y) for ys in years for y in ys)}
+    )
+    # Round the number of times hosted to the nearest integer
+    pie_data['Number of times hosted'] = pie_data['Number of times hosted'].round().astype(int)
+    return ranking.RankIndex(pie_data)
+
+
+@profiling.timed("filter")
+def host_nations_table(option):
+    # The nations are grouped and ranked once per dataset version
+    host_ranking = data.derived("figures.host_nations", ("host_countries",), _host_nations_ranking)
+    return memory.cached(("host_nations_table", option), ("host_countries",),
+                         lambda: host_ranking.top('Number of times hosted', top_n(option)))
+
+
+@profiling.timed("filter")
+def medals_tally_table(option):
+    return memory.cached(("medals_tally_table", option), ("team_medals",),
+                         lambda: ranking.index("team_medals").top('Total', top_n(option)))
+
+
+# Figure builders, one per (page, tab). Each takes the selectbox option and returns a new Plotly figure.
+
+def build_goals_and_points(option):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    rank = ranking.index("team_records")
+    n = top_n(option)
+    # Take the top teams separately for each metric, so that each sub-plot reflects top values for that metric.
+    df_points = rank.top('Total points', n)
+    df_goals_scored = rank.top('Goals scored', n)
+    df_goals_conceded = rank.top('Goals conceded', n)
+
+    fig = make_subplots(rows=1, cols=3, subplot_titles=("Total Points", "Goals Scored", "Goals Conceded"))
+    fig.add_trace(
+        go.Bar(x=df_points['Team'], y=df_points['Total points'], name='Total Points', marker=dict(color='#fe218b')),
+        row=1, col=1
+    )
+    fig.add_trace(
+        go.Bar(x=df_goals_scored['Team'], y=df_goals_scored['Goals scored'], name='Goals Scored', marker=dict(color='#fed700')),
+        row=1, col=2
+    )
+    fig.add_trace(
+        go.Bar(x=df_goals_conceded['Team'], y=df_goals_conceded['Goals conceded'], name='Goals Conceded', marker=dict(color='#21b0fe')),
+        row=1, col=3
+    )
+    fig.update_layout(height=600, width=1200, title_text="Goals & Points Subplots", barmode='group')
+    return fig
+
+
+def build_won_and_lost(option):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    rank = ranking.index("team_records")
+    played = rank.positions('Matches Played', top_n(option))
+    df_played = rank.top('Matches Played', top_n(option))
+
+    # https://plotly.com/python/subplots/#multiple-subplots
+    fig = make_subplots(rows=2, cols=2, subplot_titles=("Matches Played", "Matches Won", "Matches Drawn", "Matches Lost"))
+    fig.add_trace(
+        go.Bar(x=df_played['Team'], y=df_played['Matches Played'], name='Matches Played', marker=dict(color='#26547c')),
+        row=1, col=1
+    )
+
+    # The same teams, ordered by each of the other metrics
+    df_won = rank.ordered('Won', played)
+    df_drawn = rank.ordered('Drawn', played)
+    df_lost = rank.ordered('Lost', played)
+
+    fig.add_trace(
+        go.Bar(x=df_won['Team'], y=df_won['Won'], name='Matches Won', marker=dict(color='#ef476f')),
+        row=1, col=2
+    )
+    fig.add_trace(
+        go.Bar(x=df_drawn['Team'], y=df_drawn['Drawn'], name='Matches Drawn', marker=dict(color='#ffd166')),
+        row=2, col=1
+    )
+    fig.add_trace(
+        go.Bar(x=df_lost['Team'], y=df_lost['Lost'], name='Matches Lost', marker=dict(color='#06d6a0')),
+        row=2, col=2
+    )
+    fig.update_layout(height=600, width=1200, title_text="Match Statistics Subplots", barmode='group')
+    return fig
+
+
+def build_host_nations(option):
+    import plotly.express as px
+
+    pie_data = host_nations_table(option)
+    return px.pie(pie_data, values='Number of times hosted', names='Nation', title='Number of Times Nations Hosted Events')
+
+
+def build_medals_tally(option):
+    import plotly.express as px
+
+    uefa_medals_df = medals_tally_table(option)
+    # Define custom colors for each medal type
+    custom_colors = {
+        "Gold": "#fca311",  # Gold color
+        "Silver": "#e5e5e5",  # Silver color
+        "Bronze": "#14213d"  # Bronze color
+    }
+    return px.bar(uefa_medals_df, x="Team", y=["Gold", "Silver", "Bronze"], text_auto=True,
+                  title="UEFA Euro Tournament Medals by Country", color_discrete_map=custom_colors)
+
+
+def build_penalty_pie(option):
+    import plotly.express as px
+
+    # For the penalty cards the option is a (round, card colour) pair
+    round_name, card_color = option
+    country_counts = cards.country_counts(round_name, card_color)
+    # Create a pie chart with rounded percentage labels
+    fig = px.pie(country_counts, values='Count', names='Country', title=f'{card_color} Cards in {round_name}')
+    fig.update_traces(textinfo='percent+label', texttemplate='%{label}: %{percent:.0%}')
+    return fig
+
+
+def _penalty_pie_options():
+    # Only the (round, card colour) pairs that had cards get a pie chart
+    return tuple(cards.index()["country_counts"])
+
+
+# Every cacheable figure: (page, tab) -> (builder, datasets it reads, options)
+# The options are either a tuple or a function returning them, for figures whose options depend on the data.
+FIGURES = {
+    ("match_performance", "goals_points"): (build_goals_and_points, ("team_records",), ('Top 5 teams', 'Top 10 teams', 'All Teams')),
+    ("match_performance", "won_lost"): (build_won_and_lost, ("team_records",), ('Top 5 teams', 'Top 10 teams', 'All Teams')),
+    ("tournaments", "host_nations"): (build_host_nations, ("host_countries",), ('Top 5 nations', 'Top 10 nations', 'All Nations')),
+    ("tournaments", "medals"): (build_medals_tally, ("team_medals",), ('Top 5 teams', 'Top 10 teams', 'All Teams')),
+    ("penalty_cards", "pie"): (build_penalty_pie, ("red_cards",), _penalty_pie_options),
+}
+
+
+def render(page, tab, option):
+    """Build a figure and return its serialized JSON. This is what runs in the worker processes."""
+    builder, _, _ = FIGURES[(page, tab)]
+    with profiling.phase("figure"):
+        fig = builder(option)
+    with profiling.phase("serialize"):
+        # In compact mode the cached JSON is already slimmed down, see euro/payload.py
+        return payload.compact_figure(fig).to_json().encode()
+
+
+_pools_lock = threading.Lock()
+_threads = None
+_processes = None
+
+
+def _thread_pool():
+    global _threads
+    with _pools_lock:
+        if _threads is None:
+            _threads = ThreadPoolExecutor(max_workers=JOBS, thread_name_prefix="euro-figures")
+        return _threads
+
+
+def _process_pool():
+    global _processes
+    with _pools_lock:
+        if _processes is None:
+            # Forking a server process that is running threads can copy a held lock into the child, so the workers
+            # start from a fresh interpreter. They import Plotly and map the datasets on their first figure.
+            _processes = ProcessPoolExecutor(max_workers=PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+        return _processes
+
+
+# Stands for "not cached" in memory.cache.peek(), where None could be a value
+_MISSING = object()
+
+
+class FigureCache:
+    """Cache of serialized Plotly figures keyed by (page, tab, option).
+
+    The entries live in the process-wide memory cache with the other heavy objects of the pages, so
+    they share its budget and LRU eviction, see euro/memory.py. Each entry is keyed by the versions of
+    the datasets it was built from, so a changed CSV rebuilds the figure on its next request instead of
+    serving a stale one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # key -> Future of a figure that is being built on the pool, so two sessions asking for it share one build
+        self._pending = {}
+
+    def get(self, page, tab, option, slot=None):
+        """Return the figure for a page/tab/option, building it if needed.
+
+        The session asking for it remembers it under slot, by default the tab. See memory.cached().
+        """
+        key = self._key(page, tab, option)
+        figure = self._entry(key, page, tab, option)[1]
+        memory.record(("figure", page, tab) if slot is None else slot, key)
+        return figure
+
+    def submit(self, page, tab, option, slot=None):
+        """Like get(), but return a Future of the figure.
+
+        A cached figure comes back as a finished Future. Any other one is built on the figure pool, off the
+        script thread, and the Future finishes when it is ready.
+        """
+        key = self._key(page, tab, option)
+        memory.record(("figure", page, tab) if slot is None else slot, key)
+        # One lookup: an entry evicted between a check and a get would be rebuilt right here on the script thread
+        entry = memory.cache.peek(key, _MISSING)
+        if entry is _MISSING:
+            return self._submit(key, page, tab, option)
+        with self._lock:
+            self.hits += 1
+        future = Future()
+        future.set_result(entry[1])
+        return future
+
+    def _submit(self, key, page, tab, option):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                # The build is timed as part of the rerun that asked for it, see euro/profiling.py
+                future = self._pending[key] = _thread_pool().submit(profiling.propagate(self._build), key, page, tab, option)
+        return future
+
+    def _build(self, key, page, tab, option):
+        try:
+            return self._entry(key, page, tab, option)[1]
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def spec(self, page, tab, option):
+        """Return the serialized Plotly JSON of a figure, building it if needed."""
+        return self._entry(self._key(page, tab, option), page, tab, option)[0]
+
+    def _key(self, page, tab, option):
+        _, datasets, _ = FIGURES[(page, tab)]
+        return ("figure", page, tab, option, tuple(data.version(name) for name in datasets))
+
+    def _entry(self, key, page, tab, option):
+        _, datasets, _ = FIGURES[(page, tab)]
+        built = []
+
+        def build():
+            built.append(True)
+
+            def build_json():
+                if PROCESSES:
+                    # The worker process times its own phases, here the wait for it counts as building the figure
+                    with profiling.phase("figure"):
+                        return _process_pool().submit(render, page, tab, option).result()
+                return render(page, tab, option)
+
+            # The JSON is built by one process per host and read by the others, see euro/shared.py
+            mode = "compact" if payload.COMPACT else "full"
+            spec = shared.blob(f"figure.{page}.{tab}.{option!r}.{mode}", datasets, build_json).decode()
+            with profiling.phase("serialize"):
+                # The served figure is rebuilt from the stored JSON once, so every session gets exactly what is cached
+                import plotly.io as pio
+                figure = pio.from_json(spec)
+            return spec, figure
+
+        # The figure object takes about as much memory as its JSON, so an entry counts as twice the JSON
+        entry = memory.cache.get(key, build, size=lambda entry: 2 * len(entry[0]))
+        with self._lock:
+            if built:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return entry
+
+    def warm(self):
+        """Build every (page, tab, option) combination up front, on the figure pool."""
+        futures = []
+        for (page, tab), (_, _, options) in FIGURES.items():
+            if callable(options):
+                options = options()
+            for option in options:
+                # A page asking for one of these while it is being built waits for the same build
+                futures.append(self._submit(self._key(page, tab, option), page, tab, option))
+        for future in futures:
+            future.result()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": memory.cache.count("figure")}
+
+
+# One cache per server process, shared by all sessions
+cache = FigureCache()
+
+
+def get_figure(page, tab, option, slot=None):
+    """Return the cached figure for a page/tab/option, building it on first use."""
+    return cache.get(page, tab, option, slot)
+
+
+def submit_figure(page, tab, option, slot=None):
+    """Return a Future of the figure for a page/tab/option, built on the figure pool if it is not cached."""
+    return cache.submit(page, tab, option, slot)
@@ -0,0 +1,107 @@
+# Layout helpers shared by the pages.
+
+from concurrent.futures import as_completed
+from contextlib import contextmanager
+
+import streamlit as st
+
+from euro import figures, payload, profiling
+
+
+def lazy_tabs(labels, key):
+    """Create tabs where only the selected tab needs to run.
+
+    By default st.tabs runs the body of every tab on every rerun and sends all of it to the browser,
+    even though the user only sees one tab. With on_change="rerun" Streamlit tracks the selected tab,
+    and each tab's .open tells the page whether to build its content:
+
+        tab1, tab2 = lazy_tabs(["One", "Two"], key="my_tabs")
+        with tab1:
+            if tab1.open:
+                ...
+
+    https://docs.streamlit.io/develop/api-reference/layout/st.tabs
+    """
+    return st.tabs(labels, key=key, on_change="rerun")
+
+
+def keep_widget_state(*keys):
+    """Keep the values of widgets that are not drawn in this rerun.
+
+    Streamlit forgets the value of a widget when a rerun does not draw it, so a selectbox in a
+    hidden lazy tab would jump back to its default. Writing the value back into session state keeps it.
+    https://docs.streamlit.io/develop/concepts/architecture/widget-behavior#save-widget-values-in-session-state-to-preserve-them-between-pages
+    """
+    for key in keys:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+
+def plotly_chart(fig, config=None, container=None):
+    """st.plotly_chart, timed as the "plotly_chart" phase when profiling is on (see euro/profiling.py).
+
+    Pass container (e.g. an st.empty() placeholder) to draw the chart there instead of at the end of the page.
+    """
+    with profiling.phase("plotly_chart"):
+        if profiling.active():
+            profiling.record_bytes("figure", payload.figure_bytes(fig))
+        return (container or st).plotly_chart(fig, config=config)
+
+
+class _FigureSlots:
+    def __init__(self):
+        # Future of a figure -> (its placeholder, chart config)
+        self._waiting = {}
+
+    def plotly_chart(self, page, tab, option, config=None, slot=None):
+        """Show the figure of a page/tab/option here, now if it is cached or once the figure pool has built it."""
+        future = figures.submit_figure(page, tab, option, slot)
+        if future.done():
+            plotly_chart(future.result(), config=config)
+            return
+        placeholder = st.empty()
+        placeholder.caption("Building the chart...")
+        self._waiting[future] = (placeholder, config)
+
+    def fill(self):
+        # Every chart goes in as soon as it is ready, whatever its place on the page
+        for future in as_completed(self._waiting):
+            placeholder, config = self._waiting[future]
+            with profiling.phase("figure"):
+                fig = future.result()
+            plotly_chart(fig, config=config, container=placeholder)
+
+
+@contextmanager
+def figure_slots():
+    """Build the figures of a block of the page on the figure pool while the rest of the block runs.
+
+        with figure_slots() as slots:
+            slots.plotly_chart("penalty_cards", "pie", option, config=config)
+            dataframe(...)  # sent to the browser while the chart is being built
+
+    Cached figures are drawn right away. The others get a placeholder, and at the end of the block each one
+    is drawn in its placeholder as soon as it is built. See figures.submit_figure().
+    """
+    slots = _FigureSlots()
+    yield slots
+    slots.fill()
+
+
+def dataframe(df, hide_index=True, columns=None, key=None):
+    """st.dataframe, sending only the given columns and paginating long tables in compact mode (see euro/payload.py).
+
+    key is needed for long tables, it names the page selector that is shown above them.
+    Timed as the "dataframe" phase when profiling is on (see euro/profiling.py).
+    """
+    with profiling.phase("dataframe"):
+        df = payload.compact_frame(df, columns)
+        if payload.COMPACT and len(df) > payload.PAGE_SIZE:
+            # Only the rows of the selected page are sent to the browser
+            pages = payload.page_count(len(df))
+            page = st.number_input(f"Page (of {pages}, {len(df)} rows)", min_value=1, max_value=pages, value=1, key=key)
+            start = (page - 1) * payload.PAGE_SIZE
+            df = df.iloc[start:start + payload.PAGE_SIZE]
+        if profiling.active():
+            profiling.record_bytes("table", payload.table_bytes(df))
+        return st.dataframe(df, hide_index=hide_index)
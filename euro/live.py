@@ -0,0 +1,412 @@
+# Live match results on top of the snapshot tables.
+# The team records and medal tables in the data folder are snapshots from Wikipedia "as of June 14, 2024".
+# During a tournament I don't want to edit those CSVs by hand after every match, so new results go into an
+# append-only log of match events (one JSON object per line), and this module applies them to the snapshot
+# as deltas: a match only touches the two teams that played it, and their rank only moves the teams they pass.
+# The data-access layer (euro/data.py) overlays the result, so the pages pick up every new match on their
+# next rerun without a restart.
+# https://jsonlines.org/
+# https://docs.python.org/3/library/bisect.html
+
+import bisect
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# The stages of a tournament, as written in the events. The semi-final and final decide the medals.
+STAGES = ("GS", "R16", "QF", "SF", "F")
+
+# The first Euro, there is one every four years since
+FIRST_TOURNAMENT = 1960
+
+# Points for a win, draw and loss. Matches decided in extra time count as wins and losses, while
+# matches decided by penalty shoot-outs count as draws, as explained on the Match Performance page.
+WIN_POINTS, DRAW_POINTS, LOSS_POINTS = 3, 1, 0
+
+# The datasets the event log updates, with the columns that decide their ranking (highest first).
+# Teams that are tied on all of them keep their order from the snapshot.
+RANK_COLUMNS = {
+    "team_records": ('Total points', 'Goal difference', 'Goals scored'),
+    "team_medals": ('Gold', 'Silver', 'Bronze'),
+}
+
+
+def validate(event, years=None):
+    """Check a match event and return it, raising ValueError if it is not a valid result.
+
+    An event looks like this, with the goals after extra time and 'shootout' naming the winner of a penalty shoot-out:
+    {"tournament": 2024, "stage": "SF", "home": "Spain", "away": "France", "home_goals": 2, "away_goals": 1}
+    Pass years (see known_years) to only accept the tournaments of the snapshot.
+    """
+    missing = [field for field in ("tournament", "stage", "home", "away", "home_goals", "away_goals") if field not in event]
+    if missing:
+        raise ValueError(f"Match event is missing {', '.join(missing)}: {event}")
+    # bool is a subclass of int and "2024" is not 2024, either would count as another tournament in the standings
+    tournament = event["tournament"]
+    if type(tournament) is not int or tournament < FIRST_TOURNAMENT or tournament % 4 != 0:
+        raise ValueError(f"tournament must be the year of a Euro, like 2024: {event}")
+    if years is not None and tournament not in years:
+        raise ValueError(f"The snapshot knows nothing about Euro {tournament}, expected one of {', '.join(map(str, sorted(years)))}")
+    if event["stage"] not in STAGES:
+        raise ValueError(f"Unknown stage {event['stage']!r}, expected one of {', '.join(STAGES)}")
+    if not event["home"] or not event["away"] or event["home"] == event["away"]:
+        raise ValueError(f"A match needs two different teams: {event}")
+    for field in ("home_goals", "away_goals"):
+        if type(event[field]) is not int or event[field] < 0:
+            raise ValueError(f"{field} must be a non-negative integer: {event}")
+    shootout = event.get("shootout")
+    if shootout is not None:
+        if shootout not in (event["home"], event["away"]):
+            raise ValueError(f"The shoot-out winner {shootout!r} did not play this match: {event}")
+        if event["home_goals"] != event["away_goals"]:
+            raise ValueError(f"Only a drawn match can go to a shoot-out: {event}")
+    elif event["stage"] != "GS" and event["home_goals"] == event["away_goals"]:
+        raise ValueError(f"A knockout match that ended level needs a shoot-out winner: {event}")
+    return event
+
+
+def append(event, log_path):
+    """Validate a match event and append it to the event log."""
+    line = json.dumps(validate(event), ensure_ascii=False) + "\n"
+    # One write of a whole line in append mode, so a reader never sees another writer's half-written event
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write(line)
+        log.flush()
+        os.fsync(log.fileno())
+
+
+def read_events(log_path, offset=0, years=None):
+    """Return the events written after a byte offset of the log, the offset to continue from and the number of rejected lines.
+
+    A last line without its newline is still being written, so it is left for the next call.
+    A line that is not a valid event is logged and skipped: the offset still moves past it, so
+    one bad line doesn't stop the matches logged after it (and isn't reported again on every load).
+    years is passed on to validate().
+    """
+    try:
+        with open(log_path, "rb") as log:
+            log.seek(offset)
+            chunk = log.read()
+    except FileNotFoundError:
+        return [], 0, 0
+    complete = chunk[:chunk.rfind(b"\n") + 1]
+    events = []
+    rejected = 0
+    for line in complete.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            event = json.loads(line)
+            if not isinstance(event, dict):
+                raise ValueError(f"Match event is not a JSON object: {event!r}")
+            events.append(validate(event, years))
+        except (ValueError, TypeError) as error:
+            # json.JSONDecodeError and UnicodeDecodeError are ValueErrors too
+            logger.warning("Skipping a line of %s that is not a valid match event: %s", log_path, error)
+            rejected += 1
+    return events, offset + len(complete), rejected
+
+
+def outcome(event):
+    """Return (winner, loser) of a match, or None for a draw. A shoot-out only decides who goes through."""
+    home, away = event["home"], event["away"]
+    if event["home_goals"] > event["away_goals"]:
+        return home, away
+    if event["home_goals"] < event["away_goals"]:
+        return away, home
+    return None
+
+
+def record_deltas(event, seen):
+    """Return the changes a match makes to the team records, as (team, {column: delta}) pairs.
+
+    seen holds the (team, tournament) pairs applied so far: the first match of a team in a
+    tournament also adds one to its 'Tournaments Participated'.
+    """
+    result = outcome(event)
+    deltas = []
+    for team, scored, conceded in ((event["home"], event["home_goals"], event["away_goals"]),
+                                   (event["away"], event["away_goals"], event["home_goals"])):
+        if result is None:
+            won, drawn, lost, points = 0, 1, 0, DRAW_POINTS
+        elif result[0] == team:
+            won, drawn, lost, points = 1, 0, 0, WIN_POINTS
+        else:
+            won, drawn, lost, points = 0, 0, 1, LOSS_POINTS
+        first_match = (team, event["tournament"]) not in seen
+        seen.add((team, event["tournament"]))
+        deltas.append((team, {
+            'Tournaments Participated': int(first_match), 'Matches Played': 1, 'Won': won, 'Drawn': drawn, 'Lost': lost,
+            'Goals scored': scored, 'Goals conceded': conceded, 'Goal difference': scored - conceded,
+            'Total points': points,
+        }))
+    return deltas
+
+
+def medal_deltas(event, seen=None):
+    """Return the medals a match decides: bronze for a losing semi-finalist, gold and silver for the finalists.
+
+    Since 1984 there is no third place play-off, so both losing semi-finalists get a bronze medal.
+    """
+    if event["stage"] not in ("SF", "F"):
+        return []
+    result = outcome(event)
+    if result is None:
+        # A level knockout match was decided by the shoot-out
+        winner = event["shootout"]
+        result = winner, event["away"] if winner == event["home"] else event["home"]
+    winner, loser = result
+    if event["stage"] == "SF":
+        return [(loser, {'Bronze': 1, 'Total': 1})]
+    return [(winner, {'Gold': 1, 'Total': 1}), (loser, {'Silver': 1, 'Total': 1})]
+
+
+DELTAS = {"team_records": record_deltas, "team_medals": medal_deltas}
+
+
+def counted_tournaments(records, results):
+    """Return the (team, tournament) pairs that the snapshot's 'Tournaments Participated' already counts.
+
+    results is the ProgressionMatrix of the team results (see euro/progression.py): every tournament a team
+    appeared in is counted. The records snapshot was taken during Euro 2024, after Germany and Scotland had
+    played, so it counts one more tournament for them than the results table has columns for. Such extra
+    tournaments are the ones after the last column.
+    """
+    from euro import progression
+
+    appeared = results.codes >= progression.APPEARED
+    rows, columns = np.nonzero(appeared)
+    counted = set(zip(results.teams[rows].tolist(), results.years[columns].tolist()))
+    appearances = dict(zip(results.teams.tolist(), appeared.sum(axis=1).tolist()))
+    last = int(results.years.max())
+    for team, participated in zip(records['Team'], records['Tournaments Participated'].tolist()):
+        # A team without results (a debutant) has no appearances to compare with
+        if team in appearances:
+            # There is a Euro every four years
+            counted.update((team, last + 4 * (extra + 1)) for extra in range(participated - appearances[team]))
+    return counted
+
+
+def known_years(results):
+    """Return the tournaments that match events may belong to, for a ProgressionMatrix of the team results.
+
+    Those are the years of the results table and the Euro after them, which is the one being played
+    while the snapshot is kept up to date.
+    """
+    years = set(results.years.tolist())
+    return frozenset(years | {max(years) + 4})
+
+
+class Standings:
+    """A ranked table that takes per-team deltas and keeps its 'Rank' column up to date.
+
+    The columns are numpy arrays in rank order, next to a list of the teams' sort keys. A delta finds
+    the team's old and new position by bisection and only shifts the rows between those two positions.
+    'Rank' is always 1..n, so that array never changes and every frame shares it.
+    """
+
+    def __init__(self, df, rank_columns):
+        self.columns = list(df.columns)
+        self.rank_columns = rank_columns
+        # The snapshot should already be in rank order, a stable sort keeps it as it is if so.
+        # lexsort sorts by the last key first, and the values are negated to put the highest first.
+        df = df.iloc[np.lexsort([-df[column].to_numpy() for column in reversed(rank_columns)])]
+        # The names are only looked up by code, so a new frame takes them in rank order without building strings
+        self.names = df['Team'].array
+        self.index = {team: code for code, team in enumerate(self.names)}
+        self.values = {column: df[column].to_numpy(copy=True) for column in self.columns if column not in ('Rank', 'Team')}
+        # 'Team' holds codes into names, so moving a row moves its name along with the numbers
+        self.values['Team'] = np.arange(len(df))
+        # bisect wants ascending keys, hence the negation. keys is in rank order, team_keys by team code.
+        self.keys = list(zip(*((-self.values[column]).tolist() for column in rank_columns)))
+        self.team_keys = dict(zip(self.values['Team'].tolist(), self.keys))
+        self.rank = self._rank(len(df), df['Rank'].dtype if 'Rank' in df else np.int64)
+        self._shared = False
+
+    @staticmethod
+    def _rank(size, dtype):
+        rank = np.arange(1, size + 1, dtype=dtype)
+        rank.flags.writeable = False
+        return rank
+
+    def _key(self, position):
+        return tuple(-int(self.values[column][position]) for column in self.rank_columns)
+
+    def _own(self):
+        # The arrays of the last frame belong to the sessions showing it, the next batch works on copies
+        if self._shared:
+            self.values = {column: values.copy() for column, values in self.values.items()}
+            self._shared = False
+
+    def _add(self, team):
+        # A new team goes in at the bottom with zeros (and no key yet), apply() then moves it up
+        self.index[team] = len(self.names)
+        self.names = pd.concat([pd.Series(self.names), pd.Series([team], dtype=self.names.dtype)], ignore_index=True).array
+        self.values = {column: np.append(values, 0 if column != 'Team' else self.index[team]).astype(values.dtype)
+                       for column, values in self.values.items()}
+        self.rank = self._rank(len(self.names), self.rank.dtype)
+
+    def apply(self, team, delta):
+        """Add a delta to a team's row and move the team to its new rank.
+
+        A team that is not in the table yet (e.g. a debutant) is added with zeros first, below every team it does not beat.
+        """
+        self._own()
+        if team in self.index:
+            code = self.index[team]
+            key = self.team_keys[code]
+            # The team is somewhere among the teams with the same key
+            lo, hi = bisect.bisect_left(self.keys, key), bisect.bisect_right(self.keys, key)
+            old = lo + int(np.flatnonzero(self.values['Team'][lo:hi] == code)[0])
+            del self.keys[old]
+        else:
+            self._add(team)
+            code = self.index[team]
+            old = len(self.keys)
+        for column, value in delta.items():
+            self.values[column][old] += value
+        key = self.team_keys[code] = self._key(old)
+        # Ties keep their order: a team that moves up goes behind the teams it only draws level with
+        new = bisect.bisect_right(self.keys, key)
+        self.keys.insert(new, key)
+        if new != old:
+            for values in self.values.values():
+                row = values[old]
+                # numpy copies overlapping slices through a buffer, so this shifts the rows in between by one
+                if new < old:
+                    values[new + 1:old + 1] = values[new:old]
+                else:
+                    values[old:new] = values[old + 1:new + 1]
+                values[new] = row
+
+    def frame(self):
+        """Return the table as a new DataFrame in rank order, with the dtypes of the snapshot.
+
+        The DataFrame uses the arrays as they are, so the next apply() copies them first.
+        """
+        self._shared = True
+        for values in self.values.values():
+            values.flags.writeable = False
+        columns = dict(self.values, Rank=self.rank, Team=self.names.take(self.values['Team']))
+        return pd.DataFrame({column: columns[column] for column in self.columns}, copy=False)
+
+
+class Overlay:
+    """The snapshot of one dataset with the event log applied to it.
+
+    Each call to update() reads only the part of the log written since the previous call, so a new
+    match costs the deltas of that match and not a rebuild of the table.
+    """
+
+    def __init__(self, name, base_version, base_df, results=None):
+        self.name = name
+        self.base_version = base_version
+        self.standings = Standings(base_df, RANK_COLUMNS[name])
+        self.offset = 0
+        self.events = 0
+        self.rejected = 0
+        self.seen = set()
+        self.years = None
+        if results is not None:
+            self.years = known_years(results)
+            if 'Tournaments Participated' in base_df:
+                self.seen = counted_tournaments(base_df, results)
+        self._frame = base_df
+
+    def update(self, log_path):
+        """Apply the new events in the log and return the current table."""
+        events, self.offset, rejected = read_events(log_path, self.offset, self.years)
+        self.rejected += rejected
+        for event in events:
+            for team, delta in DELTAS[self.name](event, self.seen):
+                self.standings.apply(team, delta)
+        if events:
+            self.events += len(events)
+            self._frame = self.standings.frame()
+        return self._frame
+
+    @property
+    def version(self):
+        # The log is append-only, so the number of bytes applied identifies its content
+        return f"{self.base_version}+{self.offset}"
+
+
+_lock = threading.Lock()
+# name -> Overlay of the dataset's current snapshot
+_overlays = {}
+# name -> (version, DataFrame, number of events) of the last overlay that was applied without an error
+_last_good = {}
+# Event log lines skipped as invalid, counted for every dataset that read them (a replay counts them again)
+_stats = {"rejected": 0}
+
+
+def overlay(name, base_version, load_base, log_path, load_results=None):
+    """Return (version, DataFrame) of a dataset with the event log applied.
+
+    load_base() is only called when the snapshot changed (or the log was rewritten), which replays
+    the whole log once. Otherwise only the events appended since the last call are applied.
+    load_results() returns the ProgressionMatrix for counted_tournaments() and known_years(), it is called
+    at the same time.
+    If applying the log fails anyway, the error is logged and the last good table is returned, so
+    a broken log never takes the Match Performance and Tournaments Statistics pages down with it.
+    """
+    size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+    with _lock:
+        current = _overlays.get(name)
+        try:
+            if current is None or current.base_version != base_version or size < current.offset:
+                results = load_results() if load_results is not None else None
+                current = _overlays[name] = Overlay(name, base_version, load_base(), results)
+            rejected = current.rejected
+            df = current.update(log_path)
+            _stats["rejected"] += current.rejected - rejected
+            _last_good[name] = current.version, df, current.events
+        except Exception:
+            # The overlay may be half updated, so it is dropped and the next load replays the log from the start
+            _overlays.pop(name, None)
+            if name not in _last_good:
+                # Nothing applied yet: the plain snapshot is still better than an error page
+                _last_good[name] = base_version, load_base(), 0
+            logger.exception("Could not apply %s to %s, serving version %s instead", log_path, name, _last_good[name][0])
+        version, df, _ = _last_good[name]
+        return version, df
+
+
+def applied_events(name="team_records"):
+    """Return how many logged matches are included in a dataset."""
+    with _lock:
+        return _last_good[name][2] if name in _last_good else 0
+
+
+def rejected_events():
+    """Return how many lines of the event log were skipped as invalid."""
+    with _lock:
+        return _stats["rejected"]
+
+
+if __name__ == "__main__":
+    # Record a result from the command line, e.g.
+    # python -m euro.live 2024 GS Germany Scotland 5 1
+    # python -m euro.live 2024 QF Portugal France 0 0 --shootout France
+    import argparse
+
+    from euro import data
+
+    parser = argparse.ArgumentParser(description="Append a match result to the live event log.")
+    parser.add_argument("tournament", type=int)
+    parser.add_argument("stage", choices=STAGES)
+    parser.add_argument("home")
+    parser.add_argument("away")
+    parser.add_argument("home_goals", type=int)
+    parser.add_argument("away_goals", type=int)
+    parser.add_argument("--shootout", help="winner of the penalty shoot-out")
+    args = parser.parse_args()
+    match = {key: value for key, value in vars(args).items() if value is not None}
+    append(match, data.EVENTS_FILE)
+    print(f"Recorded {args.home} {args.home_goals}-{args.away_goals} {args.away} in {data.EVENTS_FILE}")
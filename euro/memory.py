@@ -0,0 +1,201 @@
+# Process-wide cache of the heavy objects the pages show, with a memory budget.
+# Every rerun of a page used to filter its own copies of the tables and build its own figures, and while a
+# session was open those copies stayed referenced from it, so memory grew with every viewer on match days.
+# Now the tables and figures for a selection are built once, kept here for every session, and the sessions only
+# remember which selection they show: a few short keys in st.session_state. The cache has a budget in bytes
+# (EURO_CACHE_MB, 256 MB by default) and evicts the least recently used entries when it is over it.
+# An evicted entry is simply built again by the next rerun that needs it.
+# https://docs.python.org/3/library/collections.html#collections.OrderedDict
+# https://docs.streamlit.io/develop/concepts/architecture/session-state
+#
+# The bytes are estimates: numpy and pandas report their own buffers, figures count as their JSON.
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from euro import data
+
+BUDGET_BYTES = int(float(os.environ.get("EURO_CACHE_MB", "256")) * 1024 * 1024)
+
+# The session state entry holding the keys of what a session shows, see record()
+SESSION_KEY = "_euro_views"
+
+
+def size_of(value):
+    """Return roughly how many bytes a cached value takes."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value.values())
+    if type(value).__module__.startswith("plotly."):
+        from euro import payload
+
+        return payload.figure_bytes(value)
+    return sys.getsizeof(value)
+
+
+class MemoryCache:
+    """LRU cache that keeps the total size of its entries under a budget in bytes.
+
+    An entry bigger than the whole budget is still returned to the caller, it is just not kept.
+    """
+
+    def __init__(self, budget=BUDGET_BYTES):
+        self.budget = budget
+        # key -> (value, bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, build, size=None):
+        """Return the value for key, calling build() when it is not cached.
+
+        size(value) gives the bytes of a new entry, by default size_of().
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        # Build outside the lock. Two sessions may race to build the same entry, which only costs a duplicate build.
+        value = build()
+        nbytes = (size or size_of)(value)
+        with self._lock:
+            self.misses += 1
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            if nbytes <= self.budget:
+                self._entries[key] = (value, nbytes)
+                self.bytes += nbytes
+            while self.bytes > self.budget:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return value
+
+    def peek(self, key, default=None):
+        """Return the value for key if it is cached (counted as a hit), or default, without building anything."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def size(self, key):
+        """Return the bytes of an entry, or 0 if it is not cached (any more)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return 0 if entry is None else entry[1]
+
+    def count(self, kind):
+        """Return the number of entries whose key starts with kind."""
+        with self._lock:
+            return sum(1 for key in self._entries if key[0] == kind)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self.bytes, "budget": self.budget}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+
+# One cache per server process, shared by all sessions
+cache = MemoryCache()
+
+# session id -> the dict of {slot: cache key} kept in that session's state, for the per-session metrics
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def record(slot, key):
+    """Remember in the current session which cache entry it shows in a slot of the page.
+
+    Only the key goes into the session state, the value stays in the cache. Outside a Streamlit script run
+    (warm-up, the API, benchmarks) there is no session to remember it for.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return
+    import streamlit as st
+
+    views = st.session_state.get(SESSION_KEY)
+    if views is None:
+        views = st.session_state[SESSION_KEY] = {}
+    views[slot] = key
+    with _sessions_lock:
+        _sessions[ctx.session_id] = views
+
+
+def cached(key, names, build, slot=None):
+    """Return build(), cached per key and version of the named datasets within the memory budget.
+
+    key is a tuple that starts with a name for what is built, followed by the selection it is built for,
+    e.g. ("goals_and_points_table", "Top 5 teams"). The session calling it remembers the key under slot,
+    which names the place on the page and defaults to key[0].
+    """
+    full_key = key + (tuple(data.version(name) for name in names),)
+    value = cache.get(full_key, build)
+    record(key[0] if slot is None else slot, full_key)
+    return value
+
+
+def _prune_sessions():
+    # Sessions whose browser tab was closed drop out of the metrics.
+    # Without a running Streamlit server (e.g. in AppTest) every session is kept.
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        return
+    runtime = Runtime.instance()
+    with _sessions_lock:
+        for session_id in [session_id for session_id in _sessions if not runtime.is_active_session(session_id)]:
+            del _sessions[session_id]
+
+
+def session_bytes():
+    """Return session id -> bytes of cached entries that the session is showing.
+
+    Sessions that show the same selection share its entry, so these add up to more than cache.bytes.
+    """
+    _prune_sessions()
+    with _sessions_lock:
+        sessions = {session_id: list(views.values()) for session_id, views in _sessions.items()}
+    return {session_id: sum(cache.size(key) for key in set(keys)) for session_id, keys in sessions.items()}
+
+
+def current_session_bytes():
+    """Return the bytes of cached entries the current session is showing."""
+    import streamlit as st
+
+    views = st.session_state.get(SESSION_KEY) or {}
+    return sum(cache.size(key) for key in set(views.values()))
@@ -0,0 +1,87 @@
+# Compact transport of figures and tables to the browser.
+# Every rerun sends each chart as Plotly JSON and each table as Arrow data over the websocket. On a slow
+# connection that transfer is most of the wait, so in compact mode (the default, EURO_COMPACT=0 turns it off):
+#   - figures use a slim template instead of Plotly's default one, which is ~6 KB of JSON in every figure.
+#     Streamlit applies its own theme in the browser anyway, only the colours of the traces come from the template.
+#   - figures with many points drop their per-point text labels, which are mostly unreadable at that size.
+#   - tables only send the columns they show, with numbers downcast to the smallest dtype that holds them.
+#   - tables longer than EURO_PAGE_SIZE rows (100 by default) are paginated on the server.
+#
+# Plotly has no WebGL version of bar charts, and Plotly 6 removed the WebGL heatmap, so big bar and heatmap
+# figures are slimmed down by dropping text instead of switching trace types.
+
+import os
+
+import pandas as pd
+
+COMPACT = os.environ.get("EURO_COMPACT", "1") == "1"
+PAGE_SIZE = int(os.environ.get("EURO_PAGE_SIZE", "100"))
+# Above this many points (bars, slices or heatmap cells) a figure counts as large
+LARGE_FIGURE_POINTS = 2000
+
+_slim_template = None
+
+
+def slim_template():
+    """Return a Plotly template that only keeps the default trace colours."""
+    global _slim_template
+    if _slim_template is None:
+        import plotly.graph_objects as go
+        import plotly.io as pio
+
+        default = pio.templates["plotly"].layout
+        _slim_template = go.layout.Template(layout=dict(colorway=default.colorway))
+    return _slim_template
+
+
+def _points(trace):
+    for attribute in ("z", "values", "y", "x"):
+        values = getattr(trace, attribute, None)
+        if values is not None:
+            return sum(len(row) for row in values) if attribute == "z" else len(values)
+    return 0
+
+
+def compact_figure(fig):
+    """Slim a figure down for sending, in place. Does nothing when compact mode is off."""
+    if not COMPACT:
+        return fig
+    fig.update_layout(template=slim_template())
+    if sum(_points(trace) for trace in fig.data) > LARGE_FIGURE_POINTS:
+        for trace in fig.data:
+            if trace.type in ("bar", "heatmap"):
+                trace.update(text=None, texttemplate=None)
+                if trace.type == "heatmap":
+                    trace.update(hovertemplate="%{y} in %{x}: %{z}<extra></extra>")
+    return fig
+
+
+def compact_frame(df, columns=None):
+    """Return only the given columns of df, with numeric columns downcast when compact mode is on."""
+    if columns is not None:
+        df = df[list(columns)]
+    if not COMPACT:
+        return df
+    downcast = {}
+    for column in df.select_dtypes('number').columns:
+        kind = 'integer' if pd.api.types.is_integer_dtype(df[column]) else 'float'
+        downcast[column] = pd.to_numeric(df[column], downcast=kind)
+    return df.assign(**downcast) if downcast else df
+
+
+def page_count(rows):
+    return max(1, -(-rows // PAGE_SIZE))
+
+
+def table_bytes(df):
+    """Roughly how many bytes a table takes on the wire, as Arrow data."""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, preserve_index=False).nbytes
+
+
+def figure_bytes(fig):
+    """How many bytes of JSON a figure takes on the wire."""
+    import plotly.io as pio
+
+    return len(pio.to_json(fig, validate=False))
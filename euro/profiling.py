@@ -0,0 +1,329 @@
+# Opt-in profiling of page reruns.
+# When a page feels slow it is hard to tell whether the time goes into loading data, filtering with pandas,
+# building the Plotly figure, serializing it, or sending tables to the browser. With profiling on, every rerun
+# times each of these phases and:
+#   - logs one structured JSON line per rerun on the "euro.profiling" logger,
+#   - adds the timings to Prometheus-style counters (prometheus_text(), or an HTTP endpoint, see below),
+#   - shows a breakdown of the current rerun in the sidebar.
+#
+# Turn it on for the whole server with EURO_PROFILE=1. Profiling one browser session from the URL is off by
+# default, as the sidebar panel shows cache sizes to whoever asks for it. With EURO_PROFILE_ALLOW_QUERY=1, opening
+# a page with ?profile=<token> turns it on for that session, where the token is EURO_PROFILE_TOKEN or
+# profile_token in .streamlit/secrets.toml.
+# EURO_PROFILE_PORT=9108 also serves the counters at http://127.0.0.1:9108/metrics (EURO_PROFILE_HOST to bind
+# another address), started by euro/warmup.py in every server process.
+# Figures that are built on the figure pool (euro/figures.py) are timed as part of the rerun that asked for them.
+# With profiling off, phase() does nothing but check two flags.
+# https://docs.streamlit.io/develop/concepts/connections/secrets-management
+
+import copy
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# The phases I time. Time spent in a nested phase only counts for the inner one.
+PHASES = ("read_csv", "filter", "figure", "serialize", "plotly_chart", "dataframe")
+
+ENABLED = os.environ.get("EURO_PROFILE", "0") == "1"
+QUERY_ALLOWED = os.environ.get("EURO_PROFILE_ALLOW_QUERY", "0") == "1"
+
+_lock = threading.Lock()
+# The rerun being timed in this thread, if any
+_local = threading.local()
+# (page, phase) -> [seconds, calls], and page -> reruns. Phases outside a rerun (e.g. warm-up) go under page "".
+_counters = defaultdict(lambda: [0.0, 0])
+_reruns = defaultdict(int)
+# (page, kind) -> bytes of figures and tables sent to the browser
+_bytes = defaultdict(int)
+_metrics_server = None
+
+
+class _Run:
+    def __init__(self, page, session):
+        self.page = page
+        self.session = session
+        self.start = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.bytes = defaultdict(int)
+        # Stack of [phase, time spent in nested phases] for exclusive timings
+        self.stack = []
+
+    def on_thread(self):
+        """Return the same run with its own stack of phases, for another thread."""
+        run = copy.copy(self)
+        run.stack = []
+        return run
+
+
+def _token():
+    token = os.environ.get("EURO_PROFILE_TOKEN")
+    if token:
+        return token
+    import streamlit as st
+
+    try:
+        return st.secrets.get("profile_token")
+    except Exception:
+        # No secrets.toml
+        return None
+
+
+def _session_enabled():
+    # ?profile=<token> turns profiling on for the rest of the browser session, when it is allowed at all
+    if not QUERY_ALLOWED:
+        return False
+    import streamlit as st
+
+    try:
+        value = st.query_params.get("profile")
+        if value and not st.session_state.get("_euro_profile", False):
+            token = _token()
+            if token and hmac.compare_digest(value.encode(), str(token).encode()):
+                st.session_state["_euro_profile"] = True
+        return st.session_state.get("_euro_profile", False)
+    except Exception:
+        # Not running inside a Streamlit script, e.g. in a benchmark
+        return False
+
+
+def begin_run(page):
+    """Start timing a rerun of a page. Call it at the top of the page, after st.set_page_config."""
+    _local.run = None
+    if not (ENABLED or _session_enabled()):
+        return
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        session = get_script_run_ctx().session_id
+    except Exception:
+        session = None
+    _local.run = _Run(page, session)
+
+
+@contextmanager
+def phase(name):
+    """Time a block of code as one of the PHASES."""
+    run = getattr(_local, "run", None)
+    if run is None and not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    frame = [name, 0.0]
+    stack = run.stack if run is not None else _thread_stack()
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        stack.pop()
+        elapsed = time.perf_counter() - start
+        if stack:
+            stack[-1][1] += elapsed
+        exclusive = elapsed - frame[1]
+        page = run.page if run is not None else ""
+        with _lock:
+            # The figure pool adds to the same run from its threads, see propagate()
+            if run is not None:
+                run.phases[name] += exclusive
+                run.calls[name] += 1
+            counter = _counters[(page, name)]
+            counter[0] += exclusive
+            counter[1] += 1
+
+
+def _thread_stack():
+    # Phases timed outside a rerun (with EURO_PROFILE=1) still need their own stack per thread
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def propagate(func):
+    """Return func wrapped to run as part of the current rerun on another thread, e.g. the figure pool.
+
+    The pool thread gets its own stack of phases. It runs at the same time as the script thread, so the
+    phases of a rerun can add up to more than its total time. A build that two sessions share counts for
+    the one that started it.
+    """
+    run = getattr(_local, "run", None)
+    if run is None:
+        return func
+
+    def wrapper(*args, **kwargs):
+        previous = getattr(_local, "run", None)
+        _local.run = run.on_thread()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.run = previous
+    return wrapper
+
+
+def active():
+    """Return True when the current rerun is being profiled."""
+    return getattr(_local, "run", None) is not None
+
+
+def record_bytes(kind, size):
+    """Count bytes sent to the browser for the current rerun, kind is "figure" or "table"."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    with _lock:
+        run.bytes[kind] += size
+        _bytes[(run.page, kind)] += size
+
+
+def timed(name):
+    """Decorator version of phase()."""
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorator
+
+
+def end_run():
+    """Finish timing the rerun: log it, add it to the counters and show the sidebar panel."""
+    run = getattr(_local, "run", None)
+    if run is None:
+        return
+    _local.run = None
+    total = time.perf_counter() - run.start
+    with _lock:
+        _reruns[run.page] += 1
+    record = {
+        "event": "rerun", "page": run.page, "session": run.session, "total_ms": round(total * 1000, 2),
+        "phases_ms": {name: round(run.phases[name] * 1000, 2) for name in PHASES if name in run.phases},
+        "calls": dict(run.calls), "bytes": dict(run.bytes),
+    }
+    logger.info(json.dumps(record))
+    _show_panel(run, total)
+
+
+def _show_panel(run, total):
+    import streamlit as st
+
+    with st.sidebar.expander("Profiling (this rerun)", expanded=True):
+        rows = [{"Phase": name, "ms": round(run.phases[name] * 1000, 2), "Calls": run.calls[name]} for name in PHASES]
+        # Figures built on the pool overlap the script thread, so the phases may add up to more than the total
+        other = max(0.0, total - sum(run.phases.values()))
+        rows.append({"Phase": "other (Streamlit, page code)", "ms": round(other * 1000, 2), "Calls": 1})
+        st.dataframe(rows, hide_index=True)
+        st.caption(f"Total {total * 1000:.1f} ms for page `{run.page}`, sent "
+                   f"{run.bytes['figure'] / 1024:.1f} KB of figures and {run.bytes['table'] / 1024:.1f} KB of tables")
+        from euro import memory
+
+        stats = memory.cache.stats()
+        st.caption(f"This session shows {memory.current_session_bytes() / 1024:.1f} KB of cached tables and figures, "
+                   f"the cache holds {stats['bytes'] / 2**20:.1f} of {stats['budget'] / 2**20:.0f} MB for all sessions")
+
+
+def prometheus_text():
+    """Return all counters in the Prometheus text exposition format."""
+    from euro import data, figures, live, memory
+
+    lines = [
+        "# HELP euro_phase_seconds_total Time spent in each phase of page reruns.",
+        "# TYPE euro_phase_seconds_total counter",
+    ]
+    with _lock:
+        counters = dict(_counters)
+        reruns = dict(_reruns)
+    for (page, name), (seconds, _) in sorted(counters.items()):
+        lines.append(f'euro_phase_seconds_total{{page="{page}",phase="{name}"}} {seconds:.6f}')
+    lines += ["# HELP euro_phase_calls_total Number of times each phase ran.", "# TYPE euro_phase_calls_total counter"]
+    for (page, name), (_, calls) in sorted(counters.items()):
+        lines.append(f'euro_phase_calls_total{{page="{page}",phase="{name}"}} {calls}')
+    lines += ["# HELP euro_payload_bytes_total Bytes of figures and tables sent to the browser.",
+              "# TYPE euro_payload_bytes_total counter"]
+    with _lock:
+        payload_bytes = dict(_bytes)
+    for (page, kind), size in sorted(payload_bytes.items()):
+        lines.append(f'euro_payload_bytes_total{{page="{page}",kind="{kind}"}} {size}')
+    lines += ["# HELP euro_reruns_total Number of profiled page reruns.", "# TYPE euro_reruns_total counter"]
+    for page, count in sorted(reruns.items()):
+        lines.append(f'euro_reruns_total{{page="{page}"}} {count}')
+
+    data_stats = data.cache_stats()
+    figure_stats = figures.cache.stats()
+    lines += [
+        "# TYPE euro_data_cache_hits_total counter", f"euro_data_cache_hits_total {data_stats['hits']}",
+        "# TYPE euro_data_cache_misses_total counter", f"euro_data_cache_misses_total {data_stats['misses']}",
+        "# TYPE euro_data_reloads_total counter", f"euro_data_reloads_total {data_stats['reloads']}",
+        "# TYPE euro_data_rejected_total counter", f"euro_data_rejected_total {data_stats['rejected']}",
+        "# HELP euro_live_events_rejected_total Lines of the match event log skipped as invalid.",
+        "# TYPE euro_live_events_rejected_total counter", f"euro_live_events_rejected_total {live.rejected_events()}",
+        "# TYPE euro_figure_cache_hits_total counter", f"euro_figure_cache_hits_total {figure_stats['hits']}",
+        "# TYPE euro_figure_cache_misses_total counter", f"euro_figure_cache_misses_total {figure_stats['misses']}",
+        "# TYPE euro_figure_cache_entries gauge", f"euro_figure_cache_entries {figure_stats['entries']}",
+    ]
+
+    # The memory cache of euro/memory.py, and what the open sessions show from it
+    memory_stats = memory.cache.stats()
+    sessions = memory.session_bytes()
+    lines += [
+        "# HELP euro_memory_cache_bytes Bytes of tables and figures retained for all sessions.",
+        "# TYPE euro_memory_cache_bytes gauge", f"euro_memory_cache_bytes {memory_stats['bytes']}",
+        "# TYPE euro_memory_cache_budget_bytes gauge", f"euro_memory_cache_budget_bytes {memory_stats['budget']}",
+        "# TYPE euro_memory_cache_entries gauge", f"euro_memory_cache_entries {memory_stats['entries']}",
+        "# TYPE euro_memory_cache_hits_total counter", f"euro_memory_cache_hits_total {memory_stats['hits']}",
+        "# TYPE euro_memory_cache_misses_total counter", f"euro_memory_cache_misses_total {memory_stats['misses']}",
+        "# TYPE euro_memory_cache_evictions_total counter", f"euro_memory_cache_evictions_total {memory_stats['evictions']}",
+        "# HELP euro_sessions Open sessions that show something from the memory cache.",
+        "# TYPE euro_sessions gauge", f"euro_sessions {len(sessions)}",
+        "# HELP euro_session_retained_bytes Bytes of cached tables and figures shown by each open session.",
+        "# TYPE euro_session_retained_bytes gauge",
+    ]
+    # One series per session would be too many on match days, so the sessions are summarised
+    for stat, value in (("max", max(sessions.values(), default=0)), ("sum", sum(sessions.values())),
+                        ("mean", sum(sessions.values()) / len(sessions) if sessions else 0)):
+        lines.append(f'euro_session_retained_bytes{{stat="{stat}"}} {value:.0f}')
+    return "\n".join(lines) + "\n"
+
+
+def start_metrics_server():
+    """Serve prometheus_text() at /metrics on EURO_PROFILE_PORT, once per process. Does nothing if it is not set.
+
+    It listens on 127.0.0.1 unless EURO_PROFILE_HOST says otherwise, so only the host (or a scraper on it) can read it.
+    """
+    global _metrics_server
+    port = os.environ.get("EURO_PROFILE_PORT")
+    if not port or _metrics_server is not None:
+        return
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = prometheus_text().encode()
+            self.send_response(200 if self.path == "/metrics" else 404)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    host = os.environ.get("EURO_PROFILE_HOST", "127.0.0.1")
+    with _lock:
+        if _metrics_server is not None:
+            return
+        try:
+            _metrics_server = ThreadingHTTPServer((host, int(port)), Handler)
+        except OSError:
+            # E.g. the port is taken by another server process, the app itself keeps working
+            logger.exception("Could not serve the metrics on %s:%s", host, port)
+            return
+    logger.info("Serving the metrics at http://%s:%s/metrics", host, port)
+    threading.Thread(target=_metrics_server.serve_forever, name="euro-metrics", daemon=True).start()
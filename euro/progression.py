@@ -0,0 +1,168 @@
+# Tournament progression matrix built from 400-team_results.csv.
+# The CSV has one row per team and one column per tournament, with codes like DNQ, GS or R16 in every cell.
+# I encode it once into a small integer matrix (teams x tournaments) where a bigger number means the team went
+# further, so "best finish", "appearances" and "longest streak" become plain NumPy operations over the matrix
+# instead of loops over rows. This stays fast with thousands of teams and many more tournaments.
+# https://numpy.org/doc/stable/user/basics.broadcasting.html
+
+import numpy as np
+import pandas as pd
+
+from euro import data, memory, payload, profiling, shared
+
+# Result codes from worst to best. The position in this list is the code stored in the matrix.
+# Empty cells are tournaments held before the team existed (e.g. Croatia before 1996).
+# Before 1980 only 4 teams played the final tournament, so "3" and "4" are third and fourth place, while "SF"
+# is used after the third place playoff was removed in 1984.
+RESULT_CODES = ["", "NE", "DQ", "DNQ", "GS", "R16", "QF", "4", "SF", "3", "2", "1"]
+RESULT_LABELS = ["Did not exist", "Did not enter", "Disqualified", "Did not qualify", "Group stage", "Round of 16",
+                 "Quarter-finals", "Fourth place", "Semi-finals", "Third place", "Runner-up", "Winner"]
+
+# A team "appeared" in a tournament when it reached the final tournament, i.e. the group stage or better
+APPEARED = RESULT_CODES.index("GS")
+WINNER = RESULT_CODES.index("1")
+
+
+class ProgressionMatrix:
+    """Results of every team in every tournament, encoded as small integers.
+
+    codes[i, j] is the index into RESULT_CODES of what teams[i] did in years[j].
+    """
+
+    def __init__(self, teams, years, codes):
+        self.teams = np.asarray(teams)
+        self.years = np.asarray(years)
+        self.codes = codes
+
+    def select(self, first_year=None, last_year=None, teams=None):
+        """Return the matrix limited to a range of tournaments and, optionally, a list of teams.
+
+        Limiting the years is a slice of the columns, so it does not copy the matrix.
+        """
+        lo = 0 if first_year is None else np.searchsorted(self.years, first_year, side="left")
+        hi = len(self.years) if last_year is None else np.searchsorted(self.years, last_year, side="right")
+        codes = self.codes[:, lo:hi]
+        team_names = self.teams
+        if teams is not None:
+            rows = np.flatnonzero(np.isin(self.teams, list(teams)))
+            codes = codes[rows]
+            team_names = self.teams[rows]
+        return ProgressionMatrix(team_names, self.years[lo:hi], codes)
+
+    def take(self, rows):
+        """Return the matrix with only the given rows, in that order."""
+        rows = np.asarray(rows)
+        return ProgressionMatrix(self.teams[rows], self.years, self.codes[rows])
+
+
+def encode(results):
+    """Encode a team results table (Team column plus one column per tournament year) into a ProgressionMatrix."""
+    # Wikipedia footnote markers like "Germany[b]" or "NE[d]" are not part of the names or codes
+    teams = results['Team'].str.replace(r'\[\w+\]', '', regex=True).to_numpy(dtype=str)
+    year_columns = [column for column in results.columns if column != 'Team']
+    cells = results[year_columns].fillna('').to_numpy(dtype=str)
+    cells = np.char.partition(cells, '[')[..., 0]
+
+    # Looking up every cell in the sorted list of codes encodes the whole table in one go
+    order = np.argsort(RESULT_CODES)
+    sorted_codes = np.asarray(RESULT_CODES)[order]
+    positions = np.searchsorted(sorted_codes, cells).clip(0, len(sorted_codes) - 1)
+    unknown = sorted_codes[positions] != cells
+    if unknown.any():
+        raise ValueError(f"Unknown result codes in team results: {sorted(set(cells[unknown]))}")
+    codes = order[positions].astype(np.int8)
+    return ProgressionMatrix(teams, np.array(year_columns, dtype=int), codes)
+
+
+def matrix():
+    """Return the ProgressionMatrix of 400-team_results.csv, encoded once per dataset version."""
+    return data.derived("progression.matrix", ("team_results",), _shared_matrix)
+
+
+def _shared_matrix():
+    # Encoded by one process per host and memory-mapped by the others, see euro/shared.py
+    def build():
+        encoded = encode(data.load("team_results"))
+        return {"teams": encoded.teams, "years": encoded.years, "codes": encoded.codes}
+
+    arrays = shared.arrays("progression.matrix", ("team_results",), build)
+    return ProgressionMatrix(arrays["teams"], arrays["years"], arrays["codes"])
+
+
+def longest_runs(mask):
+    """Return the longest run of consecutive True values in each row of a 2D boolean array."""
+    if mask.shape[1] == 0:
+        return np.zeros(mask.shape[0], dtype=np.int32)
+    position = np.arange(1, mask.shape[1] + 1, dtype=np.int32)
+    # For every cell, the position of the last False at or before it. The distance to it is the length of the run
+    # of True values ending at that cell, so the longest run is the row maximum.
+    last_break = np.maximum.accumulate(np.where(mask, 0, position), axis=1)
+    return (position - last_break).max(axis=1)
+
+
+@profiling.timed("filter")
+def team_stats(progression):
+    """Return best finish, appearances, titles and longest appearance streak of every team in a ProgressionMatrix.
+
+    The index of the returned DataFrame is the row of each team in the matrix, so it can be passed to take().
+    """
+    codes = progression.codes
+    appeared = codes >= APPEARED
+    if codes.shape[1]:
+        best = codes.max(axis=1)
+        # argmax finds the first True in each row, which is the first appearance
+        first = np.where(appeared.any(axis=1), progression.years[appeared.argmax(axis=1)], 0)
+    else:
+        best = np.zeros(len(codes), dtype=np.int8)
+        first = np.zeros(len(codes), dtype=int)
+    stats = pd.DataFrame({
+        'Team': progression.teams,
+        'Best finish': np.asarray(RESULT_LABELS)[best],
+        'Appearances': appeared.sum(axis=1),
+        'Titles': (codes == WINNER).sum(axis=1),
+        'Longest streak': longest_runs(appeared),
+        'First appearance': pd.arrays.IntegerArray(first.astype('int64'), mask=first == 0),
+        '_best': best,
+    })
+    # Best teams first: furthest they ever went, then how often they were there
+    stats = stats.sort_values(['_best', 'Appearances', 'Titles'], ascending=False, kind='stable')
+    return stats.drop(columns='_best')
+
+
+@profiling.timed("figure")
+def build_heatmap(progression):
+    """Return a heatmap of a ProgressionMatrix with one discrete colour per result."""
+    import plotly.graph_objects as go
+
+    levels = len(RESULT_CODES)
+    colors = ['#ffffff', '#e5e5e5', '#bdbdbd', '#d9d9d9', '#c6dbef', '#9ecae1', '#6baed6',
+              '#4292c6', '#2171b5', '#08519c', '#fed700', '#fe218b']
+    # A stepped colour scale, so every code gets exactly one colour instead of a gradient
+    colorscale = []
+    for level, color in enumerate(colors):
+        colorscale += [[level / levels, color], [(level + 1) / levels, color]]
+
+    fig = go.Figure(go.Heatmap(
+        z=progression.codes, x=[str(year) for year in progression.years], y=progression.teams,
+        zmin=-0.5, zmax=levels - 0.5, colorscale=colorscale, xgap=1, ygap=1,
+        colorbar=dict(tickvals=list(range(levels)), ticktext=RESULT_LABELS, title="Result"),
+        text=np.asarray(RESULT_LABELS)[progression.codes], hovertemplate="%{y} in %{x}: %{text}<extra></extra>",
+    ))
+    fig.update_layout(height=max(400, 22 * len(progression.teams)), title_text="Tournament progression by team",
+                      yaxis=dict(autorange="reversed"))
+    return payload.compact_figure(fig)
+
+
+def view(first_year, last_year, min_appearances, top_teams):
+    """Return the team statistics and the heatmap for a position of the sliders on the Team Progression page.
+
+    Both are kept once per selection for every session, in the memory cache of euro/memory.py.
+    """
+    def build():
+        selected = matrix().select(first_year, last_year)
+        stats = team_stats(selected)
+        stats = stats[stats['Appearances'] >= min_appearances]
+        # The graph shows the best teams first, in the same order as the table
+        return stats, build_heatmap(selected.take(stats.index[:top_teams]))
+
+    return memory.cached(("progression.view", first_year, last_year, min_appearances, top_teams), ("team_results",), build)
@@ -0,0 +1,65 @@
+# Precomputed rankings for "top N by metric" queries.
+# The pages keep asking for the top 5/10/all teams by some column, and then for those same teams ordered by
+# other columns. Doing that with nlargest, sort_values and isin sorts and joins the table every time.
+# Instead I sort every numeric column once per dataset version, and the queries become slices of that order.
+# https://numpy.org/doc/stable/reference/generated/numpy.argsort.html
+
+import numpy as np
+
+from euro import data, shared
+
+
+def numeric_columns(df):
+    """Return the columns of a DataFrame that get a ranking."""
+    return list(df.select_dtypes('number').columns)
+
+
+def rank_order(values):
+    """Return the row positions of a column from its highest to its lowest value."""
+    # A stable sort of the negated values puts the highest first and keeps ties in file order
+    return np.argsort(-values.to_numpy(), kind='stable')
+
+
+class RankIndex:
+    """Row order of a DataFrame for every numeric column, from highest to lowest value.
+
+    Ties keep the order of the rows in the file, which matches what df.nlargest(n, column) returns.
+    """
+
+    def __init__(self, df, order=None):
+        self.df = df
+        # The orders can be handed in already computed, e.g. memory-mapped from euro/shared.py
+        self.order = order if order is not None else {column: rank_order(df[column]) for column in numeric_columns(df)}
+
+    def positions(self, column, n=None):
+        """Return the row positions of the top n rows by column (all rows when n is None)."""
+        return self.order[column][:n]
+
+    def top(self, column, n=None):
+        """Return the top n rows by column, highest first (all rows when n is None)."""
+        return self.df.iloc[self.positions(column, n)]
+
+    def ordered(self, column, positions):
+        """Return the rows at the given positions, ordered by column from highest to lowest.
+
+        This walks the precomputed order once with a boolean mask, so it costs O(rows) with no sort and no join.
+        """
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[positions] = True
+        order = self.order[column]
+        return self.df.iloc[order[mask[order]]]
+
+
+def _shared_index(name):
+    df = data.load(name)
+    columns = numeric_columns(df)
+    # The orders are computed by one process per host and memory-mapped by the others, see euro/shared.py.
+    # They are stored by column position, column names do not always make good file names.
+    orders = shared.arrays(f"ranking.{name}", (name,),
+                           lambda: {str(i): rank_order(df[column]) for i, column in enumerate(columns)})
+    return RankIndex(df, {column: orders[str(i)] for i, column in enumerate(columns)})
+
+
+def index(name):
+    """Return the RankIndex of a dataset, built once per dataset version."""
+    return data.derived(f"ranking.{name}", (name,), lambda: _shared_index(name))
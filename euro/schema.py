@@ -0,0 +1,227 @@
+# Contracts of the datasets in the data folder.
+# The pages take for granted that 'Total points', 'Matches Played', 'Card Color', 'Round' and friends exist and hold
+# numbers or known values. A typo in a CSV edit used to show up as a crash in the middle of a page, for every user.
+# Every dataset is now checked against its contract when it is loaded: the columns and their types, the values a
+# column may take, and the sums that must add up (e.g. Won + Drawn + Lost == Matches Played). A few relations
+# between the files are checked too. The checks are vectorised pandas expressions, and run once per version of a
+# dataset. A version that breaks its contract is never imported into the store: the data layer keeps serving the
+# last good snapshot and logs what is wrong, see euro/data.py.
+# https://pandas.pydata.org/docs/reference/api/pandas.api.types.is_integer_dtype.html
+
+import re
+import threading
+
+import pandas as pd
+
+from euro.cards import CARD_COLORS, ROUNDS
+from euro.progression import RESULT_CODES
+
+# At most this many offending rows are quoted per problem
+EXAMPLES = 3
+
+
+class SchemaError(ValueError):
+    """A dataset that does not match its contract. The message lists every problem found."""
+
+    def __init__(self, name, problems):
+        self.name = name
+        self.problems = problems
+        super().__init__(f"{name} does not match its contract:\n" + "\n".join(f"  - {problem}" for problem in problems))
+
+
+def _footnotes(values):
+    # Wikipedia footnote markers like "Germany[b]" or "NE[d]", which euro/progression.py strips as well
+    return values.str.replace(r'\[\w+\]', '', regex=True)
+
+
+def _year_columns(df):
+    return [column for column in df.columns if column != 'Team']
+
+
+# Types a column can have, and how to recognise them
+KINDS = {
+    "int": pd.api.types.is_integer_dtype,
+    "string": lambda dtype: pd.api.types.is_string_dtype(dtype) and not pd.api.types.is_object_dtype(dtype),
+    # Parsed by the 'normalise' step of euro/data.py into Python objects
+    "date": pd.api.types.is_object_dtype,
+    "list": pd.api.types.is_object_dtype,
+}
+
+# Every dataset of euro/data.py with:
+#   columns    name -> kind (see KINDS). Columns that are not listed are allowed.
+#   values     name -> the values the column may take
+#   ranges     name -> (lowest, highest), None for no bound
+#   unique     columns that may not repeat a value
+#   checks     (description, function of the DataFrame returning a boolean Series that is True on good rows)
+CONTRACTS = {
+    "team_records": {
+        "columns": {"Rank": "int", "Team": "string", "Tournaments Participated": "int", "Matches Played": "int",
+                    "Won": "int", "Drawn": "int", "Lost": "int", "Goals scored": "int", "Goals conceded": "int",
+                    "Goal difference": "int", "Total points": "int"},
+        "ranges": {"Rank": (1, None), "Tournaments Participated": (0, None), "Matches Played": (0, None), "Won": (0, None),
+                   "Drawn": (0, None), "Lost": (0, None), "Goals scored": (0, None), "Goals conceded": (0, None),
+                   "Total points": (0, None)},
+        "unique": ["Team"],
+        "checks": [
+            ("Won + Drawn + Lost == Matches Played", lambda df: df['Won'] + df['Drawn'] + df['Lost'] == df['Matches Played']),
+            ("Goals scored - Goals conceded == Goal difference",
+             lambda df: df['Goals scored'] - df['Goals conceded'] == df['Goal difference']),
+            ("3 x Won + Drawn == Total points", lambda df: 3 * df['Won'] + df['Drawn'] == df['Total points']),
+        ],
+    },
+    "team_medals": {
+        "columns": {"Rank": "int", "Team": "string", "Gold": "int", "Silver": "int", "Bronze": "int", "Total": "int"},
+        "ranges": {"Rank": (1, None), "Gold": (0, None), "Silver": (0, None), "Bronze": (0, None), "Total": (0, None)},
+        "unique": ["Team"],
+        "checks": [
+            ("Gold + Silver + Bronze == Total", lambda df: df['Gold'] + df['Silver'] + df['Bronze'] == df['Total']),
+        ],
+    },
+    "host_countries": {
+        "columns": {"Number of times hosted": "int", "Nation": "string", "Year(s)": "list"},
+        "ranges": {"Number of times hosted": (1, None)},
+        "checks": [
+            ("Number of times hosted == number of Year(s)",
+             lambda df: df['Year(s)'].map(len) == df['Number of times hosted']),
+            ("every year in Year(s) is a Euro year (1960, 1964, ...)",
+             lambda df: df['Year(s)'].map(lambda years: all(year >= 1960 and year % 4 == 0 for year in years)).astype(bool)),
+        ],
+    },
+    "red_cards": {
+        "columns": {"Player": "string", "Card Color": "string", "Time of card": "int", "Representing": "string",
+                    "Score": "string", "Opponent": "string", "Tournament": "int", "Round": "string", "Round-Value": "int",
+                    "Date": "date", "Team goals": "int", "Opponent goals": "int"},
+        "values": {"Card Color": CARD_COLORS, "Round": ROUNDS},
+        "ranges": {"Time of card": (1, 120), "Tournament": (1960, None), "Team goals": (0, None), "Opponent goals": (0, None)},
+        "checks": [
+            ("Round-Value is the position of the Round (Group stage = 1, ..., Final = 5)",
+             lambda df: df['Round'].map({name: i + 1 for i, name in enumerate(ROUNDS)}).astype('Int64') == df['Round-Value']),
+            ("Tournament is a Euro year (1960, 1964, ...)", lambda df: df['Tournament'] % 4 == 0),
+        ],
+    },
+    "team_results": {
+        "columns": {"Team": "string"},
+        "unique": ["Team"],
+        "checks": [
+            ("every column after Team is a Euro year", lambda df: pd.Series(
+                all(re.fullmatch(r"\d{4}", str(column)) and int(column) % 4 == 0 for column in _year_columns(df)), index=df.index)),
+            (f"every result is one of {', '.join(code for code in RESULT_CODES if code)} or empty", lambda df: pd.concat(
+                [_footnotes(df[column]).fillna('').isin(RESULT_CODES) for column in _year_columns(df)], axis=1).all(axis=1)),
+        ],
+    },
+}
+
+
+def _titles(results):
+    # Teams (without footnotes) -> number of tournaments won
+    titles = pd.concat([_footnotes(results[column]).eq('1') for column in _year_columns(results)], axis=1).sum(axis=1)
+    return pd.Series(titles.to_numpy(), index=_footnotes(results['Team']).to_numpy())
+
+
+# Relations between two datasets: (dataset, other dataset, description, function(df, other) -> boolean Series of df)
+RELATIONS = [
+    ("team_medals", "team_results", "Gold == number of titles in 400-team_results.csv, for the teams in both",
+     lambda medals, results: medals['Gold'] == medals['Team'].map(_titles(results)).fillna(medals['Gold'])),
+    ("red_cards", "team_results", "Tournament is one of the years of 400-team_results.csv",
+     lambda cards, results: cards['Tournament'].astype(str).isin(_year_columns(results))),
+]
+
+
+def _rows(df, good):
+    # The CSV lines of the rows that fail a check: the header is line 1
+    bad = ~good.fillna(False).to_numpy(dtype=bool)
+    lines = [str(position + 2) for position in bad.nonzero()[0][:EXAMPLES]]
+    more = f" and {bad.sum() - EXAMPLES} more" if bad.sum() > EXAMPLES else ""
+    return bad.any(), f"line {', '.join(lines)}{more}"
+
+
+def validate(name, df):
+    """Return the problems of a dataset's DataFrame against its contract, an empty list if there are none."""
+    contract = CONTRACTS.get(name, {})
+    problems = []
+    for column, kind in contract.get("columns", {}).items():
+        if column not in df.columns:
+            problems.append(f"column '{column}' is missing")
+        elif not KINDS[kind](df[column].dtype):
+            problems.append(f"column '{column}' should hold {kind} values, not {df[column].dtype}")
+    # The remaining checks need the columns, they are skipped for a frame that is already missing some
+    if problems:
+        return problems
+
+    for column in contract.get("columns", {}):
+        failing, where = _rows(df, df[column].notna())
+        if failing:
+            problems.append(f"'{column}' is empty on {where}")
+    for column, allowed in contract.get("values", {}).items():
+        failing, where = _rows(df, df[column].isin(allowed))
+        if failing:
+            problems.append(f"'{column}' should be one of {', '.join(allowed)} on {where}")
+    for column, (lowest, highest) in contract.get("ranges", {}).items():
+        good = pd.Series(True, index=df.index)
+        if lowest is not None:
+            good &= df[column] >= lowest
+        if highest is not None:
+            good &= df[column] <= highest
+        failing, where = _rows(df, good)
+        if failing:
+            problems.append(f"'{column}' should be between {lowest} and {highest if highest is not None else 'any'} on {where}")
+    for column in contract.get("unique", ()):
+        failing, where = _rows(df, ~df[column].duplicated(keep='first'))
+        if failing:
+            problems.append(f"'{column}' repeats a value on {where}")
+    for description, check in contract.get("checks", ()):
+        failing, where = _rows(df, check(df))
+        if failing:
+            problems.append(f"{description} does not hold on {where}")
+    return problems
+
+
+def validate_relations(name, df, load):
+    """Return the problems of the relations between a dataset and the others.
+
+    load(other) returns the DataFrame of another dataset, or None when it is not available yet
+    (its relations are then checked when it is loaded itself).
+    """
+    problems = []
+    for first, second, description, check in RELATIONS:
+        if name not in (first, second):
+            continue
+        other = load(second if name == first else first)
+        if other is None:
+            continue
+        # The relation is about the rows of the first dataset
+        first_df, second_df = (df, other) if name == first else (other, df)
+        failing, where = _rows(first_df, check(first_df, second_df))
+        if failing:
+            problems.append(f"{description} does not hold on {where} of {first}")
+    return problems
+
+
+def related(name):
+    """Return the other datasets that the relations of a dataset read."""
+    return sorted({other for first, second, *_ in RELATIONS if name in (first, second)
+                   for other in (first, second) if other != name})
+
+
+_lock = threading.Lock()
+# (dataset, version) -> problems found in it on its own, so every version is only validated once.
+# The relations are not cached here: they also depend on the other files, which change on their own.
+_verdicts = {}
+
+
+def check(name, version, df, load=None):
+    """Validate a version of a dataset once, and raise SchemaError if it breaks its contract.
+
+    Pass load (see validate_relations) to check the relations to other datasets as well, they are
+    checked against what load returns on every call.
+    """
+    with _lock:
+        problems = _verdicts.get((name, version))
+    if problems is None:
+        problems = validate(name, df)
+        with _lock:
+            _verdicts[(name, version)] = problems
+    if not problems and load is not None:
+        problems = validate_relations(name, df, load)
+    if problems:
+        raise SchemaError(name, problems)
@@ -0,0 +1,66 @@
+# Run several Streamlit server processes that share one copy of the data.
+# Put a load balancer with sticky sessions in front of the ports (Streamlit keeps each session on its websocket).
+# All workers use the same store folder, in shared memory when the host has /dev/shm, so the datasets and
+# everything in euro/shared.py are imported and built once for the host and memory-mapped by every worker.
+# The store is warmed up here before the workers start, so none of them has to build anything.
+#
+#   python -m euro.serve --workers 4 --port 8501      serves on ports 8501 to 8504
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SHM = Path("/dev/shm")
+
+
+def worker_env():
+    """Return the environment of the worker processes, with the store in shared memory if possible."""
+    env = dict(os.environ)
+    if "EURO_STORE_DIR" not in env and SHM.is_dir():
+        env["EURO_STORE_DIR"] = str(SHM / "euro-store")
+    # The main script's folder is on sys.path under streamlit run, but set it for python -c as well
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def warm(env):
+    """Import the datasets and build the shared aggregates and figures, once for all workers.
+
+    The aggregates of older code and data are removed first; no worker is running yet that could map them.
+    """
+    subprocess.run([sys.executable, "-c", "from euro import shared, warmup; shared.clean(); warmup._warm()"],
+                   cwd=ROOT, env=env, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app from several processes sharing one data store.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--port", type=int, default=8501, help="port of the first worker, the others follow")
+    args, streamlit_args = parser.parse_known_args()
+
+    env = worker_env()
+    print(f"Warming up the store in {env.get('EURO_STORE_DIR', 'data/store')}")
+    warm(env)
+    workers = []
+    for i in range(args.workers):
+        command = [sys.executable, "-m", "streamlit", "run", "Welcome.py", "--server.port", str(args.port + i),
+                   "--server.headless", "true", *streamlit_args]
+        own_env = dict(env)
+        if env.get("EURO_PROFILE_PORT"):
+            # Every worker serves its own metrics (see euro/profiling.py), on the ports after the first one
+            own_env["EURO_PROFILE_PORT"] = str(int(env["EURO_PROFILE_PORT"]) + i)
+        workers.append(subprocess.Popen(command, cwd=ROOT, env=own_env))
+    print(f"{args.workers} workers on ports {args.port} to {args.port + args.workers - 1}")
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# Aggregates shared by every server process on a host.
+# The datasets are already memory-mapped from the Arrow store (euro/store.py), so several Streamlit processes
+# share one copy of them in the page cache. The things computed from them (rankings, the progression matrix,
+# the card partitions and the serialized figures) used to be built again in every process. This module writes
+# them next to the datasets once per dataset version: numpy arrays as .npy files and tables as Arrow files,
+# which the other processes memory-map read-only instead of building their own copy. A file lock makes sure
+# only one process builds each of them; the others wait for it and then map the result.
+# Put the store in shared memory (EURO_STORE_DIR=/dev/shm/euro-store) to keep all of it off the disk, see
+# euro/serve.py. Set EURO_SHARED=0 to build everything in each process again.
+# The store outlives the processes, so everything in it is filed under a fingerprint of the code that built it:
+# after a deploy the new code builds its own aggregates instead of mapping the ones of the old code.
+# https://numpy.org/doc/stable/reference/generated/numpy.load.html
+# https://docs.python.org/3/library/fcntl.html#fcntl.flock
+
+import contextlib
+import hashlib
+import importlib.metadata
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from euro import data, store
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: each process then builds what it cannot find, which is only slower
+    fcntl = None
+
+ENABLED = os.environ.get("EURO_SHARED", "1") != "0"
+
+# Threads of one process share the same open lock file, so they need their own lock as well
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+def _fingerprint():
+    # Every module of the euro package, and the libraries whose output is stored (the .npy and Arrow
+    # files, and the figure JSON that Plotly writes)
+    digest = hashlib.sha1()
+    for source in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(source.name.encode())
+        digest.update(source.read_bytes())
+    for package in ("numpy", "pandas", "pyarrow", "plotly"):
+        digest.update(f"{package}=={importlib.metadata.version(package)}".encode())
+    return digest.hexdigest()[:12]
+
+
+FINGERPRINT = _fingerprint()
+
+
+def folder():
+    """Return the folder of the shared aggregates of the running code, inside the dataset store."""
+    return Path(data.STORE_DIR) / "shared" / FINGERPRINT
+
+
+def _safe(key):
+    # Keys can hold any text (figure options), file names get a readable prefix and a hash
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    prefix = "".join(c if c.isalnum() or c in "._-" else "_" for c in key)[:60]
+    return f"{prefix}-{digest}"
+
+
+@contextlib.contextmanager
+def lock(key):
+    """Hold a host-wide lock for a key, so only one process builds or imports it at a time."""
+    with _thread_locks_lock:
+        thread_lock = _thread_locks.setdefault(key, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        folder().mkdir(parents=True, exist_ok=True)
+        with open(folder() / f".{_safe(key)}.lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def version_of(names):
+    """Return one version string for a set of datasets."""
+    return "-".join(data.version(name) for name in names)
+
+
+def _get(key, version, path_of, read, write, build):
+    if not ENABLED:
+        return build()
+    target = path_of(_safe(key), version)
+    try:
+        return read(target)
+    except FileNotFoundError:
+        pass
+    with lock(key):
+        # Another process may have written it while this one waited for the lock
+        try:
+            return read(target)
+        except FileNotFoundError:
+            pass
+        value = build()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Older versions are left alone: other processes may still have them mapped, see clean().
+        # Blobs are the exception, see blob(), so the new one is read before the lock lets another writer in.
+        write(value, target)
+        return read(target)
+
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def clean():
+    """Remove the aggregates of other code fingerprints and of dataset versions that are no longer current.
+
+    The lock files and the temporary files of writers that died go as well. Nothing is removed while the
+    server runs, as other processes may still map those files or hold those locks. euro/serve.py calls
+    this before it starts the workers. Returns the number of files and folders removed.
+    """
+    shared_folder = folder().parent
+    if not shared_folder.is_dir():
+        return 0
+    # Before looking at the lock files, as this imports the datasets that are not imported yet
+    versions = {data.version(name) for name in data.DATASETS}
+    removed = [path for path in shared_folder.iterdir() if path.name != FINGERPRINT]
+    # .<key>.lock and .<name>.<pid>.tmp
+    hidden = list(folder().glob(".*"))
+    removed += hidden
+    for path in folder().glob("*@*"):
+        if path in hidden:
+            continue
+        # name@version-version..., plus .arrow or .bin for frames and blobs
+        version = path.name.split("@", 1)[1].split(".", 1)[0]
+        if not set(version.split("-")) <= versions:
+            removed.append(path)
+    for path in removed:
+        _remove(path)
+    return len(removed)
+
+
+def _read_arrays(target):
+    if not target.is_dir():
+        raise FileNotFoundError(target)
+    return {file.stem: np.load(file, mmap_mode="r") for file in target.glob("*.npy")}
+
+
+def _write_arrays(arrays, target):
+    # Write into a temporary folder and rename it, so a reader sees all of the arrays or none
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.mkdir(parents=True, exist_ok=True)
+    for name, array in arrays.items():
+        np.save(tmp / f"{name}.npy", np.asarray(array), allow_pickle=False)
+    os.replace(tmp, target)
+
+
+def arrays(key, names, build):
+    """Return build() -> {name: numpy array}, computed once per host and dataset version.
+
+    The arrays come back memory-mapped and read-only. They must not hold Python objects,
+    so text has to be a fixed-width numpy string array.
+    """
+    return _get(key, version_of(names), lambda safe, version: folder() / f"{safe}@{version}",
+                _read_arrays, _write_arrays, build)
+
+
+def _read_frame(target):
+    if not target.exists():
+        raise FileNotFoundError(target)
+    return store.to_pandas(store.read(target))
+
+
+def frame(key, names, build):
+    """Return build() -> DataFrame, computed once per host and dataset version and memory-mapped from the store."""
+    return _get(key, version_of(names), lambda safe, version: folder() / f"{safe}@{version}.arrow",
+                _read_frame, lambda df, target: store.write(df, target, version_of(names)), build)
+
+
+def _write_bytes(blob, target):
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(blob)
+    os.replace(tmp, target)
+
+
+def _write_blob(blob, target):
+    _write_bytes(blob, target)
+    # Blobs are read whole and never mapped, so the other versions of the key can go as soon as there is a
+    # new one. With the live feed there is a new version after every match, they would pile up until clean().
+    # A process that still wants an older version builds it again.
+    safe = target.name.split("@", 1)[0]
+    for path in target.parent.glob(f"{safe}@*.bin"):
+        if path != target:
+            path.unlink(missing_ok=True)
+
+
+def blob(key, names, build):
+    """Return build() -> bytes, computed once per host and dataset version. Only the newest version is kept."""
+    return _get(key, version_of(names), lambda safe, version: folder() / f"{safe}@{version}.bin",
+                Path.read_bytes, _write_blob, build)
@@ -0,0 +1,443 @@
+# Monte Carlo simulation of a Euro tournament.
+# Every team gets an attack and a defence strength from its all-time record (goals scored and conceded per match in
+# 100-overall_team_records.csv), adjusted by how far it went in recent tournaments (400-team_results.csv). The
+# number of goals a team scores against another is Poisson distributed around the product of those strengths.
+# https://en.wikipedia.org/wiki/Poisson_distribution
+#
+# A tournament has the format of Euro 2016-2024: 24 teams in 6 groups of 4, the group winners, runners-up and the 4
+# best third-placed teams go to the Round of 16, then Quarter-finals, Semi-finals and the Final. Thousands of
+# tournaments are simulated at once as NumPy arrays: one row per tournament, one column per match. A group match is
+# one uniform number looked up in an alias table of its scores, and a knockout match is one uniform number compared
+# with the chance of the first team to go through (after extra time and penalties).
+# https://numpy.org/doc/stable/reference/random/generator.html
+#
+#   python -m euro.simulation --sims 1000000             chances of every team, and tournaments per second
+#   python -m euro.simulation --sims 1000000 --jobs 4    the same, spread over 4 processes
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from euro import data, memory, profiling, progression
+from euro.cards import ROUNDS
+
+# The rounds a team can reach after the group stage, as named on the Penalty Cards page, and winning it
+STAGES = ROUNDS[1:] + ["Winner"]
+
+GROUPS = 6
+GROUP_SIZE = 4
+TEAMS = GROUPS * GROUP_SIZE
+GROUP_LETTERS = "ABCDEF"
+# Every team of a group plays every other one: pairs of positions within the group
+GROUP_PAIRS = np.array([(0, 1), (2, 3), (0, 2), (1, 3), (0, 3), (1, 2)])
+
+# The Round of 16 of Euro 2024, in bracket order: the winners of matches 2k and 2k+1 meet in the quarter-finals.
+# ("W", g) is the winner of group g, ("R", g) the runner-up, and ("T", g) the third-placed team that plays the
+# winner of group g, see THIRD_PLACE_TABLE.
+BRACKET = [(("W", 1), ("T", 1)), (("W", 0), ("R", 2)), (("W", 5), ("T", 5)), (("R", 3), ("R", 4)),
+           (("W", 4), ("T", 4)), (("W", 3), ("R", 5)), (("W", 2), ("T", 2)), (("R", 0), ("R", 1))]
+
+# The groups whose winners play a third-placed team: B, C, E and F
+THIRD_PLACE_WINNERS = (1, 2, 4, 5)
+# Which third-placed team plays which group winner depends on the groups the 4 best third-placed teams come from.
+# UEFA fixes it in a table of the 15 possible combinations, so that no winner meets a team of its own group:
+# groups of the 4 best third-placed teams -> groups of the third-placed teams that play 1B, 1C, 1E and 1F.
+# https://en.wikipedia.org/wiki/UEFA_Euro_2024_knockout_stage#Combinations_of_matches_in_the_round_of_16
+THIRD_PLACE_TABLE = {
+    "ABCD": "ADBC", "ABCE": "AEBC", "ABCF": "AFBC", "ABDE": "DEAB", "ABDF": "DFAB",
+    "ABEF": "EFBA", "ACDE": "EDCA", "ACDF": "FDCA", "ACEF": "EFCA", "ADEF": "EFDA",
+    "BCDE": "EDBC", "BCDF": "FDCB", "BCEF": "FECB", "BDEF": "FEDB", "CDEF": "FEDC",
+}
+
+
+def _third_place_slots():
+    # THIRD_PLACE_TABLE as an array: bit mask of the groups of the 4 best third-placed teams -> their group for
+    # every winner of THIRD_PLACE_WINNERS. Masks that cannot happen stay -1.
+    slots = np.full((2 ** GROUPS, len(THIRD_PLACE_WINNERS)), -1, dtype=np.intp)
+    for qualified, opponents in THIRD_PLACE_TABLE.items():
+        groups = [GROUP_LETTERS.index(letter) for letter in opponents]
+        if sorted(opponents) != list(qualified) or any(g == w for g, w in zip(groups, THIRD_PLACE_WINNERS)):
+            raise ValueError(f"THIRD_PLACE_TABLE pairs a group winner with its own group for {qualified}")
+        slots[sum(1 << GROUP_LETTERS.index(letter) for letter in qualified)] = groups
+    return slots
+
+
+THIRD_PLACE_SLOTS = _third_place_slots()
+
+# Prior strength of every team, worth this many average matches. It keeps teams with few matches close to average.
+PRIOR_MATCHES = 10
+# How much the recent tournaments count, see expected_goals(). 0 only uses the all-time goals.
+HISTORY_WEIGHT = 0.3
+# Recent tournaments count more: each older tournament counts this much less than the next one
+HISTORY_DECAY = 0.7
+# The host scores exp(HOST_BOOST) times more goals and concedes that much fewer
+HOST_BOOST = 0.15
+# Scores above this are cut off. More than 15 goals for one team has never happened and has a negligible chance.
+MAX_GOALS = 16
+# Tournaments simulated per NumPy batch, which keeps the memory of a million tournaments to a few batches of arrays
+BATCH = 20_000
+# Processes used by run(), 1 simulates in the calling process
+JOBS = int(os.environ.get("EURO_SIM_JOBS", "1"))
+
+
+def _strengths():
+    records = data.load("team_records", columns=['Team', 'Matches Played', 'Goals scored', 'Goals conceded'])
+    matches = records['Matches Played'].to_numpy(dtype=float)
+    scored = records['Goals scored'].to_numpy(dtype=float)
+    conceded = records['Goals conceded'].to_numpy(dtype=float)
+    # Goals per team per match over all matches, and every team's rate pulled towards it by PRIOR_MATCHES
+    average = scored.sum() / matches.sum()
+    attack = (scored + PRIOR_MATCHES * average) / (matches + PRIOR_MATCHES) / average
+    defence = (conceded + PRIOR_MATCHES * average) / (matches + PRIOR_MATCHES) / average
+
+    # Recent form: how far the team went in each tournament (0 when it did not play the final tournament),
+    # weighted by HISTORY_DECAY per tournament back, then standardised over the teams
+    matrix = progression.matrix()
+    finish = np.maximum(matrix.codes.astype(float) - progression.APPEARED + 1, 0)
+    weights = HISTORY_DECAY ** np.arange(matrix.codes.shape[1])[::-1]
+    form = pd.Series(finish @ weights / weights.sum(), index=matrix.teams)
+    form = form.reindex(records['Team'].to_numpy()).fillna(0).to_numpy()
+    history = (form - form.mean()) / (form.std() or 1)
+
+    table = pd.DataFrame({'Team': records['Team'].to_numpy(), 'Attack': attack, 'Defence': defence, 'History': history})
+    table['Rating'] = np.log(table['Attack']) - np.log(table['Defence']) + HISTORY_WEIGHT * table['History']
+    table.attrs['average'] = average
+    return table.sort_values('Rating', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def strengths():
+    """Return the attack, defence and recent form of every team, strongest first. Built once per dataset version."""
+    return data.derived("simulation.strengths", ("team_records", "team_results"), _strengths)
+
+
+def expected_goals(teams, history_weight=HISTORY_WEIGHT, host=None):
+    """Return the matrix of goals teams[i] is expected to score against teams[j]."""
+    table = strengths().set_index('Team').loc[list(teams)]
+    attack = table['Attack'].to_numpy()
+    defence = table['Defence'].to_numpy()
+    history = table['History'].to_numpy()
+    goals = strengths().attrs['average'] * attack[:, None] * defence[None, :]
+    # Half of the difference in form goes to each side
+    goals = goals * np.exp(history_weight * (history[:, None] - history[None, :]) / 2)
+    if host in teams:
+        h = list(teams).index(host)
+        goals[h, :] *= np.exp(HOST_BOOST)
+        goals[:, h] *= np.exp(-HOST_BOOST)
+    return goals
+
+
+def _poisson(goals):
+    # Chance of 0..MAX_GOALS-1 goals for every expected number of goals, along a new last axis
+    k = np.arange(MAX_GOALS)
+    log_factorial = np.cumsum(np.log(np.maximum(k, 1)))
+    return np.exp(k * np.log(goals[..., None]) - goals[..., None] - log_factorial)
+
+
+def score_chances(goals_a, goals_b):
+    """Return the chance of every score, [i, j] is team A scoring i and team B j."""
+    return _poisson(np.asarray(goals_a))[..., :, None] * _poisson(np.asarray(goals_b))[..., None, :]
+
+
+def _win_draw(goals_a, goals_b):
+    scores = score_chances(goals_a, goals_b)
+    win = np.tril(np.ones((MAX_GOALS, MAX_GOALS)), -1)
+    return (scores * win).sum(axis=(-2, -1)), np.trace(scores, axis1=-2, axis2=-1)
+
+
+def knockout_chances(goals):
+    """Return the chance of teams[i] beating teams[j] in a knockout match, after extra time and penalties."""
+    win, draw = _win_draw(goals, goals.T)
+    # Extra time is a third of a match, and penalties are a coin toss
+    win_extra, draw_extra = _win_draw(goals / 3, goals.T / 3)
+    return win + draw * (win_extra + draw_extra / 2)
+
+
+def alias_table(chances):
+    """Return the alias table (keep, alias) of a discrete distribution, for drawing from it in constant time.
+
+    Column i is drawn with chance 1/len(chances), and then gives i with chance keep[i] and alias[i] otherwise.
+    https://en.wikipedia.org/wiki/Alias_method
+    """
+    size = len(chances)
+    scaled = np.asarray(chances, dtype=float) * size / np.sum(chances)
+    keep = np.ones(size)
+    alias = np.arange(size)
+    small = [i for i in range(size) if scaled[i] < 1]
+    large = [i for i in range(size) if scaled[i] >= 1]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        keep[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        (small if scaled[more] < 1 else large).append(more)
+    return keep, alias
+
+
+def draw_groups(teams):
+    """Split 24 teams, strongest first, into 6 groups with one team of every pot of 6, like the UEFA draw.
+
+    The pots are dealt in a snake so the groups come out about equally strong.
+    Returns an array of shape (6, 4) with positions in teams.
+    """
+    positions = np.arange(TEAMS).reshape(GROUP_SIZE, GROUPS)
+    positions[1::2] = positions[1::2, ::-1]
+    return positions.T
+
+
+def _score_keys():
+    # What a score adds to the ranking key of each team in a group: 3 points for a win and 1 for a draw, then the
+    # goal difference, then the goals scored, in bytes of one integer. Every team plays 3 matches, so the sums
+    # stay within their byte, and the goal difference is shifted by 32 to keep it positive. Compare _group_stage().
+    home_goals, away_goals = np.divmod(np.arange(MAX_GOALS * MAX_GOALS), MAX_GOALS)
+    points = np.where(home_goals > away_goals, 3, np.where(home_goals == away_goals, 1, 0))
+    away_points = np.where(away_goals > home_goals, 3, np.where(home_goals == away_goals, 1, 0))
+    home = (points << 16) + ((home_goals - away_goals + 32) << 8) + home_goals
+    away = (away_points << 16) + ((away_goals - home_goals + 32) << 8) + away_goals
+    return home.astype(np.int32), away.astype(np.int32)
+
+
+class _Setup:
+    # Everything a batch needs, precomputed once per parameter set. It is small, so it is cheap to send to workers.
+
+    def __init__(self, goals, groups):
+        self.groups = groups
+        # The 36 group matches, 6 per group, with positions among the 24 teams
+        home = groups[:, GROUP_PAIRS[:, 0]]
+        away = groups[:, GROUP_PAIRS[:, 1]]
+        scores = score_chances(goals[home, away], goals[away, home]).reshape(GROUPS * len(GROUP_PAIRS), -1)
+        tables = [alias_table(chances) for chances in scores]
+        # Flattened, so the score of match m is looked up at m * MAX_GOALS**2 + the drawn column
+        self.keep = np.concatenate([keep for keep, _ in tables])
+        self.alias = np.concatenate([alias for _, alias in tables]).astype(np.uint8)
+        self.own = np.tile(np.arange(scores.shape[1]), len(scores)).astype(np.uint8)
+        self.offsets = np.arange(len(scores)) * scores.shape[1]
+        self.home_key, self.away_key = _score_keys()
+        # The matches every position in a group plays as the first and as the second team
+        self.home_matches = [np.flatnonzero(GROUP_PAIRS[:, 0] == position) for position in range(GROUP_SIZE)]
+        self.away_matches = [np.flatnonzero(GROUP_PAIRS[:, 1] == position) for position in range(GROUP_SIZE)]
+        self.knockout = knockout_chances(goals)
+        # Positions in the rows of _group_stage(): 6 winners, 6 runners-up and the 4 third-placed teams
+        column = {("W", g): g for g in range(GROUPS)} | {("R", g): GROUPS + g for g in range(GROUPS)}
+        column |= {("T", g): 2 * GROUPS + i for i, g in enumerate(THIRD_PLACE_WINNERS)}
+        self.first = np.array([column[first] for first, _ in BRACKET])
+        self.second = np.array([column[second] for _, second in BRACKET])
+        # The group of every one of the 24 positions, to check the Round of 16 in _batch()
+        self.group_of = np.empty(TEAMS, dtype=np.int8)
+        for group, members in enumerate(groups):
+            self.group_of[members] = group
+
+
+def _ranks(keys):
+    # Rank of every array in keys (0 is the biggest key), element by element. Equal keys go to the earlier array.
+    # For a handful of arrays the comparisons are much quicker than an argsort along a short axis.
+    ranks = [np.zeros(keys[0].shape, dtype=np.int8) for _ in keys]
+    for i in range(len(keys)):
+        for j in range(i + 1, len(keys)):
+            ahead = keys[i] >= keys[j]
+            ranks[j] += ahead
+            ranks[i] += ~ahead
+    return ranks
+
+
+def _pick(ranks, values, rank):
+    # The value of the array that has the given rank, element by element
+    picked = np.zeros(np.broadcast_shapes(ranks[0].shape, np.shape(values[0])), dtype=np.result_type(*values))
+    for position_rank, value in zip(ranks, values):
+        np.copyto(picked, value, where=position_rank == rank)
+    return picked
+
+
+def _group_stage(setup, n, rng):
+    # Scores of the 36 matches of n tournaments, as positions in the score grid.
+    # The whole part of u * columns picks a column of the alias table, and the fraction left decides between
+    # the column's own score and its alias. One uniform number per match, and no search.
+    u = rng.random((n, len(setup.offsets))) * (MAX_GOALS * MAX_GOALS)
+    column = u.astype(np.intp)
+    u -= column
+    column += setup.offsets
+    index = np.where(u < setup.keep[column], setup.own[column], setup.alias[column])
+    home = setup.home_key[index].reshape(n, GROUPS, -1)
+    away = setup.away_key[index].reshape(n, GROUPS, -1)
+
+    # Teams are ranked by points, goal difference and goals scored, then drawing of lots. All three add up over
+    # the matches, so the ranking key of a team is the sum of what its 3 scores add, and a random byte below that.
+    lots = rng.integers(0, 256, size=(GROUP_SIZE, n, GROUPS), dtype=np.int32)
+    keys = []
+    for position in range(GROUP_SIZE):
+        key = home[:, :, setup.home_matches[position]].sum(axis=2) + away[:, :, setup.away_matches[position]].sum(axis=2)
+        keys.append((key << 8) + lots[position])
+    ranks = _ranks(keys)
+    teams = [setup.groups[:, position] for position in range(GROUP_SIZE)]
+    winners, runners_up, thirds = (_pick(ranks, teams, rank) for rank in range(3))
+
+    # The 4 best third-placed teams, ordered like THIRD_PLACE_WINNERS by the groups they come from
+    third_key = _pick(ranks, keys, 2)
+    best = np.stack(_ranks(list(third_key.T)), axis=1) < 4
+    slots = THIRD_PLACE_SLOTS[best @ (1 << np.arange(GROUPS))]
+    return np.concatenate([winners, runners_up, np.take_along_axis(thirds, slots, axis=1)], axis=1)
+
+
+def _batch(setup, n, rng):
+    # Number of times every team reached each of the STAGES in n tournaments
+    qualified = _group_stage(setup, n, rng)
+    reached = [qualified]
+    first, second = qualified[:, setup.first], qualified[:, setup.second]
+    # Teams of the same group never meet again in the Round of 16
+    if (setup.group_of[first] == setup.group_of[second]).any():
+        raise RuntimeError("A Round of 16 match pairs two teams of the same group")
+    while True:
+        wins = rng.random(first.shape) < setup.knockout[first, second]
+        winners = np.where(wins, first, second)
+        reached.append(winners)
+        if winners.shape[1] == 1:
+            break
+        first, second = winners[:, 0::2], winners[:, 1::2]
+    return np.stack([np.bincount(teams.ravel(), minlength=TEAMS) for teams in reached], axis=1)
+
+
+def simulate(goals, groups, n, seed=2024, jobs=1):
+    """Simulate n tournaments and return the number of times every team reached each of the STAGES.
+
+    goals is the expected goals matrix of the 24 teams and groups their positions from draw_groups().
+    With jobs > 1 the tournaments are split over that many processes, each with its own random stream.
+    """
+    setup = _Setup(goals, groups)
+    streams = np.random.SeedSequence(seed).spawn(jobs)
+    shares = [n // jobs + (i < n % jobs) for i in range(jobs)]
+    if jobs == 1:
+        return _simulate_share(setup, shares[0], streams[0])
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return sum(pool.map(_simulate_share, [setup] * jobs, shares, streams))
+
+
+def _simulate_share(setup, n, stream):
+    rng = np.random.default_rng(stream)
+    counts = np.zeros((TEAMS, len(STAGES)), dtype=np.int64)
+    for start in range(0, n, BATCH):
+        counts += _batch(setup, min(BATCH, n - start), rng)
+    return counts
+
+
+def default_teams():
+    """Return the 24 strongest teams, the default field of a simulated tournament."""
+    return tuple(strengths()['Team'].head(TEAMS))
+
+
+def _seeded(teams):
+    # The teams are seeded into the pots by their strength, whatever order they were picked in
+    table = strengths()
+    teams = tuple(table['Team'][table['Team'].isin(default_teams() if teams is None else teams)])
+    if len(teams) != TEAMS:
+        raise ValueError(f"A tournament needs {TEAMS} teams, got {len(teams)}")
+    return teams
+
+
+@profiling.timed("filter")
+def _chances(teams, sims, history_weight, host, seed, jobs):
+    start = time.perf_counter()
+    groups = draw_groups(teams)
+    counts = simulate(expected_goals(teams, history_weight, host), groups, sims, seed, jobs)
+    group_of = np.empty(TEAMS, dtype=object)
+    for letter, members in zip(GROUP_LETTERS, groups):
+        group_of[members] = letter
+    result = pd.DataFrame(counts / sims * 100, columns=STAGES)
+    result.insert(0, 'Group', group_of)
+    result.insert(0, 'Team', teams)
+    result = result.sort_values(STAGES[::-1], ascending=False, kind='stable').reset_index(drop=True)
+    return result, time.perf_counter() - start
+
+
+def run(teams=None, sims=100_000, history_weight=HISTORY_WEIGHT, host=None, seed=2024, jobs=None):
+    """Return the chances in percent of every team reaching each round, and the seconds it took.
+
+    teams are the 24 teams in any order (the 24 strongest by default). The result is cached per set
+    of parameters for every session, see euro/memory.py.
+    """
+    teams = _seeded(teams)
+    jobs = JOBS if jobs is None else jobs
+    key = ("simulation.run", teams, sims, history_weight, host, seed, jobs)
+    return memory.cached(key, ("team_records", "team_results"),
+                         lambda: _chances(teams, sims, history_weight, host, seed, jobs))
+
+
+def view(teams=None, sims=100_000, history_weight=HISTORY_WEIGHT, host=None):
+    """Return the result of run(), its bar chart and the seconds it took, for the Euro Simulator page.
+
+    Kept once per set of parameters for every session, see euro/memory.py.
+    """
+    teams = _seeded(teams)
+
+    def build():
+        result, seconds = _chances(teams, sims, history_weight, host, 2024, JOBS)
+        return result, build_chances(result), seconds
+
+    key = ("simulation.view", teams, sims, history_weight, host)
+    return memory.cached(key, ("team_records", "team_results"), build)
+
+
+def head_to_head(team_a, team_b, history_weight=HISTORY_WEIGHT, host=None):
+    """Return the chances of a match between two teams: win/draw/loss in 90 minutes, going through in a
+    knockout match, and the chance of every score up to 5 goals.
+    """
+    goals = expected_goals((team_a, team_b), history_weight, host)
+    win, draw = _win_draw(goals[0, 1], goals[1, 0])
+    scores = score_chances(goals[0, 1], goals[1, 0])
+    return {
+        "expected goals": (goals[0, 1], goals[1, 0]), "win": win, "draw": draw, "loss": 1 - win - draw,
+        "knockout": knockout_chances(goals)[0, 1], "scores": scores[:6, :6],
+    }
+
+
+@profiling.timed("figure")
+def build_chances(result, top=16):
+    """Return a bar chart of the chances of the best teams to reach the last rounds."""
+    import plotly.graph_objects as go
+
+    from euro import payload
+
+    best = result.head(top)
+    colors = {"Quarter-finals": "#c6dbef", "Semi-finals": "#6baed6", "Final": "#2171b5", "Winner": "#fed700"}
+    fig = go.Figure([go.Bar(x=best['Team'], y=best[stage], name=stage, marker=dict(color=color))
+                     for stage, color in colors.items()])
+    fig.update_layout(barmode='group', height=500, title_text="Chances of reaching the last rounds (%)", yaxis_title="%")
+    return payload.compact_figure(fig)
+
+
+@profiling.timed("figure")
+def build_scores(team_a, team_b, scores):
+    """Return a heatmap of the chance of every score of a match."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        z=scores * 100, x=list(range(scores.shape[1])), y=list(range(scores.shape[0])), colorscale="Blues",
+        text=np.round(scores * 100, 1), texttemplate="%{text}%", hovertemplate=f"{team_a} %{{y}} - %{{x}} {team_b}<extra></extra>",
+        colorbar=dict(title="%"),
+    ))
+    fig.update_layout(height=450, title_text="Chance of every score", xaxis_title=f"Goals by {team_b}",
+                      yaxis_title=f"Goals by {team_a}")
+    return fig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Euro tournaments and print the chances of every team.")
+    parser.add_argument("--sims", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--host", default=None)
+    args = parser.parse_args()
+    teams = default_teams()
+    goals = expected_goals(teams, host=args.host)
+    start = time.perf_counter()
+    counts = simulate(goals, draw_groups(teams), args.sims, args.seed, args.jobs)
+    seconds = time.perf_counter() - start
+    result = pd.DataFrame(counts / args.sims * 100, columns=STAGES, index=pd.Index(teams, name='Team'))
+    print(result.sort_values("Winner", ascending=False).round(1).to_string())
+    print(f"{args.sims} tournaments in {seconds:.2f} s ({args.sims / seconds:,.0f} per second) with {args.jobs} job(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Columnar store for the datasets.
+# The CSVs in the data folder are the format I edit by hand, but parsing them with type inference on every load
+# is slow once the files get big. Each CSV is imported once into an Arrow IPC file (the Feather v2 format) in
+# data/store, which git ignores, with its columns already typed and normalised. Loading then memory-maps that
+# file and only touches the columns a page asks for.
+# https://arrow.apache.org/docs/python/ipc.html
+# https://arrow.apache.org/docs/python/memory.html#memory-mapped-files
+
+import os
+from pathlib import Path
+
+import pyarrow as pa
+
+# Key in the schema metadata that records which CSV version an Arrow file was imported from
+_VERSION_KEY = b"euro.version"
+
+
+def path(name, store_dir):
+    """Return the path of a dataset's Arrow file in a store folder."""
+    return Path(store_dir) / f"{name}.arrow"
+
+
+def write(df, file_path, version):
+    """Write a DataFrame to an Arrow IPC file, recording the CSV version it came from.
+
+    The file is written uncompressed so it can be memory-mapped without decoding, and it is
+    written to a temporary name first so readers never see a half-written file.
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _VERSION_KEY: version.encode()})
+    tmp_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, file_path)
+
+
+def stored_version(file_path):
+    """Return the CSV version an Arrow file was imported from, or None if there is no usable file."""
+    try:
+        with pa.memory_map(str(file_path), "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+    version = metadata.get(_VERSION_KEY)
+    return version.decode() if version else None
+
+
+def read(file_path, columns=None):
+    """Memory-map an Arrow file and return it as a pyarrow Table, keeping only the given columns.
+
+    Nothing is copied here: the Table's buffers point straight into the mapped file, and only
+    the pages of the columns that are actually used get read from disk.
+    """
+    source = pa.memory_map(str(file_path), "r")
+    table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    return table
+
+
+def to_pandas(table):
+    # split_blocks keeps each column in its own block, which lets pyarrow hand numeric columns
+    # to pandas without copying them into one consolidated 2D block
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+if __name__ == "__main__":
+    # Import every CSV in the data folder into the store: python -m euro.store
+    from euro import data
+
+    for name in data.DATASETS:
+        version = data.ingest(name)
+        print(f"{name}: {path(name, data.STORE_DIR)} (version {version})")
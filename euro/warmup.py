@@ -0,0 +1,66 @@
+# Background warm-up of the caches.
+# A fresh server process has nothing cached: the first visitor pays for importing Plotly, importing the CSVs
+# into the Arrow store and building every figure. Every page calls start() right after st.set_page_config,
+# and the first call in a process does all of that in a background thread while the visitor reads the page.
+# Set EURO_WARMUP=0 to switch it off, e.g. when measuring cold starts.
+# start() also starts the watcher that reloads changed data files in the background, see euro/watcher.py,
+# and the metrics endpoint when EURO_PROFILE_PORT is set, see euro/profiling.py.
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_thread = None
+# Seconds each warm-up step took in this process, filled in by the background thread
+timings = {}
+
+
+def _warm():
+    from euro import card_cube, cards, data, figures, progression, ranking, shared
+
+    steps = [
+        ("plotly", lambda: __import__("plotly.express") and __import__("plotly.subplots")),
+        ("datasets", lambda: [data.load(name) for name in data.DATASETS]),
+        ("indexes", lambda: (cards.index(), card_cube.cube(), progression.matrix(), ranking.index("team_records"),
+                             ranking.index("team_medals"))),
+        ("figures", figures.cache.warm),
+    ]
+    # With several server processes on a host, the first one warms up the shared store and the others
+    # wait for it, then only map what it built. See euro/shared.py
+    with shared.lock("warmup"):
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception:
+                # A broken dataset must not take the server down, the page that needs it will show the error
+                logger.exception("Warm-up step %s failed", name)
+            timings[name] = time.perf_counter() - start
+    logger.info("Warm-up finished: %s", ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()))
+
+
+def start():
+    """Start warming up the caches in a background thread, once per process."""
+    global _thread
+    from euro import profiling, watcher
+
+    watcher.start()
+    profiling.start_metrics_server()
+    if os.environ.get("EURO_WARMUP", "1") == "0":
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm, name="euro-warmup", daemon=True)
+            _thread.start()
+
+
+def wait(timeout=None):
+    """Wait for the warm-up to finish. Returns False if it is still running after timeout seconds."""
+    if _thread is None:
+        return True
+    _thread.join(timeout)
+    return not _thread.is_alive()
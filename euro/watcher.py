@@ -0,0 +1,143 @@
+# Background watcher for the data folder.
+# Without it every rerun stats the files to find out whether they changed, and the first rerun after a change
+# imports the CSV itself. With it a watchdog observer notices the change, a background thread imports and checks
+# the new file, and the finished snapshot replaces the old one in one step (see data.refresh). Readers never wait
+# for a file and never see a half-written one: they keep the old snapshot until the new one is complete, and
+# everything cached on the dataset version (rankings, figures) is rebuilt the next time it is asked for.
+# It is started together with the warm-up; set EURO_WATCH=0 to switch it off.
+# https://python-watchdog.readthedocs.io/en/stable/quickstart.html
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from euro import data
+
+logger = logging.getLogger(__name__)
+
+# How long a file has to go without change events before it is imported. Editors and scripts often
+# write a file in several steps, and the last write is the one that counts.
+SETTLE_SECONDS = 0.3
+
+_lock = threading.Lock()
+_observer = None
+_worker = None
+# name -> time of the latest change seen for a dataset, waiting to be imported
+_pending = {}
+_wake = threading.Event()
+# The watchdog event types that mean a file was written, created or renamed into place
+_WRITE_EVENTS = ("created", "modified", "moved", "closed")
+
+
+def _files():
+    # file path -> datasets to import again when that file changes
+    files = {}
+    for name, spec in data.DATASETS.items():
+        files.setdefault(data.path(name).resolve(), []).append(name)
+        if spec.get("live", False):
+            files.setdefault(Path(data.EVENTS_FILE).resolve(), []).append(name)
+    return files
+
+
+def _reload(name):
+    try:
+        before = data._key(name)
+        changed = data.refresh(name)
+        if data._key(name) != before:
+            # The file was written to while it was imported, import it again once it settles
+            _changed(name)
+        elif changed:
+            logger.info("Reloaded %s (version %s)", name, data.version(name))
+        if changed:
+            from euro import schema
+
+            # A related dataset that was rejected for its relation to the old import gets another chance
+            for other in schema.related(name):
+                _changed(other)
+    except Exception:
+        # A broken or half-written file keeps the current snapshot, the next change tries again
+        logger.exception("Could not reload %s, keeping the current snapshot", name)
+
+
+def _changed(name):
+    with _lock:
+        _pending[name] = time.monotonic()
+    _wake.set()
+
+
+def _run():
+    while True:
+        _wake.wait()
+        with _lock:
+            now = time.monotonic()
+            ready = [name for name, seen in _pending.items() if now - seen >= SETTLE_SECONDS]
+            for name in ready:
+                del _pending[name]
+            waiting = bool(_pending)
+            if not waiting:
+                _wake.clear()
+        for name in ready:
+            _reload(name)
+        if waiting:
+            time.sleep(SETTLE_SECONDS / 3)
+
+
+def start():
+    """Start watching the data folder in a background thread, once per process.
+
+    Returns False if the watcher is switched off or watchdog is not installed, in which case
+    the data layer keeps checking the files on every read.
+    """
+    global _observer, _worker
+    if os.environ.get("EURO_WATCH", "1") == "0":
+        return False
+    with _lock:
+        if _observer is not None:
+            return True
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.warning("watchdog is not installed, the data files are checked on every read instead")
+            return False
+
+        files = _files()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Reading a file also raises events (opened, closed_no_write), only writes count
+                if event.is_directory or event.event_type not in _WRITE_EVENTS:
+                    return
+                # Files that are written elsewhere and renamed into place show up as a move
+                for changed in (event.src_path, getattr(event, "dest_path", None)):
+                    for name in files.get(Path(os.fsdecode(changed)).resolve(), []) if changed else []:
+                        _changed(name)
+
+        _observer = Observer()
+        for folder in {file.parent for file in files}:
+            folder.mkdir(parents=True, exist_ok=True)
+            _observer.schedule(Handler(), str(folder), recursive=False)
+        _observer.daemon = True
+        _observer.start()
+        if _worker is None:
+            _worker = threading.Thread(target=_run, name="euro-watcher", daemon=True)
+            _worker.start()
+
+    data.watch(True)
+    # Anything that changed before the observer was running is picked up by one import of every dataset
+    for name in data.DATASETS:
+        _changed(name)
+    return True
+
+
+def stop():
+    """Stop the watcher; the data layer goes back to checking the files on every read."""
+    global _observer
+    with _lock:
+        if _observer is None:
+            return
+        _observer.stop()
+        _observer = None
+    data.watch(False)
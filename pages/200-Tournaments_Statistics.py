@@ -5,10 +5,10 @@
 # Streamlit (Apache-2.0 license) - https://github.com/streamlit/streamlit
 
 import streamlit as st
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import pandas as pd
-import plotly.express as px
+
+from euro import data, profiling, warmup
+from euro.figures import get_figure, host_nations_table, medals_tally_table
+from euro.layout import dataframe, keep_widget_state, lazy_tabs, plotly_chart
 
 # Config for Plotly graphs
 # This dictionary configures the interactivity options for the Plotly graphs displayed in my Streamlit app.
@@ -29,10 +29,11 @@ config = {'scrollZoom': False, 'displayModeBar': True, 'displaylogo': False}
 # https://docs.streamlit.io/develop/api-reference/configuration/st.set_page_config
 st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
 
-# Load data from CSV file
-# I have put all my source data files in the data folder
-file_path = './data/100-overall_team_records.csv'
-df = pd.read_csv(file_path)
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
+
+# Time this rerun when profiling is on (EURO_PROFILE=1, or ?profile=<token> in the URL if allowed). See euro/profiling.py
+profiling.begin_run("tournaments")
 
 # Streamlit works with line breaks in a weird way. I used the tricks from here - https://github.com/streamlit/streamlit/issues/868#issuecomment-930499725
 st.write("""# Match performance
@@ -40,112 +41,88 @@ The following graphs showcase the Tournaments related statistics in the UEFA Eur
 Click on the tabs below to uncover interesting insights.
 """)
 
+# During a tournament new results are applied on top of the snapshot, see euro/live.py
+matches = data.live_matches("team_medals")
+if matches:
+    st.caption(f"The medals tally includes {matches} match results recorded since then.")
+
 # Each tab of my streamlit page contains different charts.
-tab1, tab2 = st.tabs(["Host Nations", "Medals Tally"])
+# Only the selected tab is built and sent to the browser, the other one waits until it is opened. See euro/layout.py.
+keep_widget_state('selectbox4', 'selectbox3')
+tab1, tab2 = lazy_tabs(["Host Nations", "Medals Tally"], key='tournaments_tabs')
 
 # Tab 1: Host Nations
 with tab1:
-    st.write("""
-    - `Number of times hosted`: The number of times each nation has hosted the UEFA Euro Championship.
+    if tab1.open:
+        st.write("""
+        - `Number of times hosted`: The number of times each nation has hosted the UEFA Euro Championship.
 
-    **Click on the "How To Use" button in the sidebar to know how to use the graphs below.**
-    """)
+        **Click on the "How To Use" button in the sidebar to know how to use the graphs below.**
+        """)
 
-    # Dropdown menu for selecting the number of top host nations to display
-    option4 = st.selectbox(
-        '**Select number of top host nations to display:**',
-        ('Top 5 nations', 'Top 10 nations', 'All Nations'),
-        key='selectbox4'
-    )
+        # Dropdown menu for selecting the number of top host nations to display
+        option4 = st.selectbox(
+            '**Select number of top host nations to display:**',
+            ('Top 5 nations', 'Top 10 nations', 'All Nations'),
+            key='selectbox4'
+        )
 
-    # Load the data for host nations from CSV file
-    file_path = './data/210-host_countries.csv'
-    host_nations_df = pd.read_csv(file_path)
+        # The host nations data is grouped and filtered in euro/figures.py, and the pie chart for each option is cached
+        pie_data = host_nations_table(option4)
+        fig4 = get_figure("tournaments", "host_nations", option4)
 
-    # Prepare the data
-    pie_data = host_nations_df[['Nation', 'Number of times hosted', 'Year(s)']]
-    pie_data = pie_data.groupby('Nation').sum().reset_index()
+        # Display the pie chart in Streamlit
+        plotly_chart(fig4, config=config)
 
-    # Filter and sort the data based on the selected number of top host nations
-    if option4 == 'Top 5 nations':
-        pie_data = pie_data.nlargest(5, 'Number of times hosted')
-    elif option4 == 'Top 10 nations':
-        pie_data = pie_data.nlargest(10, 'Number of times hosted')
-    else:
-        pie_data = pie_data.sort_values(by='Number of times hosted', ascending=False)
+        # Display the input data table based on the selected top host nations
+        st.write("""
+        ### Input Data
 
-    # Round the number of times hosted to the nearest integer
-    pie_data['Number of times hosted'] = pie_data['Number of times hosted'].round().astype(int)
+        This table gets updated based on your selection from the drop-down above.\n
+        The table can be sorted and scrolled as you like.
+        """)
 
-    # Create the pie chart
-    fig4 = px.pie(pie_data, values='Number of times hosted', names='Nation', title='Number of Times Nations Hosted Events')
+        # https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
+        dataframe(pie_data, hide_index=True, key='table4')
 
-    # Display the pie chart in Streamlit
-    st.plotly_chart(fig4, config=config)
+# Tab 2: Medals
+with tab2:
+    if tab2.open:
+        st.write("""
+        - `Gold`: The number of gold medals won by each team.
+        - `Silver`: The number of silver medals won by each team.
+        - `Bronze`: The number of bronze medals won by each team.
 
-    # Display the input data table based on the selected top host nations
-    st.write("""
-    ### Input Data
+        **Note**: The Third place playoff was removed in 1984. Since then, losing semi-finalists are both counted under bronze.
 
-    This table gets updated based on your selection from the drop-down above.\n
-    The table can be sorted and scrolled as you like.
-    """)
+        **Click on the "How To Use" button in the sidebar to know how to use the graphs below.**
+        """)
 
-    # https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
-    st.dataframe(pie_data,  hide_index=True)
+        # Dropdown menu for selecting the number of top teams to display (by Total Medals)
+        option3 = st.selectbox(
+            '**Select number of top teams to display (by Total Medals):**',
+            ('Top 5 teams', 'Top 10 teams', 'All Teams'),
+            key='selectbox3'
+        )
 
-# Tab 2: Medals
-with tab2:
-    st.write("""
-    - `Gold`: The number of gold medals won by each team.
-    - `Silver`: The number of silver medals won by each team.
-    - `Bronze`: The number of bronze medals won by each team.
-
-    **Note**: The Third place playoff was removed in 1984. Since then, losing semi-finalists are both counted under bronze.
-
-    **Click on the "How To Use" button in the sidebar to know how to use the graphs below.**
-    """)
-
-    # Dropdown menu for selecting the number of top teams to display (by Total Medals)
-    option3 = st.selectbox(
-        '**Select number of top teams to display (by Total Medals):**',
-        ('Top 5 teams', 'Top 10 teams', 'All Teams'),
-        key='selectbox3'
-    )
-
-    # Load the data for medals tally from CSV file
-    file_path = './data/110-team_medals.csv'
-    uefa_medals_df = pd.read_csv(file_path)
-
-    # Filter and sort the data based on the selected number of top teams
-    if option3 == 'Top 5 teams':
-        uefa_medals_df = uefa_medals_df.nlargest(5, 'Total')
-    elif option3 == 'Top 10 teams':
-        uefa_medals_df = uefa_medals_df.nlargest(10, 'Total')
-    else:
-        uefa_medals_df = uefa_medals_df.sort_values(by="Total", ascending=False)
-
-    # Define custom colors for each medal type
-    custom_colors = {
-        "Gold": "#fca311",  # Gold color
-        "Silver": "#e5e5e5",  # Silver color
-        "Bronze": "#14213d"  # Bronze color
-    }
-
-    # Create the bar chart
-    # https://plotly.com/python/bar-charts/#bar-charts-with-wide-format-data
-    fig3 = px.bar(uefa_medals_df, x="Team", y=["Gold", "Silver", "Bronze"], text_auto=True, title="UEFA Euro Tournament Medals by Country", color_discrete_map=custom_colors)
-
-    # Display the chart in Streamlit
-    st.plotly_chart(fig3, config=config)
-
-    # Display the input data table based on the selected top teams
-    st.write("""
-    ### Input Data
-
-    This table gets updated based on your selection from the drop-down above.\n
-    The table can be sorted and scrolled as you like.
-    """)
-
-    # https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
-    st.dataframe(uefa_medals_df,  hide_index=True)
+        # Filter and sort the medals tally for the selected option, and get the cached bar chart for it
+        # https://plotly.com/python/bar-charts/#bar-charts-with-wide-format-data
+        uefa_medals_df = medals_tally_table(option3)
+        fig3 = get_figure("tournaments", "medals", option3)
+
+        # Display the chart in Streamlit
+        plotly_chart(fig3, config=config)
+
+        # Display the input data table based on the selected top teams
+        st.write("""
+        ### Input Data
+
+        This table gets updated based on your selection from the drop-down above.\n
+        The table can be sorted and scrolled as you like.
+        """)
+
+        # https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
+        dataframe(uefa_medals_df, hide_index=True, key='table3')
+
+# Log the timings of this rerun and show them in the sidebar when profiling is on
+profiling.end_run()
@@ -0,0 +1,79 @@
+# Acknowledgements
+# Plotly (MIT License) - https://github.com/plotly/plotly.py
+# Pandas (BSD-3-Clause license) - https://github.com/pandas-dev/pandas
+# NumPy (BSD-3-Clause license) - https://github.com/numpy/numpy
+# Wikipedia (Creative Commons Attribution-ShareAlike 3.0 Unported License (CC BY-SA 3.0)) - https://en.wikipedia.org/wiki/UEFA_European_Championship
+# Streamlit (Apache-2.0 license) - https://github.com/streamlit/streamlit
+
+import streamlit as st
+
+from euro import profiling, progression, warmup
+from euro.layout import dataframe, plotly_chart
+
+# Config for Plotly graphs
+# This dictionary configures the interactivity options for the Plotly graphs displayed in my Streamlit app.
+# 'scrollZoom' enables zooming using the mouse scroll wheel, 'displayModeBar' shows the mode bar with options,
+# and 'displaylogo' hides the Plotly logo from the mode bar.
+# I added the config options I needed. You can find more options at:
+# https://github.com/plotly/plotly.js/blob/master/src/plot_api/plot_config.js
+config = {'scrollZoom': False, 'displayModeBar': True, 'displaylogo': False}
+
+# Streamlit page configuration
+# I added the config options I needed. You can find more options at:
+# https://docs.streamlit.io/develop/api-reference/configuration/st.set_page_config
+st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
+
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
+
+# Time this rerun when profiling is on (EURO_PROFILE=1, or ?profile=<token> in the URL if allowed). See euro/profiling.py
+profiling.begin_run("team_progression")
+
+# The team results are encoded once per dataset version into an integer matrix, see euro/progression.py
+matrix = progression.matrix()
+
+# Streamlit works with line breaks in a weird way. I used the tricks from here - https://github.com/streamlit/streamlit/issues/868#issuecomment-930499725
+st.write("""# Team progression
+The following graph shows how far each national team got in every UEFA Euro Championship up to 2020.\n
+Each row is a team and each column a tournament. The darker the cell, the further the team went.
+
+- `Best finish`: The furthest the team has ever reached.
+- `Appearances`: The number of final tournaments the team played in (group stage or better).
+- `Longest streak`: The most final tournaments in a row the team played in.
+
+**Click on the "How To Use" button in the sidebar to know how to use the graphs below.**
+""")
+
+# Slider for the range of tournaments, and how many teams to show in the graph
+first_year, last_year = st.select_slider(
+    '**Select the tournaments to include:**',
+    options=[int(year) for year in matrix.years],
+    value=(int(matrix.years[0]), int(matrix.years[-1])),
+    key='progression_years'
+)
+min_appearances = st.slider('**Only show teams with at least this many appearances:**', 0, len(matrix.years), 1, key='progression_appearances')
+top_teams = st.slider('**Number of teams to show in the graph:**', 5, max(5, len(matrix.teams)), min(20, len(matrix.teams)), key='progression_teams')
+
+# Everything below is computed on the whole matrix with NumPy, so it stays quick when the matrix gets big.
+# The table and the graph for a position of the sliders are built once for every session, see euro/memory.py
+stats, fig = progression.view(first_year, last_year, min_appearances, top_teams)
+plotly_chart(fig, config=config)
+
+st.write("""
+### Team statistics
+
+This table gets updated based on your selection from the sliders above.\n
+The table can be sorted and scrolled as you like.
+""")
+
+# https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
+dataframe(stats, hide_index=True, key='progression_table')
+
+st.write("""
+**Note**:\n
+- Before 1980 only four teams played the final tournament, so `Third place` and `Fourth place` come from those tournaments.
+- The third place playoff was removed in 1984. Since then, losing semi-finalists are both counted under `Semi-finals`.
+""")
+
+# Log the timings of this rerun and show them in the sidebar when profiling is on
+profiling.end_run()
@@ -4,10 +4,12 @@
 # Wikipedia (Creative Commons Attribution-ShareAlike 3.0 Unported License (CC BY-SA 3.0)) - https://en.wikipedia.org/wiki/UEFA_European_Championship
 # Streamlit (Apache-2.0 license) - https://github.com/streamlit/streamlit
 
-import pandas as pd
-import plotly.express as px
 import streamlit as st
 
+from euro import cards, profiling, warmup
+from euro.cards import CARD_COLORS, ROUNDS
+from euro.layout import dataframe, figure_slots, lazy_tabs
+
 # Config for Plotly graphs
 # This dictionary configures the interactivity options for the Plotly graphs displayed in my Streamlit app.
 # 'scrollZoom' enables zooming using the mouse scroll wheel, 'displayModeBar' shows the mode bar with options,
@@ -27,27 +29,15 @@ config = {'scrollZoom': False, 'displayModeBar': True, 'displaylogo': False}
 # https://docs.streamlit.io/develop/api-reference/configuration/st.set_page_config
 st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
 
-# I have put all my source data files in the data folder
-file_path = './data/220-red_cards.csv'
-data = pd.read_csv(file_path)
-
-# Define a function to create and display pie charts for different rounds and card colors
-def create_pie_chart(round_name, card_color):
-    # Filter the data for the specified round and card color
-    filtered_data = data[(data['Round'] == round_name) & (data['Card Color'] == card_color)]
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
 
-    if not filtered_data.empty:
-        # Count the contributions by country
-        country_counts = filtered_data['Representing'].value_counts().reset_index()
-        country_counts.columns = ['Country', 'Count']
+# Time this rerun when profiling is on (EURO_PROFILE=1, or ?profile=<token> in the URL if allowed). See euro/profiling.py
+profiling.begin_run("penalty_cards")
 
-        # Create a pie chart with rounded percentage labels
-        fig = px.pie(country_counts, values='Count', names='Country', title=f'{card_color} Cards in {round_name}')
-        fig.update_traces(textinfo='percent+label', texttemplate='%{label}: %{percent:.0%}')
-
-        return fig, country_counts
-    else:
-        return None, None
+# The red cards data is grouped by round and card colour once per dataset version, see euro/cards.py.
+# The pie charts are built once and then served from the figure cache, see euro/figures.py.
+# A pie chart that is not cached yet is built on a small pool of threads, off the script thread.
 
 # Streamlit works with line breaks in a weird way. I used the tricks from here - https://github.com/streamlit/streamlit/issues/868#issuecomment-930499725
 st.title("Penalty Cards")
@@ -61,35 +51,39 @@ st.write("""
 """)
 
 # Each tab of my streamlit page contains different charts.
-# Define the rounds to analyze
-rounds = ["Group stage", "Round of 16", "Quarter-finals", "Semi-finals", "Final"]
-
-# Define the card colors to analyze
-card_colors = ["Red", "Two-Yellow"]
+# The rounds and card colors to analyze are defined in euro/cards.py
+rounds = ROUNDS
+card_colors = CARD_COLORS
 
 # Create tabs for each round
-tabs = st.tabs([f"{round_name}" for round_name in rounds])
+# Only the selected round is built and sent to the browser, the others wait until they are opened. See euro/layout.py.
+tabs = lazy_tabs([f"{round_name}" for round_name in rounds], key='penalty_cards_tabs')
 
 # Display pie charts in respective tabs
 for round_name, tab in zip(rounds, tabs):
+    if not tab.open:
+        continue
     with tab:
         #st.subheader(f"Analysis for {round_name}")
 
-        # https://plotly.com/python/pie-charts/
-        for card_color in card_colors:
-            fig, country_counts = create_pie_chart(round_name, card_color)
-            if fig:
-                st.plotly_chart(fig)
-                #st.dataframe(country_counts, hide_index=True)
-            else:
-                st.markdown(f"<div style='color: red; font-size: 18px; font-weight: bold;'>No {card_color} cards issued in this round.</div>", unsafe_allow_html=True)
-
-        # Filter and display data relevant to the current round
-        round_data = data[data['Round'] == round_name].copy()
-
-        # Reorder columns to have 'Round' as the first column and remove comma from 'Tournament'
-        round_data['Tournament'] = round_data['Tournament'].astype(str).str.replace(',', '')
-        round_data = round_data[['Round'] + [col for col in round_data.columns if col != 'Round']]
-
-        st.write(f"### Data for {round_name}")# https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
-        st.dataframe(round_data, hide_index=True)
+        # The pie charts that are not cached yet are built on the figure pool while the table below is sent,
+        # and each one shows up as soon as it is ready. See figure_slots() in euro/layout.py.
+        with figure_slots() as slots:
+            # https://plotly.com/python/pie-charts/
+            for card_color in card_colors:
+                country_counts = cards.country_counts(round_name, card_color)
+                if country_counts is not None:
+                    # Every pie chart has its own place on the page, so the session keeps one key for each, see euro/memory.py
+                    slots.plotly_chart("penalty_cards", "pie", (round_name, card_color), slot=("pie", round_name, card_color))
+                    #st.dataframe(country_counts, hide_index=True)
+                else:
+                    st.markdown(f"<div style='color: red; font-size: 18px; font-weight: bold;'>No {card_color} cards issued in this round.</div>", unsafe_allow_html=True)
+
+            # Data relevant to the current round, already prepared with 'Round' as the first column
+            round_data = cards.round_table(round_name)
+
+            st.write(f"### Data for {round_name}")# https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
+            dataframe(round_data, hide_index=True, key=f'table_{round_name}')
+
+# Log the timings of this rerun and show them in the sidebar when profiling is on
+profiling.end_run()
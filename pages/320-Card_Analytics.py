@@ -0,0 +1,103 @@
+# Acknowledgements
+# Plotly (MIT License) - https://github.com/plotly/plotly.py
+# Pandas (BSD-3-Clause license) - https://github.com/pandas-dev/pandas
+# NumPy (BSD-3-Clause license) - https://github.com/numpy/numpy
+# Wikipedia (Creative Commons Attribution-ShareAlike 3.0 Unported License (CC BY-SA 3.0)) - https://en.wikipedia.org/wiki/UEFA_European_Championship
+# Streamlit (Apache-2.0 license) - https://github.com/streamlit/streamlit
+
+import streamlit as st
+
+from euro import card_cube, profiling, warmup
+from euro.layout import dataframe, lazy_tabs, plotly_chart
+
+# Config for Plotly graphs
+# This dictionary configures the interactivity options for the Plotly graphs displayed in my Streamlit app.
+# 'scrollZoom' enables zooming using the mouse scroll wheel, 'displayModeBar' shows the mode bar with options,
+# and 'displaylogo' hides the Plotly logo from the mode bar.
+# I added the config options I needed. You can find more options at:
+# https://github.com/plotly/plotly.js/blob/master/src/plot_api/plot_config.js
+config = {'scrollZoom': False, 'displayModeBar': True, 'displaylogo': False}
+
+# Streamlit page configuration
+# I added the config options I needed. You can find more options at:
+# https://docs.streamlit.io/develop/api-reference/configuration/st.set_page_config
+st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
+
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
+
+# Time this rerun when profiling is on (EURO_PROFILE=1, or ?profile=<token> in the URL if allowed). See euro/profiling.py
+profiling.begin_run("card_analytics")
+
+# All the numbers on this page come from a cube of card counts built once per dataset version, see euro/card_cube.py
+cube = card_cube.cube()
+
+# Streamlit works with line breaks in a weird way. I used the tricks from here - https://github.com/streamlit/streamlit/issues/868#issuecomment-930499725
+st.write("""# Card analytics
+The following graphs look at when Red and Two-Yellow cards were issued, how their number changed over the tournaments,
+and how the matches ended for the teams that got them (as of June 14, 2024).\n
+Use the filters below to narrow down the cards, and click on the tabs to switch between the graphs.
+""")
+
+# Filters for the cards. Every graph and table below uses all of them.
+tournaments = cube.labels["tournament"].tolist()
+rounds = cube.labels["round"].tolist()
+card_colors = cube.labels["color"].tolist()
+col1, col2 = st.columns(2)
+with col1:
+    first_year, last_year = st.select_slider(
+        '**Select the tournaments to include:**',
+        options=tournaments,
+        value=(tournaments[0], tournaments[-1]),
+        key='cards_tournaments'
+    )
+    team = st.selectbox('**Select a team:**', ['All Teams'] + cube.labels["team"].tolist(), key='cards_team')
+with col2:
+    selected_rounds = st.multiselect('**Select the rounds to include:**', rounds, default=rounds, key='cards_rounds')
+    selected_colors = st.multiselect('**Select the card colors to include:**', card_colors, default=card_colors, key='cards_colors')
+
+filters = {
+    "tournament": [year for year in tournaments if first_year <= year <= last_year],
+    "round": selected_rounds,
+    "color": selected_colors,
+    "team": None if team == 'All Teams' else [team],
+}
+
+# The table and the graph of each tab are built once per filter combination for every session, see euro/memory.py.
+# Only the selected tab is built and sent to the browser, the others wait until they are opened. See euro/layout.py.
+tab1, tab2, tab3 = lazy_tabs(["Minute of card", "Cards per tournament", "Result of the match"], key='card_analytics_tabs')
+
+# Tab 1: Minute of card
+with tab1:
+    if tab1.open:
+        st.write("""
+        - The number of cards issued in each 15 minute period of the match.
+        - Cards in stoppage time count towards the 45th or 90th minute. `91-105` and `106-120` are extra time.
+        """)
+        by_minute, fig = card_cube.view("minute", "Cards by minute of the match", **filters)
+        plotly_chart(fig, config=config)
+        dataframe(by_minute, hide_index=True, key='cards_minute_table')
+
+# Tab 2: Cards per tournament
+with tab2:
+    if tab2.open:
+        st.write("""
+        - The number of cards issued in each tournament.
+        """)
+        by_tournament, fig = card_cube.view("tournament", "Cards per tournament", **filters)
+        plotly_chart(fig, config=config)
+        dataframe(by_tournament, hide_index=True, key='cards_tournament_table')
+
+# Tab 3: Result of the match
+with tab3:
+    if tab3.open:
+        st.write("""
+        - How the match ended for the team whose player got the card, by goal difference.
+        - The data only has the final score, not the score at the moment of the card.
+        """)
+        by_result, fig = card_cube.view("result", "Cards by result of the match", **filters)
+        plotly_chart(fig, config=config)
+        dataframe(by_result, hide_index=True, key='cards_result_table')
+
+# Log the timings of this rerun and show them in the sidebar when profiling is on
+profiling.end_run()
@@ -0,0 +1,112 @@
+# Acknowledgements
+# Plotly (MIT License) - https://github.com/plotly/plotly.py
+# Pandas (BSD-3-Clause license) - https://github.com/pandas-dev/pandas
+# NumPy (BSD-3-Clause license) - https://github.com/numpy/numpy
+# Wikipedia (Creative Commons Attribution-ShareAlike 3.0 Unported License (CC BY-SA 3.0)) - https://en.wikipedia.org/wiki/UEFA_European_Championship
+# Streamlit (Apache-2.0 license) - https://github.com/streamlit/streamlit
+
+import streamlit as st
+
+from euro import profiling, simulation, warmup
+from euro.layout import dataframe, keep_widget_state, lazy_tabs, plotly_chart
+
+# Config for Plotly graphs
+# This dictionary configures the interactivity options for the Plotly graphs displayed in my Streamlit app.
+# 'scrollZoom' enables zooming using the mouse scroll wheel, 'displayModeBar' shows the mode bar with options,
+# and 'displaylogo' hides the Plotly logo from the mode bar.
+# I added the config options I needed. You can find more options at:
+# https://github.com/plotly/plotly.js/blob/master/src/plot_api/plot_config.js
+config = {'scrollZoom': False, 'displayModeBar': True, 'displaylogo': False}
+
+# Streamlit page configuration
+# I added the config options I needed. You can find more options at:
+# https://docs.streamlit.io/develop/api-reference/configuration/st.set_page_config
+st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
+
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
+
+# Time this rerun when profiling is on (EURO_PROFILE=1, or ?profile=<token> in the URL if allowed). See euro/profiling.py
+profiling.begin_run("euro_simulator")
+
+# Streamlit works with line breaks in a weird way. I used the tricks from here - https://github.com/streamlit/streamlit/issues/868#issuecomment-930499725
+st.write("""# Euro simulator
+What if the Euro was played again? The following graphs simulate the tournament many times over and show how often
+each team gets through each round.\n
+Each team's strength comes from the goals it scored and conceded in all its Euro matches, and from how far it went in
+the recent tournaments. Check euro/simulation.py for how the matches are simulated.
+""")
+
+# The parameters of the simulation. The result of every combination is computed once and kept for every session.
+strengths = simulation.strengths()
+col1, col2 = st.columns(2)
+with col1:
+    teams = st.multiselect(f'**Select the {simulation.TEAMS} teams that play:**', strengths['Team'].tolist(),
+                           default=list(simulation.default_teams()), max_selections=simulation.TEAMS, key='simulator_teams')
+    host = st.selectbox('**Select the host nation:**', ['No host'] + teams, key='simulator_host')
+with col2:
+    sims = st.select_slider('**Number of simulated tournaments:**', options=[10_000, 100_000, 1_000_000], value=100_000,
+                            format_func=lambda n: f"{n:,}", key='simulator_sims')
+    history_weight = st.slider('**How much the recent tournaments count:**', 0.0, 1.0, simulation.HISTORY_WEIGHT, 0.1,
+                               key='simulator_history')
+host = None if host == 'No host' else host
+
+# Only the selected tab is built and sent to the browser, the other one waits until it is opened. See euro/layout.py.
+keep_widget_state('simulator_team_a', 'simulator_team_b')
+tab1, tab2 = lazy_tabs(["Tournament simulation", "Head-to-head"], key='simulator_tabs')
+
+# Tab 1: Tournament simulation
+with tab1:
+    if tab1.open:
+        if len(teams) != simulation.TEAMS:
+            st.warning(f"A Euro has {simulation.TEAMS} teams, please select {simulation.TEAMS - len(teams)} more.")
+        else:
+            st.write("""
+            - The teams are drawn into 6 groups of 4 by strength, one from each pot, like the UEFA draw.
+            - The group winners, runners-up and the 4 best third-placed teams go through to the Round of 16.
+            - Knockout matches that are level after 90 minutes go to extra time and then penalties.
+            """)
+            result, fig, seconds = simulation.view(teams, sims, history_weight, host)
+            plotly_chart(fig, config=config)
+            st.caption(f"Simulated {sims:,} tournaments in {seconds:.2f} s.")
+
+            st.write("""
+            ### Chances of every team (%)
+
+            This table gets updated based on your selection above.\n
+            The table can be sorted and scrolled as you like.
+            """)
+            # https://docs.streamlit.io/develop/concepts/design/dataframes#additional-formatting-options
+            dataframe(result.round(1), hide_index=True, key='simulator_table')
+
+# Tab 2: Head-to-head
+with tab2:
+    if tab2.open:
+        st.write("""
+        - The chances of a single match between two teams, in 90 minutes and in a knockout match.
+        - The host advantage and the weight of the recent tournaments above apply here too.
+        """)
+        all_teams = strengths['Team'].tolist()
+        # The two strongest teams to start with. Set through session state, as keep_widget_state() writes it too.
+        st.session_state.setdefault('simulator_team_a', all_teams[0])
+        st.session_state.setdefault('simulator_team_b', all_teams[1])
+        col1, col2 = st.columns(2)
+        with col1:
+            team_a = st.selectbox('**First team:**', all_teams, key='simulator_team_a')
+        with col2:
+            team_b = st.selectbox('**Second team:**', all_teams, key='simulator_team_b')
+
+        if team_a == team_b:
+            st.warning("Please select two different teams.")
+        else:
+            match = simulation.head_to_head(team_a, team_b, history_weight, host)
+            cols = st.columns(4)
+            cols[0].metric(f"{team_a} wins", f"{match['win'] * 100:.1f}%")
+            cols[1].metric("Draw", f"{match['draw'] * 100:.1f}%")
+            cols[2].metric(f"{team_b} wins", f"{match['loss'] * 100:.1f}%")
+            cols[3].metric(f"{team_a} goes through (knockout)", f"{match['knockout'] * 100:.1f}%")
+            st.caption(f"Expected goals: {team_a} {match['expected goals'][0]:.2f}, {team_b} {match['expected goals'][1]:.2f}")
+            plotly_chart(simulation.build_scores(team_a, team_b, match['scores']), config=config)
+
+# Log the timings of this rerun and show them in the sidebar when profiling is on
+profiling.end_run()
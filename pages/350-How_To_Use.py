@@ -1,8 +1,13 @@
 import streamlit as st
 
+from euro import warmup
+
 # https://docs.streamlit.io/develop/api-reference/configuration/st.set_page_config
 st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
 
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
+
 st.write("""
 # How to use this website?
 All graphs in this site are interactive and built using Python.\n
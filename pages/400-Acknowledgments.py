@@ -1,7 +1,12 @@
 import streamlit as st
 
+from euro import warmup
+
 config = {'scrollZoom': True, 'displayModeBar': True, 'displaylogo': False}
 st.set_page_config(page_title="UEFA Euro Graphs", page_icon=":soccer:", layout="wide", initial_sidebar_state="expanded", menu_items=None)
+
+# Warm up the data and figure caches in the background, once per server process. See euro/warmup.py
+warmup.start()
 st.write("""
 #### Acknowledgments
 
@@ -11,6 +16,7 @@ I fully acknowledge their efforts and attribute the usage of their components &
 - **[Pandas](https://github.com/pandas-dev/pandas)** - Licensed under the BSD-3-Clause License
 - **[Streamlit](https://github.com/streamlit/streamlit)** - Licensed under the Apache-2.0 License
 - **[Plotly](https://github.com/plotly/plotly.py)** - Licensed under the MIT License
+- **[NumPy](https://github.com/numpy/numpy)** - Licensed under the BSD-3-Clause License
 - **[Wikipedia](https://en.wikipedia.org/wiki/UEFA_European_Championship)** - Data licensed under the Creative Commons Attribution-ShareAlike 3.0 Unported License (CC BY-SA 3.0)
 
 #### Full Code